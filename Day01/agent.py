@@ -6,6 +6,9 @@ from langchain_core.tools import tool
 
 import json
 import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
 from states import State
 from tools import calculator,local_search
@@ -43,8 +46,25 @@ def llm_node(state: State):
 
 
 
+# per-tool time limits (seconds); a call that overruns gets an error ToolMessage
+TOOL_TIMEOUTS = {"calculator": 2.0, "local_search": 5.0}
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT_S", "10"))
+
+
+def dispatch_tool(name: str, args: dict) -> dict:
+    """Dispatch to your Python tools."""
+    try:
+        if name == "calculator":
+            return calculator(**args)  # expects {"expr": "..."}
+        if name == "local_search":
+            return local_search(**args)  # expects {"query": "...", "top_k": 3}
+        return {"ok": False, "error": f"unknown tool: {name}"}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
 def run_tool_node(state: State):
-    """If the last AI message requested a tool, run it and append a ToolMessage."""
+    """Run EVERY tool call of the last AI message concurrently; one ToolMessage per call, in order."""
     msgs = state["messages"]
     if not msgs:
         return {}
@@ -54,27 +74,28 @@ def run_tool_node(state: State):
     if not hasattr(last, "tool_calls") or not last.tool_calls:
         return {}
 
-    # handle only the first tool call
-    tool_call = last.tool_calls[0]
-    name = tool_call["name"]
-    args = tool_call.get("args", {}) or {}
-
-    # Dispatch to your Python tools
-    if name == "calculator":
-        out = calculator(**args)  # expects {"expr": "..."}
-    elif name == "local_search":
-        out = local_search(**args)  # expects {"query": "...", "top_k": 3}
-    else:
-        out = {"ok": False, "error": f"unknown tool: {name}"}
-
-    # Append a ToolMessage with the JSON result; tie it to the tool_call id
-    tool_msg = ToolMessage(
-        content=json.dumps(out),
-        name=name,
-        tool_call_id=tool_call["id"],
-    )
-    # increment your loop counter too
-    return {"messages": [tool_msg], "steps": state["steps"] + 1}
+    start = time.monotonic()
+    # a pool per turn: a timed-out call can't be killed, but its thread then holds
+    # no worker that later turns need; it just finishes in the background
+    pool = ThreadPoolExecutor(max_workers=len(last.tool_calls), thread_name_prefix="tool")
+    futures = [pool.submit(dispatch_tool, tc["name"], tc.get("args", {}) or {}) for tc in last.tool_calls]
+    pool.shutdown(wait=False)
+    tool_msgs = []
+    for tool_call, fut in zip(last.tool_calls, futures):
+        name = tool_call["name"]
+        limit = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            out = fut.result(timeout=max(0.0, start + limit - time.monotonic()))
+        except TimeoutError:
+            out = {"ok": False, "error": f"{name} timed out after {limit:g}s"}
+        # Append a ToolMessage with the JSON result; tie it to the tool_call id
+        tool_msgs.append(ToolMessage(
+            content=json.dumps(out),
+            name=name,
+            tool_call_id=tool_call["id"],
+        ))
+    # one loop step per model round trip, however many tools it asked for
+    return {"messages": tool_msgs, "steps": state["steps"] + 1}
 
 def needs_tool(state: State) -> str:
     """Decide next hop after the LLM node."""
@@ -1,43 +1,78 @@
-import os, glob, re
-
-def calculator(expr: str) -> dict:
-    """Evaluate safe math expressions with support for percentages.
-
-    Returns:
-        {"ok": True, "result": float} on success
-        {"ok": False, "error": str} on failure
+import glob, os, re, sys, threading, time
+
+# the calculator engine lives in the repo-level `shared` package (also used by Day05)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.calculator import calculator
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+REFRESH_S = float(os.getenv("LOCAL_SEARCH_REFRESH_S", "2"))  # how often to re-stat data/*.md
+_TOKEN_RE = re.compile(r"\w+")
+
+# path -> {"sig": (mtime_ns, size), "text", "postings": {token: [char offsets]}, "terms": {term: (count, first)}}
+_corpus = {}
+_last_refresh = 0.0
+_corpus_lock = threading.Lock()
+
+
+def _index_text(text: str) -> dict:
+    postings = {}
+    for m in _TOKEN_RE.finditer(text.lower()):
+        postings.setdefault(m.group(0), []).append(m.start())
+    return postings
+
+
+def _refresh_corpus(force: bool = False) -> None:
+    """(Re)load only files whose mtime/size changed; drop deleted ones. Reads nothing otherwise."""
+    global _last_refresh
+    now = time.monotonic()
+    if not force and now - _last_refresh < REFRESH_S:
+        return
+    with _corpus_lock:
+        seen = set()
+        for fp in glob.glob(os.path.join(DATA_DIR, "*.md")):
+            try:
+                st = os.stat(fp)
+            except OSError:
+                continue
+            seen.add(fp)
+            sig = (st.st_mtime_ns, st.st_size)
+            entry = _corpus.get(fp)
+            if entry and entry["sig"] == sig:
+                continue
+            try:
+                with open(fp, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except Exception:
+                # ignore unreadable files; you could also return an error if you prefer
+                continue
+            _corpus[fp] = {"sig": sig, "text": text, "postings": _index_text(text), "terms": {}}
+        for fp in list(_corpus):
+            if fp not in seen:
+                del _corpus[fp]
+        _last_refresh = now
+
+
+def _term_stats(entry: dict, term: str):
+    """(occurrences, first char offset) of `term` as a substring, from the token postings.
+
+    Query terms are \\w+ runs, so every substring hit sits inside one indexed token:
+    same counts as text.lower().count(term), without rescanning the text.
     """
-    # 1. Basic validation
-    if not expr or len(expr) > 200:
-        return {"ok": False, "error": "Invalid input length"}
-
-    # 2. Allow only digits, ., + - * / ( ), %, spaces, and "of"
-    safe_pattern = r"^[0-9\.\+\-\*\/\(\)\s%ofOF]+$"
-    if not re.fullmatch(safe_pattern, expr):
-        return {"ok": False, "error": "Unsafe characters in expression"}
-
-    # 3. Handle "20% of 50" → "(20/100)*50"
-    expr2 = re.sub(
-        r"(\d+(?:\.\d+)?)\s*%\s*of\s*(\d+(?:\.\d+)?)",
-        lambda m: f"({float(m.group(1))/100}*{m.group(2)})",
-        expr,
-        flags=re.I
-    )
-
-    # 4. Handle standalone "20%" → "(20/100)"
-    expr2 = re.sub(
-        r"(\d+(?:\.\d+)?)\s*%",
-        lambda m: f"({float(m.group(1))/100})",
-        expr2
-    )
-
-    # 5. Evaluate safely
-    try:
-        result = eval(expr2, {"__builtins__": {}}, {})
-        return {"ok": True, "result": result}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
-
+    hit = entry["terms"].get(term)
+    if hit is None:
+        if len(entry["terms"]) >= 1024:
+            entry["terms"].clear()  # bound the per-file memo
+        count, first = 0, -1
+        for token, positions in entry["postings"].items():
+            k = token.count(term)
+            if not k:
+                continue
+            count += k * len(positions)
+            pos = positions[0] + token.find(term)
+            if first == -1 or pos < first:
+                first = pos
+        hit = entry["terms"][term] = (count, first)
+    return hit
 
 
 def local_search(query: str, top_k: int = 3) -> dict:
@@ -59,42 +94,32 @@ def local_search(query: str, top_k: int = 3) -> dict:
     if not terms:
         return {"ok": False, "error": "No searchable terms in query"}
 
-    # 3) find markdown files under ./data
-    data_dir = os.path.join(os.path.dirname(__file__), "data")
-    files = glob.glob(os.path.join(data_dir, "*.md"))
+    # 3) make sure the in-memory corpus is current (stat-based, throttled)
+    _refresh_corpus()
 
     hits = []
-    for fp in files:
-        try:
-            with open(fp, "r", encoding="utf-8") as f:
-                text = f.read()
-            text_lower = text.lower()
-
-            # 4) simple score = sum of occurrences of each term
-            score = sum(text_lower.count(t) for t in terms)
-
-            if score > 0:
-                # 5) locate first occurrence of any term for snippet
-                first_idx = min(
-                    (text_lower.find(t) for t in terms if text_lower.find(t) != -1),
-                    default=-1
-                )
-                # build a short snippet around the first match
-                if first_idx != -1:
-                    start = max(0, first_idx - 60)
-                    end = min(len(text), first_idx + 160)
-                    snippet = text[start:end].replace("\n", " ").strip()
-                else:
-                    snippet = text[:200].replace("\n", " ").strip()
-
-                hits.append({
-                    "score": score,
-                    "file": os.path.basename(fp),
-                    "snippet": snippet
-                })
-        except Exception as e:
-            # ignore unreadable files; you could also return an error if you prefer
+    for fp, entry in list(_corpus.items()):
+        # 4) score = sum of occurrences of each term; 5) snippet at the earliest hit
+        score, first_idx = 0, -1
+        for t in terms:
+            count, first = _term_stats(entry, t)
+            score += count
+            if first != -1 and (first_idx == -1 or first < first_idx):
+                first_idx = first
+        if score <= 0:
             continue
+        text = entry["text"]
+        if first_idx != -1:
+            start = max(0, first_idx - 60)
+            end = min(len(text), first_idx + 160)
+            snippet = text[start:end].replace("\n", " ").strip()
+        else:
+            snippet = text[:200].replace("\n", " ").strip()
+        hits.append({
+            "score": score,
+            "file": os.path.basename(fp),
+            "snippet": snippet
+        })
 
     # 6) sort & truncate
     hits.sort(key=lambda h: h["score"], reverse=True)
@@ -4,6 +4,9 @@ from langchain_core.tools import tool
 from langgraph.graph import StateGraph, START, END
 
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
 from states import State
 from tools import web_search, doc_query, doc_ingest
@@ -40,6 +43,25 @@ def llm_node(state: State):
     ))
     ai = llm_with_tools.invoke([system] + msgs)
     return {"messages": [ai]}
+
+
+# per-tool time limits (seconds); web search is the slow one
+TOOL_TIMEOUTS = {"web_search": 15.0, "doc_query": 10.0}
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT_S", "10"))
+
+
+def dispatch_tool(name: str, args: dict) -> dict:
+    try:
+        if name == "web_search":
+            q = args.get("query") or args.get("searchString") or args.get("q") or ""
+            return web_search(q)               # expects {"query": "..."}
+        if name == "doc_query":
+            return doc_query(**args)           # expects {"question": "...", "top_k": 4}
+        return {"ok": False, "error": f"unknown tool: {name}"}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
 def run_tool_node(state: State):
     msgs = state["messages"]
     if not msgs:
@@ -49,24 +71,27 @@ def run_tool_node(state: State):
     if not hasattr(last, "tool_calls") or not last.tool_calls:
         return {}
 
-    tool_call = last.tool_calls[0]  # Day 02: handle first call only
-    name = tool_call["name"]
-    args = tool_call.get("args", {}) or {}
-
-    if name == "web_search":
-        q = args.get("query") or args.get("searchString") or args.get("q") or ""
-        out = web_search(q)               # expects {"query": "..."}
-    elif name == "doc_query":
-        out = doc_query(**args)                # expects {"question": "...", "top_k": 4}
-    else:
-        out = {"ok": False, "error": f"unknown tool: {name}"}
-
-    tmsg = ToolMessage(
-        content=json.dumps(out),
-        name=name,
-        tool_call_id=tool_call["id"],
-    )
-    return {"messages": [tmsg], "steps": state["steps"] + 1}
+    # run all requested tools at once (e.g. web_search + doc_query) -> one LLM round trip
+    start = time.monotonic()
+    # a pool per turn: a timed-out call can't be killed, but its thread then holds
+    # no worker that later turns need; it just finishes in the background
+    pool = ThreadPoolExecutor(max_workers=len(last.tool_calls), thread_name_prefix="tool")
+    futures = [pool.submit(dispatch_tool, tc["name"], tc.get("args", {}) or {}) for tc in last.tool_calls]
+    pool.shutdown(wait=False)
+    out_msgs = []
+    for tool_call, fut in zip(last.tool_calls, futures):
+        name = tool_call["name"]
+        limit = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            out = fut.result(timeout=max(0.0, start + limit - time.monotonic()))
+        except TimeoutError:
+            out = {"ok": False, "error": f"{name} timed out after {limit:g}s"}
+        out_msgs.append(ToolMessage(
+            content=json.dumps(out),
+            name=name,
+            tool_call_id=tool_call["id"],
+        ))
+    return {"messages": out_msgs, "steps": state["steps"] + 1}
 
 def needs_tool(state: State) -> str:
     if state.get("steps", 0) > 5:
@@ -2,10 +2,15 @@ from langchain_tavily import TavilySearch
 
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 
 import os
+import sys
+
+# embeddings live in the repo-level `shared` package (also used by Day03/Day10 memory)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.embeddings import get_embeddings, collection_suffix
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -36,7 +41,7 @@ def web_search(searchString: str) -> dict:
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 INDEX_DIR = os.path.join(os.path.dirname(__file__), "index")
-COLLECTION_NAME = "day02_docs"
+COLLECTION_NAME = "day02_docs" + collection_suffix()  # vector dims differ per backend
 
 # ---- Helpers ----------------------------------------------------------------
 def _load_documents() -> list:
@@ -89,8 +94,8 @@ def _split_documents(docs: list):
     return splitter.split_documents(docs)
 
 def _get_embeddings():
-    """Embedding function that turns text into vectors."""
-    return OpenAIEmbeddings()  # uses OPENAI_API_KEY from env
+    """Embedding function that turns text into vectors (EMBEDDINGS_BACKEND, cached on disk)."""
+    return get_embeddings()
 
 def _get_vectorstore(embeddings):
     """Open (or create) a persistent Chroma collection."""
@@ -9,21 +9,14 @@ import os
 
 from states import State
 from memory import SemanticMemory
+from shared.memory_writer import MemoryWriter  # importable once `memory` has put the repo root on sys.path
+from context import ContextManager
 
 MEMORY_ON = os.getenv("SEMANTIC_ENABLED", "true").lower() == "true"
 MEMORY_K = int(os.getenv("MEMORY_K", "3"))
-MAX_MSG = 4  # short-term buffer size
-
-def trim_messages(messages):
-    """Return (recent_messages, overflow_messages)."""
-    if len(messages) <= MAX_MSG:
-        return messages, []
-    overflow = messages[:-MAX_MSG]
-    recent = messages[-MAX_MSG:]
-    return recent, overflow
 
 def summarize_overflow(llm, overflow_messages, prev_summary: str) -> str:
-    """Return a 2–4 sentence summary of the overflow + previous summary."""
+    """Fold NEW overflow messages into the previous summary (2–4 sentences)."""
     if not overflow_messages:
         return prev_summary
 
@@ -44,68 +37,66 @@ def summarize_overflow(llm, overflow_messages, prev_summary: str) -> str:
 
 llm = init_chat_model("openai:gpt-4.1")
 semantic = SemanticMemory() if MEMORY_ON else None
+# token-budgeted window; overflow is summarized incrementally off the request path
+ctx = ContextManager(summarize=lambda overflow, prev: summarize_overflow(llm, overflow, prev))
+
+
+def extract_fact(user_msg: str, ai_text: str) -> str:
+    """Ask the model for ONE durable fact from the exchange; '' if none."""
+    if not user_msg:
+        return ""
+    extract_prompt = [
+        SystemMessage(content=(
+            "Extract ONE stable user fact or preference from the last exchange, if any. "
+            "It should be useful across sessions (e.g., preferences, identity, projects). "
+            "If none, reply with EXACTLY: NONE."
+        )),
+        HumanMessage(content=f"User said: {user_msg}\nAssistant said: {ai_text}")
+    ]
+    candidate = llm.invoke(extract_prompt).content.strip()
+    if candidate and candidate.upper() != "NONE" and 10 <= len(candidate) <= 240:
+        return candidate
+    return ""
+
+
+# extraction + embedding run in the background so the answer returns right after the main call
+memory_writer = MemoryWriter(
+    extract=extract_fact,
+    store=lambda facts: semantic.add_many(facts, tags=["fact"], confidence=0.7),
+) if MEMORY_ON else None
 
 def llm_node(state: State):
-    # 1) trim to last 8 messages
-    recent, overflow = trim_messages(state["messages"])
-    state["messages"] = recent
-    print(f"[buffer] kept={len(recent)} overflow={len(overflow)}")
-
-    # 2) if we have overflow, update episodic summary
-    if overflow:
-        new_summary = summarize_overflow(llm, overflow, state.get("episodic_summary", ""))
-        state["episodic_summary"] = new_summary
-        print(f"[episodic] summary length={len(new_summary)} chars")
-
-    # 3) build the context the model will see:
-    #    - a SystemMessage with the episodic summary (if any)
-    #    - then the recent messages
-    context = []
-    if state.get("episodic_summary"):
-        context.append(SystemMessage(content=f"Episodic summary: {state['episodic_summary']}"))
-    context += state["messages"]
+    # 1) keep the newest messages that fit the token budget; older ones are
+    #    queued for the background summary (each message is summarized once)
+    if not ctx.summary and state.get("episodic_summary"):
+        ctx.summary = state["episodic_summary"]
+    recent, used = ctx.window(state["messages"])
+    print(f"[buffer] kept={len(recent)} tokens={used}/{ctx.budget} pending={ctx.pending_tokens}")
 
     # find the latest user message
     user_msg = ""
-    for m in reversed(state["messages"]):
+    for m in reversed(recent):
         if isinstance(m, HumanMessage):
             user_msg = m.content
             break
 
-    # retrieve top-k semantic memories
+    # 2) retrieve top-k semantic memories
     mem_lines = []
     if MEMORY_ON and user_msg:
         hits = semantic.search(user_msg, k=MEMORY_K)
         if hits:
             mem_lines = [f"- {h}" for h in hits]
 
-    # construct context: episodic summary (if you built it earlier), then memories, then recent messages
-    system_bits = []
-    if state.get("episodic_summary"):
-        system_bits.append(f"Episodic summary: {state['episodic_summary']}")
-    if mem_lines:
-        system_bits.append("Known user context:\n" + "\n".join(mem_lines))
-
-    preface = "\n\n".join(system_bits).strip()
-    context = ([SystemMessage(content=preface)] if preface else []) + state["messages"]
+    # 3) context = cached preface (episodic summary + memories), then recent messages
+    preface = ctx.preface(mem_lines)
+    context = ([preface] if preface else []) + recent
 
     ai = llm.invoke(context)
-    if MEMORY_ON:
-        # ask the model to extract ONE durable fact, or say NONE
-        extract_prompt = [
-            SystemMessage(content=(
-                "Extract ONE stable user fact or preference from the last exchange, if any. "
-                "It should be useful across sessions (e.g., preferences, identity, projects). "
-                "If none, reply with EXACTLY: NONE."
-            )),
-            HumanMessage(content=f"User said: {user_msg}\nAssistant said: {ai.content}")
-        ]
-        candidate = llm.invoke(extract_prompt).content.strip()
-        if candidate and candidate.upper() != "NONE" and 10 <= len(candidate) <= 240:
-            semantic.add(candidate, tags=["fact"], confidence=0.7)
-
+    if MEMORY_ON and user_msg:
+        # fact extraction happens on the background writer, not on this turn
+        memory_writer.submit(user_msg, ai.content)
 
-    return {"messages": [ai], "episodic_summary": state.get("episodic_summary", "")}
+    return {"messages": [ai], "episodic_summary": ctx.summary}
 
 
 # wire a trivial graph
@@ -121,6 +112,9 @@ if __name__ == "__main__":
     while True:
         text = input("You: ").strip()
         if text.lower() in {"exit", "quit"}:
+            if memory_writer:
+                memory_writer.flush()
+            ctx.flush()
             break
         state["messages"].append(HumanMessage(content=text))
         state = graph.invoke(state)
@@ -0,0 +1,147 @@
+# Day03/context.py
+"""Token-budgeted context window with incremental background summaries.
+
+- Recent messages are kept newest-first until CONTEXT_TOKENS is reached
+  (counted with tiktoken, which ships with langchain-openai; a rough
+  regex estimate is used if it is missing).
+- Messages that fall out of the window are only *new* overflow once: they
+  queue up as pending, and when pending reaches SUMMARY_TRIGGER_TOKENS a
+  background job folds just those messages into the running summary.
+  The turn never waits on it; the next turn picks the new summary up.
+- The rendered system preface is cached and rebuilt only when the summary
+  or the retrieved memories change.
+"""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.messages import SystemMessage
+
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", "1500"))
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "600"))
+PER_MESSAGE_OVERHEAD = 4  # role/format tokens per chat message
+
+try:
+    import tiktoken
+    _enc = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken missing or encoding not cached offline
+    _enc = None
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _enc is not None:
+        return len(_enc.encode(text, disallowed_special=()))
+    # ~1.3 tokens per word-ish piece is close enough for budgeting
+    return int(len(_TOKEN_RE.findall(text)) * 1.3) + 1
+
+
+def message_tokens(m) -> int:
+    return count_tokens(str(getattr(m, "content", "") or "")) + PER_MESSAGE_OVERHEAD
+
+
+class ContextManager:
+    def __init__(self, summarize: Callable[[list, str], str],
+                 budget: int = CONTEXT_TOKENS, trigger: int = SUMMARY_TRIGGER_TOKENS):
+        self.summarize = summarize          # (new_overflow_messages, prev_summary) -> summary
+        self.budget = budget
+        self.trigger = trigger
+        self.summary = ""
+        self.consumed = 0                   # messages[:consumed] are summarized or pending
+        self.pending: list = []
+        self.pending_tokens = 0
+        self._tok_cache: dict = {}          # id(message) -> tokens (messages are immutable here)
+        self._preface_key: Optional[Tuple] = None
+        self._preface: Optional[SystemMessage] = None
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="episodic")
+        self._job = None
+
+    def _tokens(self, m) -> int:
+        key = id(m)
+        hit = self._tok_cache.get(key)
+        if hit is None or hit[0] is not m:
+            hit = (m, message_tokens(m))
+            self._tok_cache[key] = hit
+        return hit[1]
+
+    def window(self, messages: list) -> Tuple[list, int]:
+        """Newest messages that fit the budget (always at least the last one)."""
+        if len(messages) < self.consumed:   # history was reset/cleared
+            self.reset()
+        used, start = 0, len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            t = self._tokens(messages[i])
+            if used + t > self.budget and start < len(messages):
+                break
+            used += t
+            start = i
+        self._queue_overflow(messages[self.consumed:start])
+        self.consumed = max(self.consumed, start)
+        # drop token-cache entries for messages that left the window
+        live = {id(m) for m in messages[start:]}
+        self._tok_cache = {k: v for k, v in self._tok_cache.items() if k in live}
+        return messages[start:], used
+
+    def _queue_overflow(self, new_overflow: list) -> None:
+        if not new_overflow:
+            return
+        with self._lock:
+            self.pending.extend(new_overflow)
+            self.pending_tokens += sum(message_tokens(m) for m in new_overflow)
+            self._maybe_submit()
+
+    def _maybe_submit(self) -> None:
+        # caller holds self._lock; one summary job at a time
+        if self.pending_tokens >= self.trigger and (self._job is None or self._job.done()):
+            batch, self.pending, self.pending_tokens = self.pending, [], 0
+            self._job = self._pool.submit(self._fold, batch)
+            print(f"[episodic] summarizing {len(batch)} message(s) in background")
+
+    def _fold(self, batch: list) -> None:
+        prev = self.summary
+        try:
+            new = self.summarize(batch, prev)
+        except Exception as e:
+            print(f"[episodic] summary failed: {e}")
+            with self._lock:
+                self.pending = batch + self.pending  # retry with the next trigger
+                self.pending_tokens += sum(message_tokens(m) for m in batch)
+            return
+        with self._lock:
+            self.summary = new
+            self._job = None
+            self._maybe_submit()  # overflow that piled up while we were busy
+        print(f"[episodic] summary length={len(new)} chars")
+
+    def preface(self, mem_lines: List[str]) -> Optional[SystemMessage]:
+        """System message with the summary + memories, cached across turns."""
+        key = (self.summary, tuple(mem_lines))
+        if key != self._preface_key:
+            bits = []
+            if self.summary:
+                bits.append(f"Episodic summary: {self.summary}")
+            if mem_lines:
+                bits.append("Known user context:\n" + "\n".join(mem_lines))
+            text = "\n\n".join(bits).strip()
+            self._preface = SystemMessage(content=text) if text else None
+            self._preface_key = key
+        return self._preface
+
+    def flush(self, timeout: float = 30.0) -> None:
+        """Wait for an in-flight summary (e.g. before exit)."""
+        job = self._job
+        while job is not None:
+            job.result(timeout=timeout)
+            job = None if self._job is job else self._job
+
+    def reset(self) -> None:
+        with self._lock:
+            self.summary, self.consumed, self.pending, self.pending_tokens = "", 0, [], 0
+            self._tok_cache.clear()
+            self._preface_key = self._preface = None
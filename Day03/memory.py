@@ -1,58 +1,135 @@
 # Day03/memory.py
-import os, time
+import os, sys, threading, time, uuid
+from collections import Counter
 from typing import List
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+import numpy as np
+# the embedding provider (+ on-disk cache) lives in the repo-level `shared` package; make the repo root importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.embeddings import get_embeddings, collection_suffix
+from shared.memory_hygiene import DEDUP_SIM, consolidation_plan, merge_duplicate, unit as _unit
 
 MEM_INDEX_DIR = os.path.join(os.path.dirname(__file__), "mem_index")
-MEM_COLLECTION = "day03_semantic"
+MEM_COLLECTION = "day03_semantic" + collection_suffix()
+MEMORY_STORE = os.getenv("MEMORY_STORE", "chroma").lower()   # chroma | numpy
+
+# Forgetting & size control (see memory_policy.md §7); dedup, scoring and
+# consolidation are shared with Day10 in shared/memory_hygiene.py
+MEMORY_CAP = int(os.getenv("MEMORY_CAP", "200"))
+CONSOLIDATE_EVERY = int(os.getenv("MEMORY_CONSOLIDATE_EVERY", "20"))
+
 
 class SemanticMemory:
     def __init__(self):
         os.makedirs(MEM_INDEX_DIR, exist_ok=True)
-        self.emb = OpenAIEmbeddings()
-        self.db = Chroma(
-            collection_name=MEM_COLLECTION,
-            persist_directory=MEM_INDEX_DIR,
-            embedding_function=self.emb,
-        )
+        self.emb = get_embeddings()
+        if MEMORY_STORE == "numpy":
+            from shared.vector_index import NumpyIndex   # memmap flat/IVF index, same collection API
+            self.col = NumpyIndex(os.path.join(MEM_INDEX_DIR, MEM_COLLECTION))
+        else:
+            from langchain_chroma import Chroma
+            self.db = Chroma(
+                collection_name=MEM_COLLECTION,
+                persist_directory=MEM_INDEX_DIR,
+                embedding_function=self.emb,
+            )
+            self.col = self.db._collection
+        self._lock = threading.RLock()  # background writer + request path share this store
+        self._hits = Counter()          # id -> retrievals, persisted on consolidate()
+        self._since_consolidate = 0
 
     def count(self) -> int:
         # quick sanity check helper (optional)
         try:
-            return self.db._collection.count()  # works with chroma client used by LC
+            return self.col.count()  # works with chroma client used by LC
         except Exception:
             return 0
 
     def add(self, text: str, tags=None, confidence: float = 0.7):
-        text = (text or "").strip()
-        if not text:
-            return
+        self.add_many([text], tags=tags, confidence=confidence)
 
-        # Ensure primitives-only metadata
-        if tags is None:
-            tags_str = ""
-        elif isinstance(tags, (list, tuple)):
-            # Option A: comma-separated
-            tags_str = ",".join(map(str, tags))
-            # Option B (alternative): JSON string
-            # tags_str = json.dumps(list(tags))
-        else:
-            tags_str = str(tags)
+    def add_many(self, texts: List[str], tags=None, confidence: float = 0.7):
+        """Store several facts with a single embeddings request.
 
-        meta = {
-            "tags": tags_str,               # <-- primitive string
-            "confidence": float(confidence),
-            "created_at": int(time.time()),
-        }
-        self.db.add_texts([text], metadatas=[meta])
+        Near-duplicates of an existing item (cosine >= DEDUP_SIM) are merged into it:
+        the newer text and vector replace the old ones, confidence goes up by 0.1,
+        tags are unioned and updated_at is refreshed; nothing new is inserted.
+        """
+        texts = list(dict.fromkeys(t.strip() for t in texts or [] if t and t.strip()))
+        if not texts:
+            return
+        # Ensure primitives-only metadata
+        tags_str = ",".join(map(str, tags)) if isinstance(tags, (list, tuple)) else str(tags or "")
+        now = int(time.time())
+        col = self.col
+        vecs = _unit(self.emb.embed_documents(texts))
+        merged = 0
+        with self._lock:
+            ids, docs, embs, metas = [], [], [], []
+            for text, vec in zip(texts, vecs):
+                if embs and float(np.max(_unit(embs) @ vec)) >= DEDUP_SIM:
+                    merged += 1  # duplicate inside this batch
+                    continue
+                if col.count():
+                    res = col.query(query_embeddings=[vec.tolist()], n_results=1, include=["embeddings", "metadatas"])
+                    near_id = res["ids"][0][0]
+                    sim = float(_unit(res["embeddings"][0][0])[0] @ vec)
+                    if sim >= DEDUP_SIM:
+                        # the newer wording wins: a changed preference replaces the stale text
+                        meta = merge_duplicate(res["metadatas"][0][0], confidence, tags_str, now)
+                        col.update(ids=[near_id], documents=[text], embeddings=[vec.tolist()], metadatas=[meta])
+                        merged += 1
+                        continue
+                ids.append(str(uuid.uuid4()))
+                docs.append(text)
+                embs.append(vec)
+                metas.append({
+                    "tags": tags_str,               # <-- primitive string
+                    "confidence": float(confidence),
+                    "created_at": now,
+                    "updated_at": now,
+                    "hits": 0,
+                })
+            if ids:
+                col.add(ids=ids, documents=docs, embeddings=[v.tolist() for v in embs], metadatas=metas)
+            self._since_consolidate += len(ids)
+            if self._since_consolidate >= CONSOLIDATE_EVERY or col.count() > MEMORY_CAP:
+                self.consolidate()
+        if merged:
+            print(f"[memory] merged {merged} near-duplicate fact(s)")
 
     def search(self, query: str, k: int = 3) -> list[str]:
         query = (query or "").strip()
         if not query:
             return []
-        docs = self.db.similarity_search(query, k=max(1, int(k)))
-        return [d.page_content for d in docs]
+        res = self.col.query(
+            query_embeddings=[self.emb.embed_query(query)], n_results=max(1, int(k)), include=["documents"]
+        )
+        with self._lock:
+            self._hits.update(res["ids"][0])
+        return list(res["documents"][0])
+
+    def consolidate(self):
+        """Merge near-duplicate clusters, fold in hit counts, evict lowest scores above MEMORY_CAP."""
+        col = self.col
+        with self._lock:
+            self._since_consolidate = 0
+            data = col.get(include=["embeddings", "metadatas"])
+            ids = list(data["ids"])
+            if not ids:
+                self._hits.clear()
+                return {"merged": 0, "evicted": 0}
+            metas = [dict(m or {}) for m in data["metadatas"]]
+            for m, _id in zip(metas, ids):
+                m["hits"] = int(m.get("hits") or 0) + self._hits.pop(_id, 0)
+            self._hits.clear()
+            drop, live, merged, evicted = consolidation_plan(ids, metas, data["embeddings"], MEMORY_CAP, DEDUP_SIM)
+            if drop:
+                col.delete(ids=drop)
+            if live:
+                col.update(ids=[ids[i] for i in live], metadatas=[metas[i] for i in live])
+        if merged or evicted:
+            print(f"[memory] consolidate merged={merged} evicted={evicted} kept={len(live)}")
+        return {"merged": merged, "evicted": evicted}
@@ -1,13 +1,25 @@
 # Day04/mcp-server/server.py
 from mcp.server.fastmcp import FastMCP
-import shlex, subprocess
+import asyncio, shlex
 from typing import List, Dict
-import os, re
+import os, sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from shared.docsearch import DocIndex
 
 mcp = FastMCP("My Demo MCP")
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+docs = DocIndex(DATA_DIR)  # incremental index, re-stat'ed at most every DOCSEARCH_REFRESH_S
 AUTH_TOKEN = os.environ.get("MCP_AUTH_TOKEN", "")
 
+# Tools are async: file scanning runs in a worker thread and subprocesses are
+# awaited, so one slow call no longer blocks the others. Each tool gets its
+# own concurrency cap.
+TOOL_LIMITS = {
+    "search_local_docs": asyncio.Semaphore(int(os.environ.get("MCP_SEARCH_CONCURRENCY", "8"))),
+    "run_shell_safe": asyncio.Semaphore(int(os.environ.get("MCP_SHELL_CONCURRENCY", "4"))),
+}
+
 def _auth_ok(meta: dict | None) -> bool:
     # FastMCP passes request metadata via thread-local context; easiest hack:
     # require the token at process start (env variable)
@@ -23,27 +35,8 @@ def _require_auth() -> Dict | None:
         return {"error": "unauthorized: server missing MCP_AUTH_TOKEN"}
     return None
 
-def _iter_files():
-    print(print(DATA_DIR))
-    for root, _, files in os.walk(DATA_DIR):
-        for fn in files:
-            if any(fn.endswith(ext) for ext in (".md", ".txt", ".py")):
-                yield os.path.join(root, fn)
-
-def _score_hit(text: str, query: str) -> int:
-    # naive score = count of case-insensitive keyword occurrences
-    return len(re.findall(re.escape(query), text, flags=re.IGNORECASE))
-
-def _snippet(text: str, query: str, size: int = 160) -> str:
-    m = re.search(re.escape(query), text, re.IGNORECASE)
-    if not m:
-        return text[:size]
-    i = max(0, m.start() - size // 2)
-    j = i + size
-    return text[i:j].replace("\n", " ")
-
 @mcp.tool()
-def search_local_docs(query: str, top_k: int = 3) -> List[Dict]:
+async def search_local_docs(query: str, top_k: int = 3) -> List[Dict]:
     """Search ./data for a keyword and return top snippets."""
     err = _require_auth()
     if err:
@@ -51,29 +44,14 @@ def search_local_docs(query: str, top_k: int = 3) -> List[Dict]:
     query = (query or "").strip()
     if not query:
         return [{"error": "missing query"}]
-    results = []
-    for path in _iter_files():
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
-        except Exception:
-            continue
-        score = _score_hit(text, query)
-        if score > 0:
-            results.append({
-                "title": os.path.basename(path),
-                "snippet": _snippet(text, query),
-                "path": os.path.relpath(path, DATA_DIR),
-                "score": score,
-            })
-    results.sort(key=lambda r: r["score"], reverse=True)
-    return results[: max(1, int(top_k))]
+    async with TOOL_LIMITS["search_local_docs"]:
+        return await asyncio.to_thread(docs.search, query, max(1, int(top_k)))
 
 
 BLOCKED_PATTERNS = ("|", "&&", ";", ">", "<", "`", "$(", "*", "sudo", "rm", "chmod", "chown")
 
 @mcp.tool()
-def run_shell_safe(cmd: str, timeout_s: int = 3) -> Dict:
+async def run_shell_safe(cmd: str, timeout_s: int = 3) -> Dict:
     """Run whitelisted shell commands: echo, ls. Reject anything else."""
     err = _require_auth()
     if err:
@@ -93,20 +71,25 @@ def run_shell_safe(cmd: str, timeout_s: int = 3) -> Dict:
     if parts[0] not in allowed:
         return {"error": f"command '{parts[0]}' not allowed"}
 
-    try:
-        p = subprocess.run(
-            parts,
-            capture_output=True,
-            text=True,
-            timeout=max(1, int(timeout_s)),
-            check=False,
-        )
-    except subprocess.TimeoutExpired:
-        return {"error": "timeout"}
-    except Exception as e:
-        return {"error": str(e)}
-
-    out = (p.stdout or "") + (("\nERR:\n" + p.stderr) if p.stderr else "")
+    async with TOOL_LIMITS["run_shell_safe"]:
+        try:
+            p = await asyncio.create_subprocess_exec(
+                *parts,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except Exception as e:
+            return {"error": str(e)}
+        try:
+            stdout, stderr = await asyncio.wait_for(p.communicate(), timeout=max(1, int(timeout_s)))
+        except asyncio.TimeoutError:
+            p.kill()
+            await p.wait()
+            return {"error": "timeout"}
+
+    stdout = stdout.decode("utf-8", errors="replace")
+    stderr = stderr.decode("utf-8", errors="replace")
+    out = stdout + (("\nERR:\n" + stderr) if stderr else "")
     # trim to keep responses small/safe
     if len(out) > 2000:
         out = out[:2000] + "\n…(truncated)"
@@ -2,17 +2,22 @@
 import asyncio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-import os
+import os, sys
 
-async def main():
+SERVER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MCP-server", "server.py")
+
+def make_server_params() -> StdioServerParameters:
     # Point to your server command
     token = os.environ.get("MCP_AUTH_TOKEN", "dev-secret-123")
-    server_params = StdioServerParameters(
-        command="python",
-        args=["Day04/mcp-server/server.py"],
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[SERVER_PATH],
         env={"MCP_AUTH_TOKEN": token},
     )
 
+async def main():
+    server_params = make_server_params()
+
     # Open stdio connection to the server
     async with stdio_client(server_params) as (read, write):
         # Create a session over those streams
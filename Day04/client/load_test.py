@@ -0,0 +1,71 @@
+# Day04/client/load_test.py
+"""Fire concurrent tool calls at the MCP server over one stdio session.
+
+    python Day04/client/load_test.py --tool search_local_docs --requests 200 --concurrency 20
+    python Day04/client/load_test.py --tool run_shell_safe --requests 50 --concurrency 10
+    python Day04/client/load_test.py --tool mixed
+"""
+import argparse
+import asyncio
+import time
+
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client
+
+from client import make_server_params  # same folder; launches the server over stdio
+
+CALLS = {
+    "search_local_docs": ("search_local_docs", {"query": "MCP", "top_k": 3}),
+    "run_shell_safe": ("run_shell_safe", {"cmd": "echo hello"}),
+}
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+async def run(tool: str, requests: int, concurrency: int):
+    names = list(CALLS) if tool == "mixed" else [tool]
+    latencies, errors = [], 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async with stdio_client(make_server_params()) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            async def one(i: int):
+                nonlocal errors
+                name, args = CALLS[names[i % len(names)]]
+                async with limit:
+                    t0 = time.perf_counter()
+                    try:
+                        res = await session.call_tool(name, args)
+                        if getattr(res, "isError", False):
+                            errors += 1
+                    except Exception:
+                        errors += 1
+                    latencies.append((time.perf_counter() - t0) * 1000)
+
+            await one(0)  # warm-up (index build, first subprocess)
+            latencies.clear()
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            wall = time.perf_counter() - t0
+
+    print(f"tool={tool} requests={requests} concurrency={concurrency}")
+    print(f"  {requests / wall:.1f} calls/s  wall={wall * 1000:.0f} ms  errors={errors}")
+    print(f"  latency p50={pct(latencies, 50):.1f} ms  p95={pct(latencies, 95):.1f} ms  max={max(latencies):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the Day 04 MCP server")
+    parser.add_argument("--tool", choices=[*CALLS, "mixed"], default="mixed")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.tool, args.requests, max(1, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,29 @@ from dotenv import load_dotenv
 
 load_dotenv()  # load OPENAI_API_KEY if present
 
-from planner import make_plan
-from executor import execute_plan, save_plan
+# Stream the planner reply and start s1 before the whole plan is generated
+PLAN_STREAM = os.getenv("PLAN_STREAM", "1") != "0"
+
+from planner import make_plan, start_plan
+from plan_cache import PLAN_CACHE
+from executor import execute_plan
+from journal import journal
+from tool_registry import cache_stats
 from reflector import reflect
 
-def run_task(task: str, max_reflect_cycles: int = 2):
+def run_task(task: str, max_reflect_cycles: int = 2, use_plan_cache: bool = PLAN_CACHE,
+             stream: bool = PLAN_STREAM):
     print(f"Task: {task}\n")
-    plan = make_plan(task)
-    print("Plan generated.")
-    # First execution
-    plan, last = execute_plan(plan)
+    if stream:
+        # First execution overlaps plan generation (a cached plan has no stream)
+        plan, steps_stream = start_plan(task, use_cache=use_plan_cache)
+        print("Plan streaming." if steps_stream else "Plan generated.")
+        plan, last = execute_plan(plan, incoming=steps_stream)
+    else:
+        plan = make_plan(task, use_cache=use_plan_cache)
+        print("Plan generated.")
+        # First execution
+        plan, last = execute_plan(plan)
 
     cycles = 0
     while cycles < max_reflect_cycles:
@@ -27,12 +40,14 @@ def run_task(task: str, max_reflect_cycles: int = 2):
         plan, last = execute_plan(plan)
         cycles += 1
 
-    path = save_plan(plan, suffix="final")
-    print(f"\nSaved executed plan: {path}")
-
-    # Final short summary
     steps = plan.get("steps", [])
     failures = [s for s in steps if s.get("status") != "ok"]
+    journal.event(plan, "final", ok=not failures)
+    journal.flush()
+    print(f"Tool cache: {cache_stats()}")
+    print(f"\nRun journal: {journal.path(plan)}  (replay: python Day05/journal.py)")
+
+    # Final short summary
     if failures:
         last_failed = failures[-1]
         print("Outcome: ❌ failure")
@@ -47,6 +62,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Day 05 Planner→Executor→Reflector agent")
     parser.add_argument("--task", type=str, required=True, help='Task, e.g. "Compute 12*(3+4) and write it into answer.txt"')
     parser.add_argument("--reflect-cycles", type=int, default=2, help="Max reflector cycles")
+    parser.add_argument("--no-plan-cache", action="store_true", help="Always ask the planner LLM")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for the full plan before executing")
     args = parser.parse_args()
 
-    run_task(args.task, max_reflect_cycles=args.reflect_cycles)
+    run_task(args.task, max_reflect_cycles=args.reflect_cycles,
+             use_plan_cache=not args.no_plan_cache, stream=PLAN_STREAM and not args.no_stream)
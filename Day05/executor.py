@@ -1,14 +1,17 @@
 # Day05/executor.py
 from __future__ import annotations
 import json, os, re, time
-from copy import deepcopy
-from typing import Any, Dict, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Tuple
 
-from tool_registry import TOOLS, get as get_tool
-from plan_schema import Plan
+from tool_registry import TOOLS, call as call_tool, get as get_tool
+from plan_schema import Plan, Step
+from journal import journal, run_id
 
-PLANS_DIR = os.path.join(os.path.dirname(__file__), "plans")
-os.makedirs(PLANS_DIR, exist_ok=True)
+# Independent steps (no template reference between them) run concurrently
+EXEC_WORKERS = int(os.getenv("EXEC_WORKERS", "4"))
+_pool = ThreadPoolExecutor(max_workers=EXEC_WORKERS, thread_name_prefix="step")
+_stream_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-stream")
 
 # -------- templating: {{s1.result}} or {{last.result}} ----------
 RESULT_PATTERN = re.compile(r"\{\{\s*(s\d+|last)\.result\s*\}\}")
@@ -49,100 +52,248 @@ def _render_inputs(inputs: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any
             rendered[k] = _render_value(v, ctx)
     return rendered
 
-# -------- plan persistence ----------
-def save_plan(plan: Plan, suffix: str = "") -> str:
-    ts = plan.get("created_at", "run")
-    safe_ts = ts.replace(":", "-").replace(" ", "_")
-    name = f"{safe_ts}{('-' + suffix) if suffix else ''}.json"
-    path = os.path.join(PLANS_DIR, name)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(plan, f, indent=2, ensure_ascii=False)
-    return path
+# -------- dependency analysis ----------
+def _refs(val: Any) -> set:
+    """Step ids referenced by templates anywhere inside an input value."""
+    if isinstance(val, dict):
+        return set().union(*(_refs(v) for v in val.values())) if val else set()
+    if isinstance(val, list):
+        return set().union(*(_refs(v) for v in val)) if val else set()
+    if isinstance(val, str):
+        return set(RESULT_PATTERN.findall(val)) | set(ANGLE_RESULT_PATTERN.findall(val))
+    return set()
+
+
+def step_dependencies(steps: list) -> List[set]:
+    """
+    deps[i] = indices of earlier steps whose results step i renders.
+    `last` means the previous step. References to unknown or later steps
+    render as "" (same as sequential execution), so the graph is always a DAG.
+    Steps whose tool is not `pure` also wait for the previous non-pure step, so
+    side effects (e.g. two writes to one file) keep plan order.
+    """
+    index: Dict[str, int] = {}
+    deps = []
+    for i, step in enumerate(steps):
+        index.setdefault(step.get("id", f"s{i+1}"), i)
+        deps.append(_step_deps(i, step, index, steps))
+    return deps
+
+
+def _is_pure(step: Dict[str, Any]) -> bool:
+    return TOOLS.get(step.get("tool"), {}).get("kind") == "pure"
+
+
+def _is_side_effecting(step: Dict[str, Any]) -> bool:
+    return TOOLS.get(step.get("tool"), {}).get("kind", "side_effecting") not in ("pure", "idempotent")
+
+
+_STEP_FIELDS = ("id", "tool", "input", "expect", "on_fail", "retries")
+
+
+def _reconcile(plan: Plan, final: Plan) -> None:
+    """
+    Make the executed plan match the fully validated one from the planner stream:
+    task/created_at and any steps past max_total_steps come from `final`; an
+    executed step whose definition differs is rewritten and marked for a re-run.
+    """
+    plan["task"], plan["created_at"] = final["task"], final["created_at"]
+    for i, want in enumerate(final["steps"]):
+        if i >= len(plan["steps"]):
+            plan["steps"].append(dict(want))
+            continue
+        have = plan["steps"][i]
+        changed = [k for k in _STEP_FIELDS if have.get(k) != want.get(k)]
+        if changed:
+            have.update({k: want[k] for k in _STEP_FIELDS if k in want})
+            if have.get("status") is not None:
+                have["status"] = "error"
+                have["error"] = f"step changed after validation ({', '.join(changed)})"
+            entry = {"step": have["id"], "reconciled": changed}
+            plan["logs"].append(entry)
+            journal.log(plan, entry)
+
+
+def _step_deps(i: int, step: Dict[str, Any], index: Dict[str, int], steps: list) -> set:
+    d = set()
+    for ref in _refs(step.get("input", {})):
+        j = i - 1 if ref == "last" else index.get(ref, i)
+        if 0 <= j < i:
+            d.add(j)
+    if not _is_pure(step):
+        prev = next((j for j in range(i - 1, -1, -1) if not _is_pure(steps[j])), None)
+        if prev is not None:
+            d.add(prev)
+    return d
+
+
+def _call_tool(tool_name: str, inputs: Dict[str, Any], scope: str) -> Tuple[Any, float, str]:
+    t0 = time.time()
+    try:
+        output, cache = call_tool(tool_name, inputs, scope=scope)
+    except Exception as e:
+        output, cache = {"ok": False, "error": str(e)}, "miss"
+    return output, round((time.time() - t0) * 1000, 1), cache
 
 # -------- executor ----------
-def execute_plan(plan: Plan, max_total_steps: int = 6) -> Tuple[Plan, Dict[str, Any] | None]:
+def execute_plan(plan: Plan, max_total_steps: int = 6,
+                 incoming: Iterable[Step] | None = None) -> Tuple[Plan, Dict[str, Any] | None]:
     """
-    Execute steps in order.
+    Execute steps as a DAG built from their {{sN.result}} / <result of sN> references.
+    - Steps whose dependencies are done run concurrently on a thread pool
     - Applies simple templating from prior results
-    - Calls the tool function
+    - Calls tools through tool_registry.call (memoized by tool kind)
     - Records status/timings/results on each step
-    - Persists plan after each step
-    Returns: (updated_plan, last_result_dict or None)
+    - Journals step deltas + logs in step order (see journal.py), so results are deterministic
+    - After a failure no new steps start; steps already in flight finish
+    - `incoming` (e.g. planner.PlanStream) appends steps while they are still
+      being generated; each one is scheduled as soon as its dependencies allow,
+      except side-effecting steps, which wait until the whole plan has been
+      validated. If validation fails they never run. The executed plan is then
+      reconciled with the validated `incoming.plan`
+    Returns: (updated_plan, output of the first failed step, else of the last step)
     """
-    plan = deepcopy(plan)  # don’t mutate original
-    steps = plan.get("steps", [])[: max_total_steps]
+    # don’t mutate the caller's plan; steps are the only dicts we write into
+    plan = {**plan, "steps": [dict(s) for s in plan.get("steps", [])], "logs": list(plan.get("logs", []))}
+    steps = plan["steps"][: max_total_steps]
+    journal.begin(plan)
+    ids = [step.get("id", f"s{i}") for i, step in enumerate(steps, start=1)]
+    deps = step_dependencies(steps)
+    index = {step_id: i for i, step_id in reversed(list(enumerate(ids)))}
     ctx: Dict[str, Any] = {}           # per-step results live here, keyed by step id
-    last_output: Dict[str, Any] | None = None
-
-    for i, step in enumerate(steps, start=1):
-        step_id = step.get("id", f"s{i}")
-        tool_name = step["tool"]
-        raw_inputs = step.get("input", {})
-        plan.setdefault("logs", [])
-        step["status"] = "running"
-        step["attempts"] = step.get("attempts", 0) + 1
-        step["started_at"] = time.time()
-
-        # Render inputs using previous results
-        ctx["_last_step_id"] = steps[i-2]["id"] if i > 1 else ""
-        inputs = _render_inputs(raw_inputs, ctx)
-
-        # Resolve function
-        fn = TOOLS.get(tool_name, {}).get("fn")
-        if fn is None:
-            step["status"] = "error"
-            step["error"] = f"unknown tool: {tool_name}"
-            plan["logs"].append({"step": step_id, "tool": tool_name, "error": step["error"]})
-            save_plan(plan, suffix=f"{step_id}-error")
-            break
+    outputs: Dict[int, Any] = {}       # index -> tool output, for finished steps
+    ok: set = set()
+    pending = list(range(len(steps)))
+    running: Dict[Any, int] = {}       # future -> step index
+    failed: int | None = None
+    committed = 0                      # steps[:committed] are logged + journaled
+    stream = iter(incoming) if incoming is not None else None
+    arrival = _stream_pool.submit(next, stream, None) if stream is not None else None
+    stream_error: Exception | None = None
+    run_cache = {"hit": 0, "miss": 0, "bypass": 0}  # this call's tool-cache outcomes
 
-        # Call tool with timing
-        t0 = time.time()
-        try:
-            output = fn(**inputs)
-        except Exception as e:
-            output = {"ok": False, "error": str(e)}
-        elapsed = round((time.time() - t0) * 1000, 1)
-
-        # Record outputs
-        step["finished_at"] = time.time()
-        step["elapsed_ms"] = elapsed
-        step["input_rendered"] = inputs
-        step["output"] = output
-
-        # Consider anything "ok" unless the tool explicitly returns {"ok": False}
-        is_ok = True
-        if isinstance(output, dict):
-            if output.get("ok", True) is False:
-                is_ok = False
-        step["status"] = "ok" if is_ok else "error"
-
-        # Normalize a "result" for chaining
-        if isinstance(output, dict) and "result" in output:
-            res = output["result"]
-        elif isinstance(output, (str, int, float)):
-            res = output
-        else:
-            # list, None, or any other structure → stringify (preserve unicode)
-            res = json.dumps(output, ensure_ascii=False)[:500]
-        step["result"] = res
-
-
-        # Write to ctx for placeholders
-        ctx[step_id] = {"result": step["result"], "output": output}
-        last_output = output
-
-        # Log + persist
-        plan["logs"].append({
-            "step": step_id,
-            "tool": tool_name,
-            "ok": step["status"] == "ok",
-            "elapsed_ms": elapsed,
-        })
-        save_plan(plan, suffix=step_id)
-
-        # Stop early if a step failed (reflector will decide what to do next)
-        if step["status"] != "ok":
+    def _commit(final: bool = False) -> None:
+        # log + journal finished steps in plan order; at the end, skip steps that never ran
+        nonlocal committed
+        while committed < len(steps):
+            i = committed
+            if i in outputs:
+                entry = {
+                    "step": ids[i],
+                    "tool": steps[i]["tool"],
+                    "ok": steps[i]["status"] == "ok",
+                    "elapsed_ms": steps[i]["elapsed_ms"],
+                    "cache": steps[i]["cache"],
+                }
+                plan["logs"].append(entry)
+                journal.step(plan, i)
+                journal.log(plan, entry)
+            elif not final:
+                break
+            committed += 1
+
+    while pending or running or arrival:
+        # Start every step whose dependencies have succeeded (main thread renders inputs)
+        # side-effecting steps wait for the stream to end, i.e. for the whole plan to validate
+        plan_open = stream is not None and (arrival is not None or stream_error is not None)
+        for i in [i for i in pending if failed is None and stream_error is None and deps[i] <= ok
+                  and not (plan_open and _is_side_effecting(steps[i]))]:
+            pending.remove(i)
+            step, step_id, tool_name = steps[i], ids[i], steps[i]["tool"]
+            step["status"] = "running"
+            step["attempts"] = step.get("attempts", 0) + 1
+            step["started_at"] = time.time()
+
+            # Render inputs using previous results
+            ctx["_last_step_id"] = ids[i - 1] if i > 0 else ""
+            inputs = _render_inputs(step.get("input", {}), ctx)
+            step["input_rendered"] = inputs
+
+            # Resolve function
+            fn = TOOLS.get(tool_name, {}).get("fn")
+            if fn is None:
+                step["status"] = "error"
+                step["error"] = f"unknown tool: {tool_name}"
+                entry = {"step": step_id, "tool": tool_name, "error": step["error"]}
+                plan["logs"].append(entry)
+                journal.step(plan, i)
+                journal.log(plan, entry)
+                failed = i
+                break
+            running[_pool.submit(_call_tool, tool_name, inputs, run_id(plan))] = i
+
+        if not running and arrival is None:
             break
+        finished, _ = wait([*running, *([arrival] if arrival else [])], return_when=FIRST_COMPLETED)
+        if arrival in finished:
+            try:
+                new_step = arrival.result()
+            except Exception as e:
+                stream_error, new_step = e, None
+            arrival = None
+            if new_step is not None:
+                # keep draining the stream even past max_total_steps (the planner finishes anyway)
+                arrival = _stream_pool.submit(next, stream, None)
+                if len(steps) < max_total_steps:
+                    new_step = dict(new_step)
+                    i = len(steps)
+                    steps.append(new_step)
+                    if steps is not plan["steps"]:
+                        plan["steps"].append(new_step)
+                    ids.append(new_step.get("id", f"s{i+1}"))
+                    index.setdefault(ids[i], i)
+                    deps.append(_step_deps(i, new_step, index, steps))
+                    pending.append(i)
+                    journal.step(plan, i)
+        for fut in sorted((f for f in finished if f in running), key=running.get):
+            i = running.pop(fut)
+            step = steps[i]
+            output, elapsed, cache = fut.result()
+
+            # Record outputs
+            step["finished_at"] = time.time()
+            step["elapsed_ms"] = elapsed
+            step["cache"] = cache
+            step["output"] = output
+            run_cache[cache] = run_cache.get(cache, 0) + 1
+
+            # Consider anything "ok" unless the tool explicitly returns {"ok": False}
+            is_ok = True
+            if isinstance(output, dict):
+                if output.get("ok", True) is False:
+                    is_ok = False
+            step["status"] = "ok" if is_ok else "error"
+
+            # Normalize a "result" for chaining
+            if isinstance(output, dict) and "result" in output:
+                res = output["result"]
+            elif isinstance(output, (str, int, float)):
+                res = output
+            else:
+                # list, None, or any other structure → stringify (preserve unicode)
+                res = json.dumps(output, ensure_ascii=False)[:500]
+            step["result"] = res
+
+            # Write to ctx for placeholders
+            ctx[ids[i]] = {"result": step["result"], "output": output}
+            outputs[i] = output
+            if is_ok:
+                ok.add(i)
+            elif failed is None or i < failed:
+                # Stop scheduling (reflector will decide what to do next)
+                failed = i
+        _commit()
+
+    _commit(final=True)
+    final_plan = getattr(incoming, "plan", None)
+    if stream_error is None and final_plan is not None:
+        _reconcile(plan, final_plan)
+    plan["logs"].append({"tool_cache": {"hits": run_cache["hit"], "misses": run_cache["miss"],
+                                        "bypass": run_cache["bypass"]}})
+    journal.log(plan, plan["logs"][-1])
+    if stream_error is not None:
+        raise ValueError(f"Planner stream failed after {len(steps)} step(s): {stream_error}")
 
-    return plan, last_output
+    if failed is not None:
+        return plan, outputs.get(failed)
+    return plan, outputs[max(outputs)] if outputs else None
@@ -0,0 +1,204 @@
+# Day05/journal.py
+"""
+Plan-run journal: one append-only JSONL file per run under Day05/plans/.
+
+Records (one JSON object per line):
+  {"op": "plan", "plan": {...}}                  the plan as it was first executed
+  {"op": "step", "i": 0, "set": {...}}           fields of steps[i] that changed
+  {"op": "log", "entry": {...}}                  one plan["logs"] entry
+  {"op": "<event>", ...}                         reflect / final markers
+
+Records are serialized on the caller's thread and written by one background
+thread that coalesces everything queued into a single append per file.
+`load_plan(run)` replays a journal back into the full plan dict, and old runs
+are pruned (PLAN_KEEP_RUNS newest, PLAN_KEEP_DAYS max age; 0 disables either).
+"""
+from __future__ import annotations
+import argparse, atexit, glob, json, os, queue, threading, time
+from typing import Any, Dict, List
+
+PLANS_DIR = os.path.join(os.path.dirname(__file__), "plans")
+PLAN_KEEP_RUNS = int(os.getenv("PLAN_KEEP_RUNS", "50"))
+PLAN_KEEP_DAYS = float(os.getenv("PLAN_KEEP_DAYS", "14"))
+
+_MISSING = object()
+
+
+def run_id(plan: Dict[str, Any]) -> str:
+    ts = plan.get("created_at", "run")
+    return ts.replace(":", "-").replace(" ", "_")
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+class PlanJournal:
+    def __init__(self, directory: str = PLANS_DIR,
+                 keep_runs: int = PLAN_KEEP_RUNS, keep_days: float = PLAN_KEEP_DAYS):
+        self.dir = directory
+        os.makedirs(self.dir, exist_ok=True)
+        self.keep_runs = keep_runs
+        self.keep_days = keep_days
+        self.q: queue.Queue = queue.Queue()
+        self._seen: Dict[str, Dict[int, Dict[str, str]]] = {}  # run -> step index -> field -> json
+        self._lock = threading.Lock()
+        self.worker = threading.Thread(target=self._run, name="plan-journal", daemon=True)
+        self.worker.start()
+        atexit.register(self.flush)
+
+    def path(self, plan_or_run) -> str:
+        run = plan_or_run if isinstance(plan_or_run, str) else run_id(plan_or_run)
+        return os.path.join(self.dir, f"{run}.jsonl")
+
+    # ---- recording (called from the executor / reflector) ----
+    def begin(self, plan: Dict[str, Any]) -> None:
+        """Write the plan header the first time a run is seen."""
+        run = run_id(plan)
+        with self._lock:
+            if run in self._seen:
+                return
+            self._seen[run] = {}
+            for i, step in enumerate(plan.get("steps", [])):
+                self._seen[run][i] = {k: _dumps(v) for k, v in step.items()}
+        if not os.path.exists(self.path(run)):
+            self.prune()
+            self._put(run, {"op": "plan", "plan": plan})
+
+    def step(self, plan: Dict[str, Any], i: int) -> None:
+        """Append only the fields of steps[i] that changed since the last record."""
+        run = run_id(plan)
+        step = plan["steps"][i]
+        with self._lock:
+            seen = self._seen.setdefault(run, {}).setdefault(i, {})
+            delta = {}
+            for k, v in step.items():
+                enc = _dumps(v)
+                if seen.get(k, _MISSING) != enc:
+                    seen[k] = enc
+                    delta[k] = v
+        if delta:
+            self._put(run, {"op": "step", "i": i, "set": delta})
+
+    def log(self, plan: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        self._put(run_id(plan), {"op": "log", "entry": entry})
+
+    def event(self, plan: Dict[str, Any], op: str, **data: Any) -> None:
+        self._put(run_id(plan), {"op": op, "ts": time.time(), **data})
+
+    def _put(self, run: str, record: Dict[str, Any]) -> None:
+        self.q.put((run, _dumps(record) + "\n"))
+
+    # ---- background writer ----
+    def _run(self):
+        while True:
+            batch = [self.q.get()]
+            while True:
+                try:
+                    batch.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            by_run: Dict[str, List[str]] = {}
+            for run, line in batch:
+                by_run.setdefault(run, []).append(line)
+            for run, lines in by_run.items():
+                try:
+                    with open(self.path(run), "a", encoding="utf-8") as f:
+                        f.write("".join(lines))
+                except Exception as e:
+                    print(f"[journal] write failed for {run}: {e}")
+            for _ in batch:
+                self.q.task_done()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while self.q.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    # ---- retention ----
+    def prune(self) -> int:
+        runs = sorted(glob.glob(os.path.join(self.dir, "*.jsonl")), key=os.path.getmtime, reverse=True)
+        cutoff = time.time() - self.keep_days * 86400 if self.keep_days > 0 else None
+        removed = 0
+        for n, path in enumerate(runs):
+            too_many = self.keep_runs > 0 and n >= self.keep_runs
+            too_old = cutoff is not None and os.path.getmtime(path) < cutoff
+            if too_many or too_old:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        if removed:
+            print(f"[journal] pruned {removed} old run(s)")
+        return removed
+
+
+# ---- replay ----
+def replay(path: str) -> Dict[str, Any]:
+    """Rebuild the full plan dict from a run journal."""
+    plan: Dict[str, Any] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line after a crash
+            op = rec.get("op")
+            if op == "plan":
+                plan = rec["plan"]
+                plan.setdefault("logs", [])
+            elif op == "step":
+                steps = plan.setdefault("steps", [])
+                while len(steps) <= rec["i"]:
+                    steps.append({})
+                steps[rec["i"]].update(rec["set"])
+            elif op == "log":
+                plan.setdefault("logs", []).append(rec["entry"])
+            else:
+                plan.setdefault("events", []).append(rec)
+    return plan
+
+
+def list_runs(directory: str = PLANS_DIR) -> List[str]:
+    paths = sorted(glob.glob(os.path.join(directory, "*.jsonl")), key=os.path.getmtime)
+    return [os.path.basename(p)[: -len(".jsonl")] for p in paths]
+
+
+def load_plan(run: str, directory: str = PLANS_DIR) -> Dict[str, Any]:
+    """Reconstruct a plan by run id (or path to its .jsonl)."""
+    path = run if run.endswith(".jsonl") else os.path.join(directory, f"{run}.jsonl")
+    journal.flush()
+    return replay(path)
+
+
+journal = PlanJournal()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect Day 05 plan-run journals")
+    parser.add_argument("run", nargs="?", help="Run id (default: latest)")
+    parser.add_argument("--list", action="store_true", help="List recorded runs")
+    parser.add_argument("--export", action="store_true", help="Write the reconstructed plan to plans/<run>-final.json")
+    args = parser.parse_args()
+
+    runs = list_runs()
+    if args.list:
+        print("\n".join(runs) or "(no runs)")
+    elif not runs and not args.run:
+        print("(no runs)")
+    else:
+        run = args.run or runs[-1]
+        plan = load_plan(run)
+        if args.export:
+            out = os.path.join(PLANS_DIR, f"{run}-final.json")
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(plan, f, indent=2, ensure_ascii=False)
+            print(out)
+        else:
+            print(json.dumps(plan, indent=2, ensure_ascii=False))
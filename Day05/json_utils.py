@@ -1,12 +1,12 @@
 # Day05/json_utils.py
 import json
 import re
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 def extract_json(text: str) -> Optional[str]:
     """
     Extract a JSON object from arbitrary text.
-    Tries fenced ```json blocks first, then falls back to the first {...} block.
+    Tries fenced ```json blocks first, then the first brace-balanced {...} block.
     """
     if not text:
         return None
@@ -16,8 +16,13 @@ def extract_json(text: str) -> Optional[str]:
     if m:
         return m.group(1).strip()
 
-    # first top-level object (greedy balanced braces heuristic)
-    # simple heuristic: find first '{' and last '}' and hope content is JSON
+    # first balanced top-level object
+    parser = StreamingJSONParser()
+    parser.feed(text)
+    if parser.done:
+        return parser.object_text()
+
+    # unbalanced: find first '{' and last '}' and hope content is JSON
     start = text.find("{")
     end = text.rfind("}")
     if start != -1 and end != -1 and end > start:
@@ -25,6 +30,86 @@ def extract_json(text: str) -> Optional[str]:
 
     return None
 
+class StreamingJSONParser:
+    """
+    Incremental, brace-balanced scanner for the first top-level JSON object in
+    a token stream (prose or ``` fences around it are skipped).
+
+    feed(chunk) returns the elements of the top-level `array_key` array that
+    were completed by this chunk (e.g. each plan step as soon as its closing
+    brace arrives), so callers can act before the whole reply is generated.
+    """
+
+    def __init__(self, array_key: str = "steps"):
+        self.array_key = array_key
+        self.text = ""
+        self.pos = 0
+        self.start = -1          # index of the top-level '{'
+        self.end = -1            # index of its matching '}'
+        self.stack: List[str] = []
+        self.in_str = False
+        self.escape = False
+        self.str_start = -1
+        self.last_str = ""       # last complete string (a key when followed by ':')
+        self.key = ""            # current key of the top-level object
+        self.array_depth = 0     # stack depth inside the tracked array (0 = not in it)
+        self.elem_start = -1
+
+    @property
+    def done(self) -> bool:
+        return self.end != -1
+
+    def feed(self, chunk: str) -> List[Any]:
+        self.text += chunk or ""
+        completed = []
+        text, i = self.text, self.pos
+        while i < len(text) and not self.done:
+            c = text[i]
+            if self.start == -1:
+                if c == "{":
+                    self.start = i
+                    self.stack.append(c)
+            elif self.in_str:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_str = False
+                    self.last_str = text[self.str_start + 1:i]
+            elif c == '"':
+                self.in_str = True
+                self.str_start = i
+            elif c == ":" and len(self.stack) == 1:
+                self.key = self.last_str
+            elif c in "{[":
+                if c == "[" and len(self.stack) == 1 and self.key == self.array_key:
+                    self.array_depth = 2
+                elif c == "{" and self.array_depth and len(self.stack) == self.array_depth:
+                    self.elem_start = i
+                self.stack.append(c)
+            elif c in "}]":
+                self.stack.pop()
+                if self.array_depth and len(self.stack) == self.array_depth and self.elem_start != -1:
+                    completed.append(json.loads(text[self.elem_start:i + 1]))
+                    self.elem_start = -1
+                elif self.array_depth and len(self.stack) < self.array_depth:
+                    self.array_depth = 0
+                if not self.stack:
+                    self.end = i
+            i += 1
+        self.pos = i
+        return completed
+
+    def object_text(self) -> str:
+        if not self.done:
+            raise ValueError("JSON object is incomplete")
+        return self.text[self.start:self.end + 1]
+
+    def result(self) -> Any:
+        return json.loads(self.object_text())
+
+
 def parse_json(text: str) -> Any:
     blob = extract_json(text)
     if blob is None:
@@ -0,0 +1,200 @@
+# Day05/plan_cache.py
+"""
+Plan template cache: skip the planner LLM call for recurring task shapes.
+
+"Compute 12*(3+4) and write it into answer.txt" and
+"Compute 7*(1+9) and write it into result.txt" share the template
+"compute <n0>*(<n1>+<n2>) and write it into <f0>". A validated plan is stored
+with those literals replaced by {{lit.n0}} markers and rebound to the new
+literals on a hit.
+
+A plan is only cached when that is safe to replay:
+- no literal value occurs twice in the task (which one would a marker mean?)
+- no digits are left in step inputs after abstraction (the planner derived a
+  number, e.g. "0.2*50" for "20% of 50", which a new task would invalidate)
+- no JSON number input equals a task literal: `top_k: 3` in "add 3 and 4"
+  may be the planner's own choice or the task's 3, and guessing wrong would
+  replay "add 50 and 4" with top_k 50
+
+Entries are keyed by template + tool-registry version and persisted to
+Day05/plan_cache.json (PLAN_CACHE_MAX entries, least recently used evicted).
+"""
+from __future__ import annotations
+import json, os, re, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from plan_schema import Plan, validate_plan
+from tool_registry import registry_version
+
+PLAN_CACHE = os.getenv("PLAN_CACHE", "1") != "0"
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", os.path.join(os.path.dirname(__file__), "plan_cache.json"))
+PLAN_CACHE_MAX = int(os.getenv("PLAN_CACHE_MAX", "200"))
+
+# quoted strings, file names, then numbers
+_LITERAL_RE = re.compile(
+    r"(?P<q>\"[^\"]*\"|'[^']*')"
+    r"|(?P<f>(?<![\w.])[\w\-/]*\w\.[A-Za-z][A-Za-z0-9]{0,4}(?![\w.]))"
+    r"|(?P<n>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))"
+)
+_REF_RE = re.compile(r"\{\{\s*[^}]*\}\}|<\s*result\s+of\s+[^>]*>", re.IGNORECASE)
+_MARKER_RE = re.compile(r"\{\{lit\.([nfq]\d+)\}\}")
+
+
+def templatize(task: str) -> Tuple[str, Dict[str, str]]:
+    """Task -> (template key, {slot: literal})."""
+    literals: Dict[str, str] = {}
+    counts = {"n": 0, "f": 0, "q": 0}
+
+    def _sub(m: re.Match) -> str:
+        kind = m.lastgroup
+        slot = f"{kind}{counts[kind]}"
+        counts[kind] += 1
+        text = m.group(0)
+        if kind == "q":
+            literals[slot] = text[1:-1]
+            return f"{text[0]}<{slot}>{text[-1]}"
+        literals[slot] = text
+        return f"<{slot}>"
+
+    template = _LITERAL_RE.sub(_sub, task.strip())
+    return " ".join(template.lower().split()), literals
+
+
+def _literal_pattern(value: str) -> re.Pattern:
+    return re.compile(rf"(?<![\w.]){re.escape(value)}(?![\w])")
+
+
+def _abstract(val: Any, order: List[Tuple[str, str]]) -> Any:
+    if isinstance(val, dict):
+        return {k: _abstract(v, order) for k, v in val.items()}
+    if isinstance(val, list):
+        return [_abstract(v, order) for v in val]
+    if isinstance(val, str):
+        # keep {{sN.result}} / <result of sN> references out of the substitution
+        parts = _REF_RE.split(val)
+        refs = _REF_RE.findall(val)
+        for slot, lit in order:  # longest literal first
+            parts = [_literal_pattern(lit).sub(f"{{{{lit.{slot}}}}}", p) for p in parts]
+        out = parts[0]
+        for ref, part in zip(refs, parts[1:]):
+            out += ref + part
+        return out
+    return val
+
+
+def _residual_digits(val: Any) -> bool:
+    if isinstance(val, dict):
+        return any(_residual_digits(v) for v in val.values())
+    if isinstance(val, list):
+        return any(_residual_digits(v) for v in val)
+    if isinstance(val, str):
+        return bool(re.search(r"\d", _MARKER_RE.sub("", _REF_RE.sub("", val))))
+    return False
+
+
+def _number_clash(val: Any, numbers: set) -> bool:
+    """A JSON number input equal to a numeric task literal (ambiguous origin)."""
+    if isinstance(val, dict):
+        return any(_number_clash(v, numbers) for v in val.values())
+    if isinstance(val, list):
+        return any(_number_clash(v, numbers) for v in val)
+    return isinstance(val, (int, float)) and not isinstance(val, bool) and float(val) in numbers
+
+
+def _bind(val: Any, literals: Dict[str, str]) -> Any:
+    if isinstance(val, dict):
+        return {k: _bind(v, literals) for k, v in val.items()}
+    if isinstance(val, list):
+        return [_bind(v, literals) for v in val]
+    if isinstance(val, str):
+        return _MARKER_RE.sub(lambda m: literals[m.group(1)], val)
+    return val
+
+
+class PlanCache:
+    def __init__(self, path: str = PLAN_CACHE_PATH, max_entries: int = PLAN_CACHE_MAX):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "uncacheable": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = data.get("entries", {})
+            self.stats.update(data.get("stats", {}))
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries, "stats": self.stats}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def key(template: str) -> str:
+        return f"{registry_version()}|{template}"
+
+    def lookup(self, task: str) -> Optional[Plan]:
+        template, literals = templatize(task)
+        with self._lock:
+            entry = self.entries.get(self.key(template))
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            steps = _bind(entry["steps"], literals)
+            try:
+                self._save()
+            except OSError:
+                pass
+        try:
+            return validate_plan({"task": task, "steps": steps})
+        except (ValueError, KeyError) as e:
+            print(f"[plan-cache] stale entry dropped: {e}")
+            with self._lock:
+                self.entries.pop(self.key(template), None)
+            return None
+
+    def store(self, task: str, plan: Plan) -> bool:
+        template, literals = templatize(task)
+        values = list(literals.values())
+        order = sorted(literals.items(), key=lambda kv: -len(kv[1]))
+        steps = plan["steps"]
+        # only tool inputs carry task literals; ids/retries/expect stay as planned
+        abstract = [{**s, "input": _abstract(s.get("input", {}), order)} for s in steps]
+        numbers = {float(lit) for slot, lit in literals.items() if slot[0] == "n"}
+        ok = (len(set(values)) == len(values)
+              and not any(_residual_digits(s["input"]) for s in abstract)
+              and not any(_number_clash(s.get("input", {}), numbers) for s in steps))
+        # the template must replay to exactly this plan
+        ok = ok and _bind(abstract, literals) == steps
+        with self._lock:
+            if not ok:
+                self.stats["uncacheable"] += 1
+                return False
+            self.entries[self.key(template)] = {"steps": abstract, "last_used": time.time(), "hits": 0}
+            while len(self.entries) > self.max_entries:
+                oldest = min(self.entries, key=lambda k: self.entries[k]["last_used"])
+                del self.entries[oldest]
+            self.stats["stored"] += 1
+            try:
+                self._save()
+            except OSError as e:
+                print(f"[plan-cache] could not persist: {e}")
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "entries": len(self.entries),
+                    "hit_rate": round(self.stats["hits"] / total, 3) if total else 0.0}
+
+
+plan_cache = PlanCache()
@@ -26,6 +26,48 @@ DEFAULT_RETRIES = 0
 MAX_STEPS = 6
 
 # ---------- Validation ----------
+def validate_step(raw: Any, idx: int) -> Step:
+    """
+    Validate and normalize one step (1-based `idx`).
+    Used by validate_plan and by the streaming planner as each step arrives.
+    Raises ValueError on fatal problems.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"steps[{idx}] must be an object")
+
+    tool = raw.get("tool")
+    if tool not in TOOLS:
+        raise ValueError(f"steps[{idx}].tool '{tool}' is not in registry")
+
+    # Validate param keys against the registry's declared params
+    declared = set(TOOLS[tool]["params"].keys())
+    supplied = raw.get("input", {})
+    if not isinstance(supplied, dict):
+        raise ValueError(f"steps[{idx}].input must be an object")
+    extraneous = set(supplied.keys()) - declared
+    missing = declared - set(supplied.keys())
+    # Allow optional params by not strictly requiring all 'declared' keys.
+    # If you want strictness, uncomment next line:
+    # if missing: raise ValueError(f"steps[{idx}] missing params: {sorted(missing)}")
+    if extraneous:
+        raise ValueError(f"steps[{idx}] unknown params: {sorted(extraneous)}")
+
+    step: Step = {
+        "id": raw.get("id") or f"s{idx}",
+        "tool": tool,
+        "input": supplied,
+        "expect": raw.get("expect", "").strip() or "",
+        "on_fail": raw.get("on_fail") or DEFAULT_ON_FAIL,
+        "retries": int(raw.get("retries", DEFAULT_RETRIES)),
+    }
+    if step["on_fail"] not in ("retry", "tweak", "ask_user", "abort"):
+        raise ValueError(f"steps[{idx}].on_fail invalid: {step['on_fail']}")
+    if step["retries"] < 0 or step["retries"] > 3:
+        raise ValueError(f"steps[{idx}].retries out of range (0..3)")
+
+    return step
+
+
 def validate_plan(plan: Dict[str, Any]) -> Plan:
     """
     Validate and normalize a plan dict.
@@ -47,42 +89,7 @@ def validate_plan(plan: Dict[str, Any]) -> Plan:
     # Trim to MAX_STEPS
     steps = steps[:MAX_STEPS]
 
-    normalized_steps: List[Step] = []
-    for idx, raw in enumerate(steps, start=1):
-        if not isinstance(raw, dict):
-            raise ValueError(f"steps[{idx}] must be an object")
-
-        tool = raw.get("tool")
-        if tool not in TOOLS:
-            raise ValueError(f"steps[{idx}].tool '{tool}' is not in registry")
-
-        # Validate param keys against the registry's declared params
-        declared = set(TOOLS[tool]["params"].keys())
-        supplied = raw.get("input", {})
-        if not isinstance(supplied, dict):
-            raise ValueError(f"steps[{idx}].input must be an object")
-        extraneous = set(supplied.keys()) - declared
-        missing = declared - set(supplied.keys())
-        # Allow optional params by not strictly requiring all 'declared' keys.
-        # If you want strictness, uncomment next line:
-        # if missing: raise ValueError(f"steps[{idx}] missing params: {sorted(missing)}")
-        if extraneous:
-            raise ValueError(f"steps[{idx}] unknown params: {sorted(extraneous)}")
-
-        step: Step = {
-            "id": raw.get("id") or f"s{idx}",
-            "tool": tool,
-            "input": supplied,
-            "expect": raw.get("expect", "").strip() or "",
-            "on_fail": raw.get("on_fail") or DEFAULT_ON_FAIL,
-            "retries": int(raw.get("retries", DEFAULT_RETRIES)),
-        }
-        if step["on_fail"] not in ("retry", "tweak", "ask_user", "abort"):
-            raise ValueError(f"steps[{idx}].on_fail invalid: {step['on_fail']}")
-        if step["retries"] < 0 or step["retries"] > 3:
-            raise ValueError(f"steps[{idx}].retries out of range (0..3)")
-
-        normalized_steps.append(step)
+    normalized_steps: List[Step] = [validate_step(raw, idx) for idx, raw in enumerate(steps, start=1)]
 
     created_at = plan.get("created_at") or datetime.utcnow().isoformat()
 
@@ -1,27 +1,29 @@
 # Day05/planner.py
-from typing import Dict, Any
+from typing import Any, Dict, Iterator, Optional, Tuple
 from datetime import datetime
 from langchain.chat_models import init_chat_model
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from tool_registry import describe_for_planner
 from prompts import PLANNER_SYSTEM
-from plan_schema import validate_plan, Plan
-from json_utils import parse_json
+from plan_schema import MAX_STEPS, validate_plan, validate_step, Plan, Step
+from json_utils import StreamingJSONParser, parse_json
+from plan_cache import PLAN_CACHE, plan_cache
 from dotenv import load_dotenv
 load_dotenv()
 
 # You can switch models later via env or arg if you want
 LLM_MODEL = "openai:gpt-4.1"
 
-def make_plan(task: str) -> Plan:
-    """
-    Build a short, valid plan for `task` using the current tool registry.
-    Returns a validated Plan (dict) or raises ValueError on failure.
-    """
-    if not isinstance(task, str) or not task.strip():
-        raise ValueError("task must be a non-empty string")
+_llm = None
+
+def _get_llm():
+    global _llm
+    if _llm is None:
+        _llm = init_chat_model(LLM_MODEL)
+    return _llm
 
+def _messages(task: str) -> list:
     tools_summary = describe_for_planner()
 
     sys = SystemMessage(
@@ -32,9 +34,25 @@ def make_plan(task: str) -> Plan:
                 f'Use ISO 8601 for created_at (you may set it to "{datetime.utcnow().isoformat()}").\n'
                 f"Return STRICT JSON only."
     )
+    return [sys, user]
+
+def make_plan(task: str, use_cache: bool = PLAN_CACHE) -> Plan:
+    """
+    Build a short, valid plan for `task` using the current tool registry.
+    Tasks that only differ in numbers/file names/quoted text from an earlier
+    one are served from the plan cache without an LLM call.
+    Returns a validated Plan (dict) or raises ValueError on failure.
+    """
+    if not isinstance(task, str) or not task.strip():
+        raise ValueError("task must be a non-empty string")
+
+    if use_cache:
+        cached = plan_cache.lookup(task)
+        if cached is not None:
+            print(f"[plan-cache] hit {plan_cache.metrics()}")
+            return cached
 
-    llm = init_chat_model(LLM_MODEL)
-    reply = llm.invoke([sys, user])
+    reply = _get_llm().invoke(_messages(task))
 
     # 1) parse JSON
     try:
@@ -45,4 +63,56 @@ def make_plan(task: str) -> Plan:
 
     # 2) validate + normalize
     plan = validate_plan(raw_plan)
+    if use_cache and plan_cache.store(task, plan):
+        print("[plan-cache] stored plan template")
     return plan
+
+
+# -------- streaming planner ----------
+class PlanStream:
+    """
+    Iterate to get validated steps while the planner reply is still streaming.
+    Each step is yielded as soon as its closing brace arrives; after the last
+    one the whole object is parsed and validated into `self.plan`.
+    """
+
+    def __init__(self, task: str, use_cache: bool = PLAN_CACHE):
+        self.task = task
+        self.use_cache = use_cache
+        self.steps: list = []
+        self.plan: Optional[Plan] = None
+
+    def __iter__(self) -> Iterator[Step]:
+        parser = StreamingJSONParser("steps")
+        for chunk in _get_llm().stream(_messages(self.task)):
+            content = chunk.content
+            if not isinstance(content, str):  # list of content parts
+                content = "".join(p.get("text", "") if isinstance(p, dict) else str(p) for p in content)
+            for raw in parser.feed(content):
+                if len(self.steps) >= MAX_STEPS:
+                    continue
+                step = validate_step(raw, len(self.steps) + 1)
+                self.steps.append(step)
+                yield step
+        try:
+            raw_plan: Dict[str, Any] = parser.result()
+        except Exception as e:
+            raise ValueError(f"Planner did not return valid JSON: {e}")
+        self.plan = validate_plan(raw_plan)
+        if self.use_cache and plan_cache.store(self.task, self.plan):
+            print("[plan-cache] stored plan template")
+
+def start_plan(task: str, use_cache: bool = PLAN_CACHE) -> Tuple[Plan, Optional[PlanStream]]:
+    """
+    (cached plan, None) on a plan-cache hit, else (empty plan, PlanStream) so
+    the executor can start s1 while later steps are still being generated.
+    """
+    if not isinstance(task, str) or not task.strip():
+        raise ValueError("task must be a non-empty string")
+    if use_cache:
+        cached = plan_cache.lookup(task)
+        if cached is not None:
+            print(f"[plan-cache] hit {plan_cache.metrics()}")
+            return cached, None
+    skeleton: Plan = {"task": task.strip(), "created_at": datetime.utcnow().isoformat(), "steps": []}
+    return skeleton, PlanStream(task, use_cache=use_cache)
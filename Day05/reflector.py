@@ -3,8 +3,8 @@ from __future__ import annotations
 import json, os
 from typing import Any, Dict, Tuple
 
-from tool_registry import TOOLS
-from executor import save_plan
+from tool_registry import TOOLS, call as call_tool
+from journal import journal, run_id
 
 def _is_numberish(x: Any) -> bool:
     if isinstance(x, (int, float)):
@@ -52,6 +52,15 @@ def _tweak_inputs_for(tool: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
 
     return tweaked
 
+def _record(plan: Dict[str, Any], idx: int, action: str) -> None:
+    step = plan["steps"][idx]
+    entry = {"step": step.get("id"), "tool": step.get("tool"), "ok": step["status"] == "ok",
+             "reflect": action, "cache": step["cache"]}
+    plan.setdefault("logs", []).append(entry)
+    journal.step(plan, idx)
+    journal.log(plan, entry)
+    journal.event(plan, "reflect", step=step.get("id"), action=action)
+
 def reflect(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
     """
     Inspect the last executed step and decide:
@@ -64,12 +73,11 @@ def reflect(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
     if not steps:
         return plan, "stop"
 
-    # find the last step that has any execution status
-    last_idx = -1
-    for i in range(len(steps) - 1, -1, -1):
-        if "status" in steps[i]:
-            last_idx = i
-            break
+    # the first failed step (independent steps may have finished after it),
+    # else the last step that has any execution status
+    last_idx = next((i for i, s in enumerate(steps) if s.get("status") == "error"), -1)
+    if last_idx == -1:
+        last_idx = next((i for i in range(len(steps) - 1, -1, -1) if "status" in steps[i]), -1)
     if last_idx == -1:
         return plan, "stop"
 
@@ -94,33 +102,33 @@ def reflect(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
     # If it failed, decide recovery
     # 1) plain retry if allowed and attempts <= retries
     if on_fail == "retry" and attempts <= retries_allowed:
-        fn = TOOLS.get(tool, {}).get("fn")
-        if fn is None:
+        if tool not in TOOLS:
             return plan, "stop"
 
         # Reuse the input the executor rendered (if present), else raw
         rendered = step.get("input_rendered", inputs)
-        out = fn(**rendered)
+        out, cache = call_tool(tool, rendered, scope=run_id(plan))
         step["attempts"] = attempts + 1
+        step["cache"] = cache
         step["output"] = out
         step["status"] = "ok" if (isinstance(out, dict) and out.get("ok", True)) else "error"
         step["result"] = out.get("result") if isinstance(out, dict) and "result" in out else json.dumps(out)[:200]
-        save_plan(plan, suffix=f"{step.get('id','s')}-retry")
+        _record(plan, last_idx, "retry")
         return plan, "retry"
 
     # 2) small tweak + one retry
     if on_fail == "tweak":
-        fn = TOOLS.get(tool, {}).get("fn")
-        if fn is None:
+        if tool not in TOOLS:
             return plan, "stop"
         tweaked = _tweak_inputs_for(tool, step.get("input_rendered", inputs))
-        out = fn(**tweaked)
+        out, cache = call_tool(tool, tweaked, scope=run_id(plan))
         step["attempts"] = attempts + 1
+        step["cache"] = cache
         step["input_rendered"] = tweaked
         step["output"] = out
         step["status"] = "ok" if (isinstance(out, dict) and out.get("ok", True)) else "error"
         step["result"] = out.get("result") if isinstance(out, dict) and "result" in out else json.dumps(out)[:200]
-        save_plan(plan, suffix=f"{step.get('id','s')}-tweak")
+        _record(plan, last_idx, "tweak+retry")
         return plan, "tweak+retry"
 
     # 3) ask_user / abort → stop
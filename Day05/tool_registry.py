@@ -1,22 +1,38 @@
-# Day05/registry.py
-from typing import Callable, Dict, Any
-from tools import calculator, search_local_docs, file_write_safe  # note the relative import
+# Day05/tool_registry.py
+import hashlib, json, os, threading, time
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Callable, Dict, Any, Tuple
+from tools import calculator, calculator_batch, search_local_docs, file_write_safe  # note the relative import
 
-# Simple registry: name -> { fn, params, desc }
+# Simple registry: name -> { fn, params, desc, kind }
+# kind decides memoization in call():
+#   "pure"           same inputs -> same output; cached for TOOL_CACHE_TTL_S
+#   "idempotent"     repeating is harmless; cached only within one plan run (scope)
+#   "side_effecting" always executed
 TOOLS: Dict[str, Dict[str, Any]] = {
     "calculator": {
         "fn": calculator,
         "params": {"expr": "str"},
-        "desc": "Safely evaluate arithmetic expressions (supports %, ( ), + - * /).",
+        "kind": "pure",
+        "desc": "Safely evaluate arithmetic expressions (supports %, 'X% of Y', ( ), + - * / // **).",
+    },
+    "calculator_batch": {
+        "fn": calculator_batch,
+        "params": {"exprs": "list"},
+        "kind": "pure",
+        "desc": "Evaluate a list of arithmetic expressions in one step (e.g. a series); returns a list of floats.",
     },
     "search_local_docs": {
         "fn": search_local_docs,
         "params": {"query": "str", "top_k": "int"},
+        "kind": "pure",  # reads Day05/data; the TTL bounds staleness
         "desc": "Keyword search in Day05/data; returns title, snippet, path, score.",
     },
     "file_write_safe": {
         "fn": file_write_safe,
         "params": {"path": "str", "text": "str"},
+        "kind": "side_effecting",  # a later write to the same path must really happen
         "desc": "Write UTF-8 text under Day05/out only; size-limited and sandboxed.",
     },
 }
@@ -27,6 +43,68 @@ def get(name: str) -> Callable[..., dict]:
     """Return the callable for a tool name, or raise KeyError."""
     return TOOLS[name]["fn"]
 
+# -------- memoized calls ----------
+TOOL_CACHE_TTL_S = float(os.getenv("TOOL_CACHE_TTL_S", "300"))
+TOOL_CACHE_MAX = int(os.getenv("TOOL_CACHE_MAX", "512"))
+
+_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, output)
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypass": 0}
+
+
+def _cache_key(name: str, inputs: Dict[str, Any], scope: str) -> str:
+    canon = json.dumps([name, scope, inputs], sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(canon.encode("utf-8")).hexdigest()
+
+
+def call(name: str, inputs: Dict[str, Any], scope: str = "") -> Tuple[Any, str]:
+    """
+    Run a tool through the memoization layer.
+    Returns (output, cache) with cache in {"hit", "miss", "bypass"}.
+    Only successful outputs are stored, so failures are always re-executed.
+    """
+    meta = TOOLS[name]
+    kind = meta.get("kind", "side_effecting")
+    if kind not in ("pure", "idempotent"):
+        with _cache_lock:
+            _stats["bypass"] += 1
+        return meta["fn"](**inputs), "bypass"
+
+    key = _cache_key(name, inputs, scope if kind == "idempotent" else "")
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] > now:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return deepcopy(hit[1]), "hit"
+        _stats["misses"] += 1
+
+    output = meta["fn"](**inputs)
+    if not (isinstance(output, dict) and output.get("ok", True) is False):
+        with _cache_lock:
+            _cache[key] = (now + TOOL_CACHE_TTL_S, deepcopy(output))
+            _cache.move_to_end(key)
+            while len(_cache) > TOOL_CACHE_MAX:
+                _cache.popitem(last=False)
+    return output, "miss"
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _cache_lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {**_stats, "size": len(_cache), "hit_rate": round(_stats["hits"] / total, 3) if total else 0.0}
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+def registry_version() -> str:
+    """Short hash of tool names/params/kinds/descriptions (keys the plan cache)."""
+    spec = {name: [meta["params"], meta.get("kind"), meta["desc"]] for name, meta in TOOLS.items()}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
 def describe_for_planner() -> str:
     """Human-readable summary you can dump into a system prompt for the planner."""
     lines = []
@@ -1,66 +1,58 @@
-import os, glob, re
+import math
+import os
+import sys
 from typing import List, Dict
 from pathlib import Path
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
-
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.calculator import calculator, _compile  # AST calculator engine, shared with Day01
+from shared.docsearch import DocIndex
 
-def calculator(expr: str) -> dict:
-    """Evaluate safe math expressions with support for percentages.
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+docs = DocIndex(DATA_DIR)  # same search engine as the Day04 MCP server
 
-    Returns:
-        {"ok": True, "result": float} on success
-        {"ok": False, "error": str} on failure
-    """
-    # 1. Basic validation
-    if not expr or len(expr) > 200:
-        return {"ok": False, "error": "Invalid input length"}
-
-    # 2. Allow only digits, ., + - * / ( ), %, spaces, and "of"
-    safe_pattern = r"^[0-9\.\+\-\*\/\(\)\s%ofOF]+$"
-    if not re.fullmatch(safe_pattern, expr):
-        return {"ok": False, "error": "Unsafe characters in expression"}
-
-    # 3. Handle "20% of 50" → "(20/100)*50"
-    expr2 = re.sub(
-        r"(\d+(?:\.\d+)?)\s*%\s*of\s*(\d+(?:\.\d+)?)",
-        lambda m: f"({float(m.group(1))/100}*{m.group(2)})",
-        expr,
-        flags=re.I
-    )
-
-    # 4. Handle standalone "20%" → "(20/100)"
-    expr2 = re.sub(
-        r"(\d+(?:\.\d+)?)\s*%",
-        lambda m: f"({float(m.group(1))/100})",
-        expr2
-    )
-
-    # 5. Evaluate safely
-    try:
-        result = eval(expr2, {"__builtins__": {}}, {})
-        return {"ok": True, "result": result}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
 
-def _iter_files():
-    for root, _, files in os.walk(DATA_DIR):
-        for fn in files:
-            if any(fn.endswith(ext) for ext in (".md", ".txt", ".py")):
-                yield os.path.join(root, fn)
+# ---------------- calculator ----------------
+# calculator_batch runs the shared compiled trees on NumPy columns, one pass per
+# group of same-shaped expressions.
 
-def _score_hit(text: str, query: str) -> int:
-    # naive score = count of case-insensitive keyword occurrences
-    return len(re.findall(re.escape(query), text, flags=re.IGNORECASE))
+def calculator_batch(exprs: List[str]) -> dict:
+    """Evaluate many expressions at once (e.g. a series like '100*1.05**1' ... '100*1.05**30').
 
-def _snippet(text: str, query: str, size: int = 160) -> str:
-    m = re.search(re.escape(query), text, re.IGNORECASE)
-    if not m:
-        return text[:size]
-    i = max(0, m.start() - size // 2)
-    j = i + size
-    return text[i:j].replace("\n", " ")
+    Expressions with the same structure share one compiled tree and are
+    evaluated together on NumPy float64 columns, so results are floats.
 
+    Returns:
+        {"ok": bool, "result": [float | None, ...], "errors": {index: str}}
+    """
+    import numpy as np
+
+    if not isinstance(exprs, list):
+        return {"ok": False, "error": "exprs must be a list of strings"}
+    results = [None] * len(exprs)
+    errors = {}
+    groups = {}  # shape -> (fn, indices, literal rows)
+    for i, expr in enumerate(exprs):
+        try:
+            fn, slots, shape = _compile(expr)
+        except Exception as e:
+            errors[i] = str(e)
+            continue
+        group = groups.setdefault(shape, (fn, [], []))
+        group[1].append(i)
+        group[2].append(slots)
+
+    for fn, idx, rows in groups.values():
+        cols = list(np.asarray(rows, dtype=np.float64).T)
+        with np.errstate(all="ignore"):
+            out = np.broadcast_to(fn(cols), (len(idx),))
+        for i, v in zip(idx, out.tolist()):
+            if math.isfinite(v):
+                results[i] = v
+            else:
+                errors[i] = "math error (division by zero, overflow or complex result)"
+
+    return {"ok": not errors, "result": results, "errors": errors}
 
 def search_local_docs(query: str, top_k: int = 3) -> List[Dict]:
     """Search ./data for a keyword and return top snippets."""
@@ -72,23 +64,7 @@ def search_local_docs(query: str, top_k: int = 3) -> List[Dict]:
     except Exception:
         k = 3
 
-    results = []
-    for path in _iter_files():
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
-        except Exception:
-            continue
-        score = _score_hit(text, query)
-        if score > 0:
-            results.append({
-                "title": os.path.basename(path),
-                "snippet": _snippet(text, query),
-                "path": os.path.relpath(path, DATA_DIR),
-                "score": score,
-            })
-    results.sort(key=lambda r: r["score"], reverse=True)
-    return results[:k]
+    return docs.search(query, k)
 
 
 
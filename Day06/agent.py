@@ -1,16 +1,19 @@
 #!/usr/bin/env python3
 """
 Day06 Step 3: Idempotency — skip steps already completed.
+Steps run concurrently, ordered only by their declared depends_on.
 """
 import argparse
 import json
 from pathlib import Path
 import sys
+import time
 import yaml
 from datetime import datetime, timezone
 
-from tools import TOOL_REGISTRY
-from idempotency_store import IdempotencyStore  # [IDEMPOTENCY]
+from tools import TOOL_REGISTRY, http
+from idempotency_store import BUSY, SUCCEEDED, IdempotencyStore  # [IDEMPOTENCY]
+from scheduler import BLOCKED, FAILED, NOT_RUN, OK, SKIPPED, print_summary, run_steps
 
 REQUIRED_STEP_KEYS = {"tool"}
 
@@ -48,9 +51,65 @@ def load_runbook(path: Path) -> dict:
             raise ValueError(f"Step {i} 'idempotency' must be a mapping/object when provided.")
         if idem and "key" in idem and not isinstance(idem["key"], str):
             raise ValueError(f"Step {i} 'idempotency.key' must be a string when provided.")
+        if idem and "ttl" in idem and (not isinstance(idem["ttl"], (int, float))
+                                       or isinstance(idem["ttl"], bool) or idem["ttl"] <= 0):
+            raise ValueError(f"Step {i} 'idempotency.ttl' must be a positive number of seconds.")
+
+    # depends_on: names of earlier-or-later steps that must succeed first
+    names = [s["name"] for s in steps]
+    for i, step in enumerate(steps, 1):
+        deps = step.get("depends_on", [])
+        if isinstance(deps, str):
+            deps = [deps]
+        if not isinstance(deps, list) or not all(isinstance(d, str) for d in deps):
+            raise ValueError(f"Step {i} 'depends_on' must be a step name or a list of step names.")
+        for d in deps:
+            if d not in names:
+                raise ValueError(f"Step {i} depends on unknown step '{d}'.")
+            if names.count(d) > 1:
+                raise ValueError(f"Step {i} depends on '{d}', but several steps have that name.")
+            if d == step["name"]:
+                raise ValueError(f"Step {i} cannot depend on itself.")
+        step["depends_on"] = list(dict.fromkeys(deps))
+    _check_acyclic(steps)
+
+    # concurrency: N  |  {max: N, tools: {tool_name: N}}
+    conc = data.get("concurrency", {})
+    if isinstance(conc, int) and not isinstance(conc, bool):
+        conc = {"max": conc}
+    if not isinstance(conc, dict):
+        raise ValueError("'concurrency' must be an integer or a mapping with 'max' / 'tools'.")
+    tools = conc.get("tools", {}) or {}
+    if not isinstance(tools, dict):
+        raise ValueError("'concurrency.tools' must map tool names to limits.")
+    for label, n in [("concurrency.max", conc.get("max", 1))] + [(f"concurrency.tools.{t}", n) for t, n in tools.items()]:
+        if not isinstance(n, int) or isinstance(n, bool) or n < 1:
+            raise ValueError(f"'{label}' must be a positive integer.")
+    data["concurrency"] = {"max": conc.get("max"), "tools": tools}
+
+    if not isinstance(data.get("continue_on_failure", False), bool):
+        raise ValueError("'continue_on_failure' must be true or false.")
 
     return data
 
+def _check_acyclic(steps: list) -> None:
+    by_name = {s["name"]: s for s in steps}
+    state = {}  # name -> "visiting" | "done"
+
+    def visit(name, trail):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            cycle = trail[trail.index(name):] + [name]
+            raise ValueError(f"Dependency cycle: {' → '.join(cycle)}")
+        state[name] = "visiting"
+        for d in by_name[name].get("depends_on", []):
+            visit(d, trail + [name])
+        state[name] = "done"
+
+    for s in steps:
+        visit(s["name"], [])
+
 def execute_step(step: dict, dry_run: bool) -> dict:
     tool_name = step["tool"]
     params = dict(step.get("params", {}))  # shallow copy
@@ -66,7 +125,11 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--runbook", required=True, help="Path to runbook YAML")
     parser.add_argument("--dry-run", action="store_true", help="Simulate actions without side effects")
-    parser.add_argument("--state", default=".ops_state.json", help="Path to idempotency state file")  # [IDEMPOTENCY]
+    parser.add_argument("--state", default=".ops_state.db", help="Path to idempotency state (SQLite)")  # [IDEMPOTENCY]
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Max steps running at once (default: runbook 'concurrency', else 4)")
+    parser.add_argument("--continue-on-failure", action="store_true",
+                        help="Keep running steps that do not depend on a failed one")
     args = parser.parse_args()
 
     # [IDEMPOTENCY] init store
@@ -80,47 +143,106 @@ def main():
 
     mode = "DRY-RUN" if args.dry_run else "REAL"
     print(f"✓ Runbook loaded. Mode: {mode}")
-    print(f"State file: {args.state}")  # [IDEMPOTENCY]
-
-    for idx, step in enumerate(runbook["steps"], start=1):
+    print(f"State file: {store.path}")  # [IDEMPOTENCY]
+
+    steps = runbook["steps"]
+    conc = runbook["concurrency"]
+    max_workers = args.concurrency or conc["max"] or 4
+    continue_on_failure = args.continue_on_failure or runbook.get("continue_on_failure", False)
+    print(f"Concurrency: {max_workers}" + (f"  per-tool: {conc['tools']}" if conc["tools"] else "")
+          + ("  (continue on failure)" if continue_on_failure else ""))
+
+    # [IDEMPOTENCY] one query for the whole runbook; claims are taken as steps become ready
+    done = store.get_many((s.get("idempotency") or {}).get("key") for s in steps)
+    busy = set()        # keys another runner holds a pending claim on
+    claims = {}         # key -> id() of the step in this run that claimed it
+    duplicate = {}      # id() of a step -> name of the earlier step holding its key
+
+    def already_done(step: dict) -> bool:
+        idem_key = (step.get("idempotency") or {}).get("key")  # [IDEMPOTENCY]
+        if not idem_key:
+            return False
+        if idem_key in done:
+            return True
+        if args.dry_run:
+            return False  # dry-run never claims keys
+        if idem_key in claims:  # two steps with one key: only the first runs
+            duplicate[id(step)] = next(s["name"] for s in steps if id(s) == claims[idem_key])
+            return False
+        outcome = store.claim(idem_key)
+        if outcome == SUCCEEDED:  # another runner finished it since the batch lookup
+            done[idem_key] = store.get(idem_key)
+            return True
+        if outcome == BUSY:
+            busy.add(idem_key)
+        else:
+            claims[idem_key] = id(step)
+        return False
+
+    def run(step: dict) -> dict:
+        idem_key = (step.get("idempotency") or {}).get("key")
+        if id(step) in duplicate:
+            raise Exception(f"idempotency key already claimed by step '{duplicate[id(step)]}' in this run")
+        if idem_key in busy:
+            raise Exception("another runner is executing this key right now (pending claim)")
+        return execute_step(step, dry_run=args.dry_run)
+
+    def report(i: int, step: dict, status: str, value) -> None:
         name = step['name']
         tool = step['tool']
         params = step.get('params', {})
         idem_key = (step.get("idempotency") or {}).get("key")  # [IDEMPOTENCY]
 
-        print(f"\n[{idx}] {name}")
+        print(f"\n[{i + 1}] {name}")
         print(f"    tool:   {tool}")
         print(f"    params: {json.dumps(params, ensure_ascii=False)}")
+        if step["depends_on"]:
+            print(f"    depends_on: {', '.join(step['depends_on'])}")
         if idem_key:
             print(f"    idempotency.key: {idem_key}")
 
-        # [IDEMPOTENCY] skip if already success
-        if idem_key and store.is_success(idem_key):
-            prev = store.get(idem_key)
+        if status == SKIPPED:
+            prev = done[idem_key]
             print("    → skipped (already succeeded)")
             print("      previous-result:", json.dumps(prev.get("result", {}), ensure_ascii=False))
-            continue
-
-        try:
-            result = execute_step(step, dry_run=args.dry_run)
-            print("    → result:", json.dumps(result, ensure_ascii=False))
+        elif status == BLOCKED:
+            print("    → blocked (a dependency did not succeed)")
+        elif status == NOT_RUN:
+            print("    → not run (stopped after a failure; use --continue-on-failure)")
+        elif status == FAILED:
+            print(f"    ✗ step failed: {value}")
+            if idem_key and claims.get(idem_key) == id(step):
+                store.release(idem_key)  # let a later run retry it
+        else:
+            print("    → result:", json.dumps(value, ensure_ascii=False))
 
             # [IDEMPOTENCY] mark success on real run (or even on dry-run if you prefer)
             if idem_key and not args.dry_run:
-                store.mark_success(
-                    idem_key,
-                    {
-                        "step": name,
-                        "tool": tool,
-                        "params": params,
-                        "result": result,
-                        "when": datetime.now(timezone.utc).isoformat(),
-                        "mode": "dry-run" if args.dry_run else "real",
-                    },
-                )
-        except Exception as e:
-            print(f"    ✗ step failed: {e}")
-            sys.exit(2)
+                entry = {
+                    "step": name,
+                    "tool": tool,
+                    "params": params,
+                    "result": value,
+                    "when": datetime.now(timezone.utc).isoformat(),
+                    "mode": "dry-run" if args.dry_run else "real",
+                }
+                store.mark_success(idem_key, entry, ttl_s=step["idempotency"].get("ttl"))
+                done[idem_key] = {"status": "success", **entry}  # later steps with this key skip
+
+    t0 = time.perf_counter()
+    records = run_steps(
+        steps,
+        run,
+        max_workers=max_workers,
+        tool_caps=conc["tools"],
+        continue_on_failure=continue_on_failure,
+        skip=already_done,
+        on_done=report,
+    )
+    print_summary(steps, records, time.perf_counter() - t0)
+    print(f"\n[http] {http.stats}")
+    if any(r["status"] != OK and r["status"] != SKIPPED for r in records):
+        sys.exit(2)
 
 if __name__ == "__main__":
     main()
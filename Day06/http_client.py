@@ -0,0 +1,141 @@
+"""
+Ops HTTP layer shared by the Day06 tools.
+
+- One requests.Session with a sized connection pool (OPS_HTTP_POOL), safe to
+  use from the runbook worker threads.
+- GETs are conditional: the last ETag / Last-Modified per URL is sent back as
+  If-None-Match / If-Modified-Since, and a 304 returns the cached body
+  (GitHub does not count 304s against the rate limit).
+- X-RateLimit-Remaining / X-RateLimit-Reset (and Retry-After) are tracked
+  from every response. When the budget is spent, new requests wait for the
+  reset instead of firing and backing off; waits longer than
+  OPS_MAX_RATE_WAIT_S fail fast with RateLimited.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from retry import RateLimited, TransientError
+
+POOL_SIZE = int(os.getenv("OPS_HTTP_POOL", "16"))
+MAX_RATE_WAIT_S = float(os.getenv("OPS_MAX_RATE_WAIT_S", "60"))
+ETAG_CACHE_MAX = int(os.getenv("OPS_ETAG_CACHE_MAX", "256"))
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
+
+class OpsHTTP:
+    def __init__(self, base_url: str, token: Optional[str] = None, pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/vnd.github+json"})
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        self._etags: Dict[str, Tuple[Dict[str, str], Any]] = {}  # url -> (validators, body)
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0                                       # epoch seconds
+        self.stats = {"requests": 0, "not_modified": 0, "rate_waits": 0}
+
+    # ---- rate limit bookkeeping ----
+    def _record_limits(self, resp: requests.Response) -> None:
+        h = resp.headers
+        with self._lock:
+            self.stats["requests"] += 1
+            if "X-RateLimit-Remaining" in h:
+                try:
+                    self.remaining = int(h["X-RateLimit-Remaining"])
+                    self.reset_at = float(h.get("X-RateLimit-Reset", self.reset_at))
+                except ValueError:
+                    pass
+            if "Retry-After" in h:
+                try:
+                    self.remaining = 0
+                    self.reset_at = max(self.reset_at, time.time() + float(h["Retry-After"]))
+                except ValueError:
+                    pass
+            self._wake.notify_all()
+
+    def _wait_for_budget(self) -> None:
+        with self._lock:
+            while self.remaining is not None and self.remaining <= 0:
+                wait = self.reset_at - time.time()
+                if wait <= 0:
+                    self.remaining = None  # window rolled over; the next response tells us
+                    break
+                if wait > MAX_RATE_WAIT_S:
+                    raise RateLimited(f"GitHub rate limit exhausted; resets in {wait:.0f}s",
+                                      self.reset_at, retryable=False)
+                self.stats["rate_waits"] += 1
+                print(f"[http] rate limit exhausted, waiting {wait:.1f}s for reset")
+                self._wake.wait(timeout=wait)
+            if self.remaining is not None:
+                self.remaining -= 1  # reserve one call for this request
+
+    # ---- requests ----
+    def _url(self, path: str) -> str:
+        return path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        self._wait_for_budget()
+        kwargs.setdefault("timeout", 20)
+        try:
+            resp = self.session.request(method, self._url(path), **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientError(f"network error: {e}")
+        self._record_limits(resp)
+        return resp
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Conditional GET; returns the cached body on 304 Not Modified."""
+        url = self._url(path)
+        key = url + ("?" + "&".join(f"{k}={params[k]}" for k in sorted(params)) if params else "")
+        with self._lock:
+            cached = self._etags.get(key)
+        headers = {}
+        if cached:
+            validators = cached[0]
+            if "etag" in validators:
+                headers["If-None-Match"] = validators["etag"]
+            if "last_modified" in validators:
+                headers["If-Modified-Since"] = validators["last_modified"]
+        resp = self.request("GET", url, params=params, headers=headers)
+        if resp.status_code == 304 and cached:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return cached[1]
+        body = self.check(resp)
+        validators = {}
+        if resp.headers.get("ETag"):
+            validators["etag"] = resp.headers["ETag"]
+        if resp.headers.get("Last-Modified"):
+            validators["last_modified"] = resp.headers["Last-Modified"]
+        if validators:
+            with self._lock:
+                self._etags.pop(key, None)
+                self._etags[key] = (validators, body)
+                while len(self._etags) > ETAG_CACHE_MAX:
+                    self._etags.pop(next(iter(self._etags)))
+        return body
+
+    def post_json(self, path: str, payload: Dict[str, Any]) -> Any:
+        return self.check(self.request("POST", path, json=payload))
+
+    def check(self, resp: requests.Response) -> Any:
+        """Classify GitHub responses as transient / rate-limited / fatal."""
+        if resp.status_code in (403, 429) and (
+            resp.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in resp.headers
+        ):
+            raise RateLimited(f"GitHub rate limited ({resp.status_code})", self.reset_at)
+        if resp.status_code in TRANSIENT_STATUS:
+            raise TransientError(f"GitHub transient {resp.status_code}: {resp.text[:200]}")
+        if resp.status_code >= 400:
+            raise Exception(f"GitHub error {resp.status_code}: {resp.text[:200]}")
+        return resp.json() if resp.content else {}
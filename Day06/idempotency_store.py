@@ -1,29 +1,168 @@
+"""
+Idempotency state for the ops agent, in SQLite (WAL mode).
+
+- One row per key: status "success" (done) or "pending" (claimed by a runner
+  that is executing it right now), the JSON payload, and an optional expiry.
+- claim() takes a lease inside a write transaction, so two runners sharing a
+  state file never execute the same key; a crashed runner's lease simply
+  expires (OPS_IDEM_LEASE_S).
+- Success rows can expire too (per step `idempotency.ttl`, else OPS_IDEM_TTL_S;
+  0 = keep forever). Expired rows read as missing and are purged on open.
+- get_many() answers a whole runbook in one query.
+
+A legacy whole-file JSON state (.ops_state.json) next to the database is
+imported once when the database is created.
+"""
 import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_TTL_S = float(os.getenv("OPS_IDEM_TTL_S", "0"))
+LEASE_S = float(os.getenv("OPS_IDEM_LEASE_S", "900"))
+_SQL_VARS = 500  # stay under SQLite's bound-parameter limit
+
+# claim() outcomes
+CLAIMED, SUCCEEDED, BUSY = "claimed", "succeeded", "busy"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    key        TEXT PRIMARY KEY,
+    status     TEXT NOT NULL,          -- 'success' | 'pending'
+    owner      TEXT,
+    payload    TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL,
+    expires_at REAL                    -- NULL = never
+);
+CREATE INDEX IF NOT EXISTS idempotency_expires ON idempotency(expires_at);
+"""
+
 
 class IdempotencyStore:
-    def __init__(self, path: Path):
-        self.path = path
-        if not self.path.exists():
-            self._save({})
+    def __init__(self, path: Path, owner: Optional[str] = None):
+        path = Path(path)
+        # `--state .ops_state.json` keeps working: the data now lives in .ops_state.db
+        self.path = path.with_suffix(".db") if path.suffix == ".json" else path
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        fresh = not self.path.exists()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        if fresh:
+            self._import_json(self.path.with_suffix(".json"))
+        self.purge_expired()
 
-    def _load(self) -> Dict[str, Any]:
-        return json.loads(self.path.read_text(encoding="utf-8"))
+    # ---- internals ----
+    def _import_json(self, legacy: Path) -> None:
+        try:
+            data = json.loads(legacy.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        rows = [
+            (key, json.dumps({k: v for k, v in entry.items() if k != "status"}), now)
+            for key, entry in data.items()
+            if isinstance(entry, dict) and entry.get("status") == "success"
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO idempotency(key, status, payload, updated_at) "
+                "VALUES (?, 'success', ?, ?)", rows)
+        print(f"[idempotency] imported {len(rows)} key(s) from {legacy}")
 
-    def _save(self, data: Dict[str, Any]) -> None:
-        self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    @staticmethod
+    def _entry(status: str, payload: str) -> Dict[str, Any]:
+        return {"status": status, **json.loads(payload)}
 
-    def is_success(self, key: str) -> bool:
-        data = self._load()
-        entry = data.get(key)
-        return bool(entry and entry.get("status") == "success")
+    @staticmethod
+    def _expiry(ttl_s: Optional[float]) -> Optional[float]:
+        ttl_s = DEFAULT_TTL_S if ttl_s is None else ttl_s
+        return time.time() + ttl_s if ttl_s and ttl_s > 0 else None
 
+    # ---- reads ----
     def get(self, key: str) -> Dict[str, Any]:
-        data = self._load()
-        return data.get(key, {})
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, payload FROM idempotency "
+                "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())).fetchone()
+        return self._entry(*row) if row else {}
+
+    def is_success(self, key: str) -> bool:
+        return self.get(key).get("status") == "success"
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Successful, unexpired entries for `keys` (missing keys are left out)."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        out: Dict[str, Dict[str, Any]] = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _SQL_VARS):
+                chunk = keys[i:i + _SQL_VARS]
+                rows = self._db.execute(
+                    f"SELECT key, status, payload FROM idempotency "
+                    f"WHERE key IN ({','.join('?' * len(chunk))}) AND status = 'success' "
+                    f"AND (expires_at IS NULL OR expires_at > ?)", (*chunk, now)).fetchall()
+                out.update({key: self._entry(status, payload) for key, status, payload in rows})
+        return out
+
+    # ---- writes ----
+    def claim(self, key: str, lease_s: float = LEASE_S) -> str:
+        """
+        Take the key for this runner before executing it.
+        Returns CLAIMED, SUCCEEDED (already done, skip it) or BUSY (another
+        runner holds an unexpired claim).
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # serialises claimers across processes
+            try:
+                row = self._db.execute(
+                    "SELECT status, owner FROM idempotency "
+                    "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, now)).fetchone()
+                if row and row[0] == "success":
+                    outcome = SUCCEEDED
+                elif row and row[1] != self.owner:
+                    outcome = BUSY
+                else:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO idempotency(key, status, owner, updated_at, expires_at) "
+                        "VALUES (?, 'pending', ?, ?, ?)", (key, self.owner, now, now + lease_s))
+                    outcome = CLAIMED
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return outcome
+
+    def release(self, key: str) -> None:
+        """Drop this runner's pending claim (the step failed; let it be retried)."""
+        with self._lock:
+            self._db.execute("DELETE FROM idempotency WHERE key = ? AND status = 'pending' AND owner = ?",
+                             (key, self.owner))
+
+    def mark_success(self, key: str, payload: Dict[str, Any], ttl_s: Optional[float] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO idempotency(key, status, owner, payload, updated_at, expires_at) "
+                "VALUES (?, 'success', ?, ?, ?, ?)",
+                (key, self.owner, json.dumps(payload), time.time(), self._expiry(ttl_s)))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._db.execute("DELETE FROM idempotency WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                                   (time.time(),))
+        return cur.rowcount
 
-    def mark_success(self, key: str, payload: Dict[str, Any]) -> None:
-        data = self._load()
-        data[key] = {"status": "success", **payload}
-        self._save(data)
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -4,6 +4,16 @@ from typing import Callable
 class TransientError(Exception):
     """Operation can be retried (network / 429 / 5xx)."""
 
+class RateLimited(TransientError):
+    """Rate limit hit. The HTTP layer holds new requests until `retry_at`
+    (epoch seconds), so retries go straight back to it with no extra backoff.
+    `retryable=False` means the reset is too far away to wait for."""
+
+    def __init__(self, msg: str, retry_at: float = 0.0, retryable: bool = True):
+        super().__init__(msg)
+        self.retry_at = retry_at
+        self.retryable = retryable
+
 def backoff_retry(
     fn: Callable[[], dict],
     max_attempts: int = 4,
@@ -16,6 +26,12 @@ def backoff_retry(
     while attempt <= max_attempts:
         try:
             return fn()
+        except RateLimited as e:
+            if not e.retryable:
+                raise
+            last_err = e
+            attempt += 1
+            continue
         except TransientError as e:
             last_err = e
         except Exception as e:
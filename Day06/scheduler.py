@@ -0,0 +1,145 @@
+"""
+Dependency-aware step scheduler for Day06 runbooks.
+
+- A step is ready once every step in its `depends_on` has succeeded (or was
+  skipped as already done by idempotency).
+- Ready steps run on a bounded thread pool, in runbook order, without going
+  over the per-tool caps (`concurrency.tools` in the runbook).
+- When a step fails, everything that depends on it is blocked. With
+  continue_on_failure the independent branches keep going; otherwise no new
+  steps start and the ones in flight are allowed to finish.
+
+skip(step) is called exactly once per step, when it is about to be dispatched.
+Results are handed back on the calling thread (on_done), so printing and the
+idempotency store never run concurrently.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+# step statuses
+OK, FAILED, SKIPPED, BLOCKED, NOT_RUN = "ok", "failed", "skipped", "blocked", "not-run"
+_DONE = (OK, SKIPPED)
+
+
+def dependency_indexes(steps: List[dict]) -> List[List[int]]:
+    """depends_on names -> 0-based step indexes (load_runbook has validated them)."""
+    by_name = {s["name"]: i for i, s in enumerate(steps)}
+    return [[by_name[d] for d in s.get("depends_on", [])] for s in steps]
+
+
+def run_steps(
+    steps: List[dict],
+    run: Callable[[dict], Any],
+    max_workers: int = 4,
+    tool_caps: Optional[Dict[str, int]] = None,
+    continue_on_failure: bool = False,
+    skip: Optional[Callable[[dict], bool]] = None,
+    on_done: Optional[Callable[[int, dict, str, Any], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run `steps` and return one record per step, in runbook order:
+    {"status", "start", "end", "result" | "error"} (times relative to the run start).
+    on_done(idx, step, status, result_or_error) fires as each step settles.
+    """
+    tool_caps = tool_caps or {}
+    deps = dependency_indexes(steps)
+    records: List[Dict[str, Any]] = [{"status": None, "start": None, "end": None} for _ in steps]
+    running: Dict[Any, int] = {}     # future -> step index
+    per_tool: Dict[str, int] = {}
+    stop = False
+    t0 = time.perf_counter()
+
+    def settle(i: int, status: str, value: Any = None) -> None:
+        rec = records[i]
+        rec["status"] = status
+        if rec["start"] is None:
+            rec["start"] = rec["end"] = time.perf_counter() - t0
+        if status == FAILED:
+            rec["error"] = str(value)
+        elif status in _DONE:
+            rec["result"] = value
+        if on_done:
+            on_done(i, steps[i], status, value)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="step") as pool:
+        while True:
+            progressed = True
+            while progressed:  # skips and blocks can unlock further steps without running anything
+                progressed = False
+                for i, step in enumerate(steps):
+                    if records[i]["start"] is not None:  # started or settled
+                        continue
+                    dep_status = [records[d]["status"] for d in deps[i]]
+                    if any(s in (FAILED, BLOCKED, NOT_RUN) for s in dep_status):
+                        settle(i, BLOCKED)
+                        progressed = True
+                        continue
+                    if stop or not all(s in _DONE for s in dep_status):
+                        continue
+                    tool = step["tool"]
+                    cap = tool_caps.get(tool)
+                    if len(running) >= max_workers or (cap and per_tool.get(tool, 0) >= cap):
+                        continue
+                    # skip() may claim the step's key, so it is asked once, at dispatch
+                    if skip and skip(step):
+                        settle(i, SKIPPED)
+                        progressed = True
+                        continue
+                    per_tool[tool] = per_tool.get(tool, 0) + 1
+                    records[i]["start"] = time.perf_counter() - t0
+                    running[pool.submit(run, step)] = i
+
+            if not running:
+                break
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in sorted(finished, key=lambda f: running[f]):
+                i = running.pop(fut)
+                per_tool[steps[i]["tool"]] -= 1
+                records[i]["end"] = time.perf_counter() - t0
+                try:
+                    settle(i, OK, fut.result())
+                except Exception as e:
+                    settle(i, FAILED, e)
+                    stop = stop or not continue_on_failure
+
+    for i, rec in enumerate(records):
+        if rec["status"] is None:  # never started because an unrelated step failed
+            settle(i, NOT_RUN)
+    return records
+
+
+def critical_path(steps: List[dict], records: List[Dict[str, Any]]) -> List[int]:
+    """The chain that decided the finish time: start from the step that ended
+    last and walk back through whichever dependency ended last. Only steps that
+    actually ran (ok/failed) count; skipped, blocked and not-run ones are settled
+    without running, so their times say nothing about the finish."""
+    ran = [j for j, rec in enumerate(records) if rec["status"] in (OK, FAILED)]
+    if not ran:
+        return []
+    deps = dependency_indexes(steps)
+    i: Optional[int] = max(ran, key=lambda j: records[j]["end"])
+    path = []
+    while i is not None:
+        path.append(i)
+        i = max((j for j in deps[i] if records[j]["status"] in (OK, FAILED)),
+                key=lambda j: records[j]["end"], default=None)
+    return path[::-1]
+
+
+def print_summary(steps: List[dict], records: List[Dict[str, Any]], wall: float) -> None:
+    print("\nTiming summary")
+    print(f"  {'#':>3}  {'status':<8} {'start':>7} {'dur':>7}  step")
+    for idx, (step, rec) in enumerate(zip(steps, records), start=1):
+        if rec["status"] in (OK, FAILED):
+            timing = f"{rec['start']:>6.2f}s {rec['end'] - rec['start']:>6.2f}s"
+        else:
+            timing = f"{'-':>7} {'-':>7}"
+        print(f"  {idx:>3}  {rec['status']:<8} {timing}  {step['name']}")
+    path = critical_path(steps, records)
+    if not path:
+        print(f"  critical path: none (no step ran; wall {wall:.2f}s)")
+        return
+    busy = sum(records[i]["end"] - records[i]["start"] for i in path)
+    print(f"  critical path: {' → '.join(steps[i]['name'] for i in path)}")
+    print(f"  ({busy:.2f}s running, finished at {records[path[-1]]['end']:.2f}s; wall {wall:.2f}s)")
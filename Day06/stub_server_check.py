@@ -0,0 +1,108 @@
+# Day06/stub_server_check.py
+"""
+Exercise the Day06 GitHub tools against a local stub server (no token, no network).
+
+    python stub_server_check.py
+
+Checks: pooled concurrent POSTs, ETag / 304 on reads, and that an exhausted
+rate limit makes requests wait for the reset instead of backing off.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATE = {"issues": 0, "posts": 0, "gets": 0, "not_modified": 0, "limited": False, "reset": 0.0}
+LOCK = threading.Lock()
+
+
+class StubGitHub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the pool is actually reused
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _limited(self):
+        with LOCK:
+            if STATE["limited"] and time.time() < STATE["reset"]:
+                return True
+            STATE["limited"] = False
+            return False
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self._limited():
+            return self._send(403, {"message": "API rate limit exceeded"},
+                              {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(STATE["reset"])})
+        time.sleep(0.2)  # simulated API latency
+        with LOCK:
+            STATE["issues"] += 1
+            STATE["posts"] += 1
+            n = STATE["issues"]
+        self._send(201, {"number": n, "html_url": f"http://stub/o/r/issues/{n}"},
+                   {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(int(time.time()) + 3600)})
+
+    def do_GET(self):
+        number = self.path.rstrip("/").rsplit("/", 1)[-1]
+        etag = f'"issue-{number}-v1"'
+        with LOCK:
+            STATE["gets"] += 1
+        if self.headers.get("If-None-Match") == etag:
+            with LOCK:
+                STATE["not_modified"] += 1
+            return self._send(304, None, {"ETag": etag})
+        self._send(200, {"number": int(number), "state": "open", "title": f"issue {number}",
+                         "html_url": f"http://stub/o/r/issues/{number}"}, {"ETag": etag})
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GITHUB_API_BASE"] = f"http://127.0.0.1:{server.server_port}"
+
+    from tools import github_create_issue, github_get_issue, http  # after GITHUB_API_BASE is set
+
+    # 1) concurrent creates share the pool and overlap
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        created = list(pool.map(lambda i: github_create_issue("o", "r", f"t{i}"), range(8)))
+    elapsed = time.perf_counter() - t0
+    assert len({c["number"] for c in created}) == 8, created
+    assert elapsed < 0.2 * 8 / 2, f"creates did not overlap ({elapsed:.2f}s)"
+    print(f"[check] 8 concurrent creates in {elapsed:.2f}s (serial would be ~1.6s)")
+
+    # 2) repeated reads revalidate with If-None-Match and get 304s
+    first = github_get_issue("o", "r", 1)
+    again = github_get_issue("o", "r", 1)
+    assert first == again and STATE["not_modified"] == 1, STATE
+    print(f"[check] conditional GET: {STATE['gets']} GETs, {STATE['not_modified']} answered 304")
+
+    # 3) exhausted rate limit: the retry waits for the reset, no blind backoff
+    with LOCK:
+        STATE["limited"], STATE["reset"] = True, time.time() + 1.0
+    t0 = time.perf_counter()
+    out = github_create_issue("o", "r", "after reset")
+    waited = time.perf_counter() - t0
+    assert out["number"] == 9 and 0.8 <= waited < 2.5, (out, waited)
+    assert http.stats["rate_waits"] >= 1, http.stats
+    print(f"[check] rate limited → waited {waited:.2f}s for reset, then created #{out['number']}")
+
+    print(f"[check] http stats: {http.stats}")
+    server.shutdown()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 import os
-import requests
 from dotenv import load_dotenv
 from typing import Dict, Any
-from retry import backoff_retry, TransientError
+from retry import backoff_retry
+from http_client import OpsHTTP
 
 # load environment variables
 load_dotenv()
@@ -10,21 +10,9 @@ load_dotenv()
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_API_BASE = os.getenv("GITHUB_API_BASE", "https://api.github.com")
 
-session = requests.Session()
-if GITHUB_TOKEN:
-    session.headers.update({
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json"
-    })
-
-
-def _handle_resp(resp: requests.Response) -> Dict[str, Any]:
-    """Helper to classify GitHub responses as transient/fatal."""
-    if resp.status_code in (429, 500, 502, 503, 504):
-        raise TransientError(f"GitHub transient {resp.status_code}: {resp.text[:200]}")
-    if resp.status_code >= 400:
-        raise Exception(f"GitHub error {resp.status_code}: {resp.text[:200]}")
-    return resp.json()
+# pooled, rate-limit aware client (see http_client.py); shared by all runbook workers
+http = OpsHTTP(GITHUB_API_BASE, GITHUB_TOKEN)
+session = http.session
 
 
 def github_create_issue(owner: str, repo: str, title: str, body: str = "", dry_run: bool = False) -> Dict[str, Any]:
@@ -38,16 +26,26 @@ def github_create_issue(owner: str, repo: str, title: str, body: str = "", dry_r
     if dry_run:
         return {"dry_run": True, "owner": owner, "repo": repo, **payload}
 
-    url = f"{GITHUB_API_BASE}/repos/{owner}/{repo}/issues"
-
     def attempt():
-        resp = session.post(url, json=payload, timeout=20)
-        data = _handle_resp(resp)
+        data = http.post_json(f"/repos/{owner}/{repo}/issues", payload)
         return {"number": data.get("number"), "url": data.get("html_url")}
 
     return backoff_retry(attempt, max_attempts=4, base=0.6, factor=2.0, jitter=0.3)
 
 
+def github_get_issue(owner: str, repo: str, number: int, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Read one issue (state, title, url). Read-only, so it also runs in dry-run.
+    Uses a conditional GET: an unchanged issue costs a 304, not a full fetch.
+    """
+    def attempt():
+        data = http.get_json(f"/repos/{owner}/{repo}/issues/{int(number)}")
+        return {"number": data.get("number"), "state": data.get("state"),
+                "title": data.get("title"), "url": data.get("html_url")}
+
+    return backoff_retry(attempt, max_attempts=4, base=0.6, factor=2.0, jitter=0.3)
+
+
 def echo(message: str, dry_run: bool = False) -> Dict[str, Any]:
     payload = {"message": message}
     if dry_run:
@@ -57,4 +55,5 @@ def echo(message: str, dry_run: bool = False) -> Dict[str, Any]:
 TOOL_REGISTRY = {
     "echo": echo,
     "github.create_issue": github_create_issue,
-}
\ No newline at end of file
+    "github.get_issue": github_get_issue,
+}
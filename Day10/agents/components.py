@@ -0,0 +1,77 @@
+"""Lazily-built singletons for the Day10 agent: LLM, semantic memory, compiled graph.
+
+Nothing here does work at import time. Each getter builds its component on
+first use (thread-safe) and returns the same instance afterwards; `warmup()`
+builds them up front, e.g. from a background thread when the UI starts.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+_lock = threading.RLock()
+_instances: Dict[str, Any] = {}
+
+
+def _get(name: str, factory: Callable[[], Any]) -> Any:
+    inst = _instances.get(name)
+    if inst is None:
+        with _lock:
+            inst = _instances.get(name)
+            if inst is None:
+                inst = factory()
+                _instances[name] = inst
+    return inst
+
+
+def get_llm():
+    def _build():
+        from langchain.chat_models import init_chat_model
+        return init_chat_model(os.getenv("DAY10_MODEL", "openai:gpt-4o-mini"))
+    return _get("llm", _build)
+
+
+def get_semantic():
+    def _build():
+        from Day10.memory.semantic import SemanticMemory
+        return SemanticMemory()
+    return _get("semantic", _build)
+
+
+def get_graph():
+    def _build():
+        from Day10.agents.graph import compile_graph
+        return compile_graph()
+    return _get("graph", _build)
+
+
+def get_memory_writer():
+    def _build():
+        from Day10.memory import writer
+        from Day10.agents.graph import extract_memory_fact
+        return writer.MemoryWriter(
+            extract=extract_memory_fact,
+            store=lambda facts: get_semantic().add_many(facts, tags=["pref"], confidence=0.7),
+            maxsize=writer.MEMORY_QUEUE_MAX,
+            batch_size=writer.MEMORY_BATCH,
+            linger_s=writer.MEMORY_LINGER_S,
+            drop=writer.MEMORY_DROP,
+        )
+    return _get("memory_writer", _build)
+
+
+def warmup(memory: bool = True) -> Dict[str, int]:
+    """Build every component now; returns build time per component in ms."""
+    timings = {}
+    getters = [("llm", get_llm), ("graph", get_graph)]
+    if memory:
+        getters.insert(1, ("semantic", get_semantic))
+    for name, getter in getters:
+        t0 = time.perf_counter()
+        getter()
+        timings[name] = int((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def is_built(name: str) -> bool:
+    return name in _instances
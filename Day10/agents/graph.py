@@ -1,19 +1,22 @@
 import os
 import re
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict
 from dotenv import load_dotenv
 load_dotenv()
 
 from langgraph.graph import StateGraph, START, END
-from langchain.chat_models import init_chat_model
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 from Day10.agents.state import AgentState
 from Day10.app.sql_utils import list_tables, list_columns, is_safe_sql
+from Day10.app.preflight import preflight
 from Day10.tools.registry import registry
 from Day10.tools.duckdb_tool import query as duckdb_query
 from Day10.tools.schema_tool import list_tables_tool, describe_table_tool, schema_summary_tool
-from Day10.memory.semantic import SemanticMemory
+from Day10.agents.components import get_llm, get_semantic, get_graph, get_memory_writer
+from Day10.memory.semantic import is_time_window_text
+from Day10.memory.writer import MEMORY_ASYNC
 from Day10.observability.tracing import trace_span
 
 
@@ -29,9 +32,11 @@ def build_schema_summary() -> str:
     return registry.call("schema.summary")
 
 
-llm = init_chat_model(os.getenv("DAY10_MODEL", "openai:gpt-4o-mini"))
-semantic = SemanticMemory()
+# LLM, semantic memory and the compiled graph are built lazily (see components.py)
 MEMORY_ON = os.getenv("SEMANTIC_ENABLED", "true").lower() == "true"
+# >1 drafts that many SQL candidates in parallel; pick "first" valid or "cheapest" plan
+NL2SQL_CANDIDATES = max(1, int(os.getenv("NL2SQL_CANDIDATES", "1")))
+NL2SQL_PICK = os.getenv("NL2SQL_PICK", "first").lower()
 
 
 def supervisor(state: AgentState) -> AgentState:
@@ -56,9 +61,8 @@ def memory_retrieve(state: AgentState) -> AgentState:
     hits = []
     if MEMORY_ON and nl:
         with trace_span("memory.retrieve"):
-            raw_hits = semantic.search(nl, k=int(os.getenv("MEMORY_K", "3")))
-            # filter out time-window prefs to avoid biasing all queries
-            hits = [h for h in raw_hits if not _is_time_window_pref(h)]
+            # time-window prefs are filtered in the store so they never bias other queries
+            hits = get_semantic().search(nl, k=int(os.getenv("MEMORY_K", "3")), exclude_time_window=True)
     return {"memory_hits": hits, "messages": []}
 
 
@@ -86,12 +90,63 @@ def nl2sql(state: AgentState) -> AgentState:
         return current_has_time or not _is_time_window_pref(content)
     convo = [m for m in prior_msgs if isinstance(m, (HumanMessage, AIMessage)) and _msg_ok(m)]
     human = HumanMessage(content=nl)
-    with trace_span("nl2sql.invoke", msgs=len(convo) + 1):
-        ai = llm.invoke([system] + convo + [human])
+    msgs = [system] + convo + [human]
+    if NL2SQL_CANDIDATES > 1:
+        with trace_span("nl2sql.fanout", k=NL2SQL_CANDIDATES, pick=NL2SQL_PICK):
+            ai, sql = _generate_best_candidate(msgs)
+        return {"sql": sql, "messages": [ai]}
+    with trace_span("nl2sql.invoke", msgs=len(msgs) - 1):
+        ai = get_llm().invoke(msgs)
     sql = _sanitize_sql_output(ai.content)
     return {"sql": sql, "messages": [ai]}
 
 
+def _candidate(msgs) -> dict:
+    """One LLM draft, sanitized and validated against DuckDB via EXPLAIN."""
+    ai = get_llm().invoke(msgs)
+    sql = _sanitize_sql_output(ai.content)
+    if not is_safe_sql(sql):
+        return {"ai": ai, "sql": sql, "ok": False, "cost": None}
+    pf = preflight(sql)  # cached per SQL hash, so sql_safety re-uses this plan
+    return {"ai": ai, "sql": sql, "ok": pf["verdict"] != "reject", "cost": pf["cost"]}
+
+
+def _generate_best_candidate(msgs):
+    """Fan out NL2SQL_CANDIDATES drafts on a thread pool.
+
+    pick=first returns as soon as one draft validates. The other drafts are not
+    waited for, but an LLM call that has started cannot be interrupted: it runs
+    to completion in the background (spending its tokens) and its result is ignored.
+    pick=cheapest waits for all and returns the valid draft with the lowest plan
+    cost (ties go to the lower draft index).
+    If nothing validates, draft 0 (else the lowest-numbered draft that returned)
+    is returned so sql_safety reports why.
+    """
+    pool = ThreadPoolExecutor(max_workers=NL2SQL_CANDIDATES)
+    futures = {pool.submit(_candidate, msgs): i for i in range(NL2SQL_CANDIDATES)}
+    done: Dict[int, dict] = {}  # draft index -> candidate
+    try:
+        for fut in as_completed(futures):
+            try:
+                cand = fut.result()
+            except Exception:
+                continue
+            done[futures[fut]] = cand
+            if cand["ok"] and NL2SQL_PICK == "first":
+                return cand["ai"], cand["sql"]
+    finally:
+        # return without joining the drafts still running; they finish on their own
+        pool.shutdown(wait=False, cancel_futures=True)
+    valid = [(i, c) for i, c in sorted(done.items()) if c["ok"]]
+    if valid:
+        _, best = min(valid, key=lambda ic: (ic[1]["cost"] if ic[1]["cost"] is not None else float("inf"), ic[0]))
+        return best["ai"], best["sql"]
+    if not done:
+        raise RuntimeError("All NL2SQL candidates failed")
+    first = done[min(done)]
+    return first["ai"], first["sql"]
+
+
 def sql_safety(state: AgentState) -> AgentState:
     sql = (state.get("sql") or "").strip()
     if not sql:
@@ -100,7 +155,20 @@ def sql_safety(state: AgentState) -> AgentState:
         ok = is_safe_sql(sql)
     if not ok:
         raise ValueError("Unsafe SQL proposed by model")
-    return {"messages": []}
+    # EXPLAIN-based pre-flight: add a LIMIT to huge results, reject over-budget plans
+    with trace_span("sql.preflight"):
+        pf = preflight(sql)
+    events = (state.get("tool_events") or []) + [{
+        "tool": "sql.preflight",
+        "ok": pf["verdict"] != "reject",
+        "verdict": pf["verdict"],
+        "est_rows": pf["est_rows"],
+        "cost": pf["cost"],
+        "cached": pf["cached"],
+    }]
+    if pf["verdict"] == "reject":
+        raise ValueError(f"SQL rejected by pre-flight: {pf['reason']}")
+    return {"sql": pf["sql"], "tool_events": events, "messages": []}
 
 
 def executor(state: AgentState) -> AgentState:
@@ -128,7 +196,15 @@ def compile_graph():
     return builder.compile()
 
 
-graph = compile_graph()
+def __getattr__(name):
+    # Back-compat for `from Day10.agents.graph import graph/llm/semantic` without import-time init
+    if name == "graph":
+        return get_graph()
+    if name == "llm":
+        return get_llm()
+    if name == "semantic":
+        return get_semantic()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --- helpers
@@ -146,19 +222,12 @@ def _sanitize_sql_output(text: str) -> str:
     return parts[0] + (";" if not parts[0].endswith(";") else "")
 
 def _is_time_window_pref(text: str) -> bool:
-    t = (text or "").lower()
-    keys = [
-        "last 7 days", "last seven days", "past week",
-        "last 30 days", "last thirty days", "past month",
-        "last 90 days", "past 3 months", "past three months",
-        "today", "yesterday", "this week", "this month",
-    ]
-    return any(k in t for k in keys)
+    return is_time_window_text(text)
 
 
-def write_memory_from_exchange(user_text: str, ai_sql: str) -> str:
-    """Extract ONE durable user preference/fact from the last exchange and persist.
-    Returns the stored fact or empty string if none."""
+def extract_memory_fact(user_text: str, ai_sql: str) -> str:
+    """Ask the LLM for ONE durable user preference/fact in the exchange.
+    Returns the fact or empty string if none (nothing is stored here)."""
     user_text = (user_text or "").strip()
     ai_sql = (ai_sql or "").strip()
     if not user_text or not ai_sql:
@@ -172,7 +241,7 @@ def write_memory_from_exchange(user_text: str, ai_sql: str) -> str:
         HumanMessage(content=f"User: {user_text}\nSQL: {ai_sql}")
     ]
     try:
-        candidate = llm.invoke(prompt).content.strip()
+        candidate = get_llm().invoke(prompt).content.strip()
     except Exception:
         return ""
     if not candidate or candidate.upper() == "NONE":
@@ -183,10 +252,23 @@ def write_memory_from_exchange(user_text: str, ai_sql: str) -> str:
     lower = candidate.lower()
     if any(key in lower for key in ["last 7 days", "last 30 days", "last 90 days", "past week", "past month", "past 3 months"]):
         return ""
+    return candidate
+
+
+def write_memory_from_exchange(user_text: str, ai_sql: str) -> str:
+    """Extract ONE durable user preference/fact from the last exchange and persist.
+
+    With MEMORY_ASYNC (default) the exchange is handed to the background memory
+    writer and "" is returned immediately; otherwise extraction and the store
+    happen inline and the stored fact (or "") is returned."""
+    if MEMORY_ASYNC:
+        get_memory_writer().submit(user_text, ai_sql)
+        return ""
+    candidate = extract_memory_fact(user_text, ai_sql)
+    if not candidate:
+        return ""
     try:
-        semantic.add(candidate, tags=["pref"], confidence=0.7)
+        get_semantic().add(candidate, tags=["pref"], confidence=0.7)
         return candidate
     except Exception:
         return ""
-
-
@@ -3,9 +3,8 @@ import pandas as pd
 
 from langchain_core.messages import HumanMessage
 
-from agents.graph import graph
-from agents.state import AgentState
-from tools.registry import registry
+from Day10.agents.components import get_graph
+from Day10.agents.state import AgentState
 from Day10.observability.tracing import trace_span
 
 
@@ -17,7 +16,7 @@ def generate_sql(nl_query: str) -> str:
         "schema_summary": "",
     }
     with trace_span("adapter.generate_sql"):
-        out = graph.invoke(state)
+        out = get_graph().invoke(state)
     # After graph run, sql should be in state (set by nl2sql)
     return (out.get("sql") or "").strip()
 
@@ -42,7 +41,7 @@ def chat_generate_sql(history: List[Tuple[str, str]], user_text: str) -> str:
         "nl_query": user_text,
     }
     with trace_span("adapter.chat_generate_sql", hist_len=len(history)):
-        out = graph.invoke(state)
+        out = get_graph().invoke(state)
     return (out.get("sql") or "").strip()
 
 
@@ -54,25 +53,10 @@ def memory_write_from_last_exchange(history: List[Tuple[str, str]], ai_sql: str)
         if role == "user":
             user_text = content
             break
-    # Lazy import to avoid stale module caching and import order issues
+    # The graph module holds no eagerly-built state, so a plain import is enough
+    from Day10.agents.graph import write_memory_from_exchange
     try:
-        import importlib, agents.graph as g  # type: ignore
-        g = importlib.reload(g)
-        fn = getattr(g, "write_memory_from_exchange", None)
-        if fn is None:
-            raise AttributeError
         with trace_span("adapter.memory_write"):
-            return fn(user_text, ai_sql)
+            return write_memory_from_exchange(user_text, ai_sql)
     except Exception:
-        try:
-            import importlib, Day10.agents.graph as g2  # type: ignore
-            g2 = importlib.reload(g2)
-            fn2 = getattr(g2, "write_memory_from_exchange", None)
-            if fn2 is None:
-                return ""
-            with trace_span("adapter.memory_write"):
-                return fn2(user_text, ai_sql)
-        except Exception:
-            return ""
-
-
+        return ""
@@ -0,0 +1,184 @@
+# Day10/app/preflight.py
+"""EXPLAIN-based cost guard for agent-generated SQL.
+
+Before a generated query reaches the executor we ask DuckDB for its plan,
+read the estimated cardinalities, and either accept it, append a LIMIT when
+the result would be huge, or reject it when the plan is over budget (e.g. an
+accidental cross join). Verdicts are cached per SQL hash until the DB changes.
+"""
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+
+from Day10.app.sql_utils import DB_PATH, connect_ro
+
+MAX_RESULT_ROWS = int(os.getenv("PREFLIGHT_MAX_ROWS", "10000"))       # larger results get a LIMIT
+MAX_PLAN_COST = int(os.getenv("PREFLIGHT_MAX_COST", "50000000"))      # sum of operator row estimates
+CACHE_SIZE = 256
+
+_NESTED_LOOP_OPS = {"CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN", "PIECEWISE_MERGE_JOIN"}
+_LIMIT_OPS = {"LIMIT", "STREAMING_LIMIT"}
+_STREAMING_OPS = {"PROJECTION", "FILTER", "SEQ_SCAN", "TABLE_SCAN", "UNNEST"}
+_PROBE_SIDE_OPS = {"HASH_JOIN", "CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN", "PIECEWISE_MERGE_JOIN"}
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TEXT_OP_RE = re.compile(r"│\s+([A-Z][A-Z_]+[A-Z])\s+[│├]")
+_TEXT_EST_RE = re.compile(r"~([\d,]+) rows|EC: (\d+)")
+
+_cache: "OrderedDict[str, Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+
+
+def sql_hash(sql: str) -> str:
+    norm = " ".join((sql or "").strip().rstrip(";").split())
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+
+def _top_level_limit(sql: str) -> Tuple[bool, Optional[int]]:
+    """(outermost statement has a LIMIT, its literal row count if it has one)."""
+    text = _COMMENT_RE.sub(" ", _STR_RE.sub("''", sql or ""))
+    depth = 0
+    for tok in re.finditer(r"\(|\)|\blimit\b", text, re.IGNORECASE):
+        t = tok.group(0)
+        if t == "(":
+            depth += 1
+        elif t == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            m = re.match(r"\s+(\d+)\b", text[tok.end():])
+            return True, int(m.group(1)) if m else None
+    return False, None
+
+
+def has_top_level_limit(sql: str) -> bool:
+    """True if the outermost statement already has a LIMIT (subquery limits don't count)."""
+    return _top_level_limit(sql)[0]
+
+
+def _walk_json(node: Dict[str, Any], names: List[str], estimates: List[int],
+               cap: Optional[int] = None, sql_limit: Optional[int] = None) -> int:
+    """
+    Collect operator names/estimates; returns this node's estimated rows.
+    Under a LIMIT, operators that only stream rows upwards stop early, so their
+    estimate is capped at the limit. Blocking operators (sorts, aggregates) and
+    the materialised side of a join still consume their whole input.
+    """
+    name = node.get("name", "")
+    names.append(name)
+    children = node.get("children") or []
+    if name in _LIMIT_OPS:
+        cap, sql_limit = sql_limit, None  # the plan doesn't carry the count; the outermost LIMIT is the SQL's
+    child_caps = [None] * len(children)
+    if name in _STREAMING_OPS or name in _LIMIT_OPS:
+        child_caps = [cap] * len(children)
+    elif name in _PROBE_SIDE_OPS and children:
+        child_caps[0] = cap  # left side streams, the right side is built/materialised first
+    child_rows = [_walk_json(c, names, estimates, child_cap, sql_limit)
+                  for c, child_cap in zip(children, child_caps)]
+    info = node.get("extra_info") or {}
+    try:
+        rows = int(str(info.get("Estimated Cardinality")).replace(",", ""))
+        if rows == 0 and child_rows:
+            raise ValueError  # e.g. the PROJECTION above an ORDER_BY reports 0
+    except ValueError:
+        # Some operators (notably CROSS_PRODUCT and limits) carry no estimate; derive one
+        if name == "CROSS_PRODUCT" and child_rows:
+            rows = 1
+            for r in child_rows:
+                rows *= r
+        else:
+            rows = max(child_rows, default=0)
+        top = info.get("Top") or info.get("Limit")
+        if str(top).isdigit():
+            rows = min(rows, int(top))
+    if cap is not None:
+        rows = min(rows, cap)
+    estimates.append(rows)
+    return rows
+
+
+def explain_plan(con, sql: str) -> Dict[str, Any]:
+    """Operator names plus estimated result rows and a summed cost.
+
+    Result rows are the root's walked estimate: a root that reports 0 (e.g. the
+    PROJECTION above an ORDER_BY) takes its child's, while a GROUP BY root keeps
+    its own small estimate instead of the scan below it.
+    """
+    body = sql.strip().rstrip(";")
+    names: List[str] = []
+    estimates: List[int] = []
+    sql_limit = _top_level_limit(body)[1]
+    try:
+        raw = con.execute(f"EXPLAIN (FORMAT JSON) {body}").fetchall()[0][1]
+        root_rows = sum(_walk_json(root, names, estimates, sql_limit=sql_limit) for root in json.loads(raw))
+    except duckdb.Error:
+        # Older DuckDB without FORMAT JSON: parse the text boxes
+        text = "\n".join(r[1] for r in con.execute(f"EXPLAIN {body}").fetchall())
+        names = _TEXT_OP_RE.findall(text)
+        estimates = [int((a or b).replace(",", "")) for a, b in _TEXT_EST_RE.findall(text)]
+        if sql_limit is not None:
+            estimates = [min(e, sql_limit) for e in estimates]
+        # the top box is the root; skip a 0 it reports for itself
+        root_rows = next((e for e in estimates if e), 0)
+    return {
+        "operators": names,
+        "root_rows": root_rows,
+        "cost": sum(estimates),
+        "nested_loop": any(n in _NESTED_LOOP_OPS for n in names),
+    }
+
+
+def _decide(sql: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "verdict": "ok",
+        "sql": sql,
+        "reason": "",
+        "est_rows": plan["root_rows"],
+        "cost": plan["cost"],
+    }
+    if plan["cost"] > MAX_PLAN_COST:
+        kind = "nested-loop/cross join" if plan["nested_loop"] else "plan"
+        out.update(verdict="reject", reason=f"{kind} cost ~{plan['cost']:,} rows exceeds budget {MAX_PLAN_COST:,}")
+    elif plan["root_rows"] > MAX_RESULT_ROWS and not has_top_level_limit(sql):
+        out.update(
+            verdict="limit",
+            sql=sql.strip().rstrip(";") + f"\nLIMIT {MAX_RESULT_ROWS};",
+            reason=f"~{plan['root_rows']:,} result rows; LIMIT {MAX_RESULT_ROWS} added",
+        )
+    return out
+
+
+def preflight(sql: str) -> Dict[str, Any]:
+    """Return {"verdict": ok|limit|reject, "sql", "reason", "est_rows", "cost", "cached"}."""
+    sql = (sql or "").strip()
+    head = sql.split(None, 1)[0].lower() if sql else ""
+    if head not in ("select", "with"):
+        return {"verdict": "ok", "sql": sql, "reason": "", "est_rows": None, "cost": None, "cached": False}
+
+    key = sql_hash(sql)
+    try:
+        db_key = DB_PATH.stat().st_mtime_ns
+    except OSError:
+        db_key = None
+    hit = _cache.get(key)
+    if hit and hit[0] == db_key:
+        _cache.move_to_end(key)
+        return {**hit[1], "cached": True}
+
+    try:
+        with connect_ro() as con:
+            plan = explain_plan(con, sql)
+    except Exception as e:
+        # not cached: a locked or briefly missing DB must not become a permanent reject
+        return {"verdict": "reject", "sql": sql, "reason": f"EXPLAIN failed: {e}", "est_rows": None,
+                "cost": None, "cached": False}
+    result = _decide(sql, plan)
+
+    _cache[key] = (db_key, result)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return {**result, "cached": False}
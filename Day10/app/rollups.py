@@ -0,0 +1,167 @@
+# Day10/app/rollups.py
+"""Route simple group-bys over v_rides_analytics to pre-aggregated rollups.
+
+Rollup tables are built by scripts/build_duckdb.py in schema `day10_rollup`.
+Each one holds grouping dims plus `n_rows` and sum_/cnt_/min_/max_ columns per
+measure, so COUNT/SUM/AVG/MIN/MAX over any subset of its dims can be answered
+by re-aggregating it. Anything we cannot prove equivalent is left untouched.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from Day10.app.sql_utils import DB_PATH, connect_ro, execute_interruptible
+
+ROLLUP_SCHEMA = "day10_rollup"
+MEASURES = ("price_usd", "distance_miles", "surge_multiplier")
+MEASURE_COLS = {"n_rows"} | {f"{a}_{m}" for a in ("sum", "cnt", "min", "max") for m in MEASURES}
+# Columns of v_rides_analytics that no rollup keeps (aliases must not shadow them)
+BASE_ONLY_COLS = {"ride_name", "ts", "product_id", "latitude", "longitude"} | set(MEASURES)
+REWRITE_ON = os.getenv("ROLLUP_REWRITE", "true").lower() == "true"
+
+# Words that may appear around dims/aggregates without changing what a row means
+_ALLOWED_WORDS = {
+    "select", "from", "where", "group", "by", "all", "order", "limit", "offset", "having",
+    "asc", "desc", "nulls", "first", "last", "and", "or", "not", "in", "between",
+    "is", "null", "as", "like", "ilike", "true", "false",
+    "round", "coalesce", "cast", "date_trunc", "strftime", "extract", "year", "month",
+    "week", "day", "interval", "integer", "bigint", "double", "varchar", "date_part",
+    "case", "when", "then", "else", "end", "lower", "upper",
+}
+
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_AGG_RE = re.compile(r"\b(count|sum|avg|min|max)\s*\(\s*(\*|1|[a-z_][a-z0-9_]*)\s*\)", re.IGNORECASE)
+_FROM_RE = re.compile(r"\bfrom\s+(?:day10\.)?(v_rides_analytics|rides)\b", re.IGNORECASE)
+_IDENT_RE = re.compile(r"\b[a-z_][a-z0-9_]*\b", re.IGNORECASE)
+_ALIAS_RE = re.compile(r"\bas\s+([a-z_][a-z0-9_]*)", re.IGNORECASE)
+_BLOCKERS = re.compile(
+    r"\b(join|union|intersect|except|over|distinct|with|qualify|filter|using|sample)\b|\(\s*select\b|\"",
+    re.IGNORECASE,
+)
+
+_catalog: Dict[str, object] = {"key": None, "rollups": [], "base_rows": 0}
+
+
+def load_rollups() -> List[dict]:
+    """Rollups as [{table, dims, rows}] smallest first (cached per DB file mtime)."""
+    try:
+        key = DB_PATH.stat().st_mtime_ns
+    except OSError:
+        return []
+    if _catalog["key"] == key:
+        return _catalog["rollups"]  # type: ignore[return-value]
+    with connect_ro() as con:
+        cols = con.execute(
+            "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = ?",
+            [ROLLUP_SCHEMA],
+        ).fetchall()
+        sizes = dict(con.execute(
+            "SELECT table_name, estimated_size FROM duckdb_tables() WHERE schema_name = ?",
+            [ROLLUP_SCHEMA],
+        ).fetchall())
+        base = con.execute(
+            "SELECT estimated_size FROM duckdb_tables() WHERE schema_name = 'day10' AND table_name = 'rides'"
+        ).fetchone()
+    dims: Dict[str, set] = {}
+    for table, col in cols:
+        if col not in MEASURE_COLS:
+            dims.setdefault(table, set()).add(col)
+    rollups = sorted(
+        ({"table": t, "dims": d, "rows": int(sizes.get(t) or 0)} for t, d in dims.items()),
+        key=lambda r: r["rows"],
+    )
+    _catalog.update(key=key, rollups=rollups, base_rows=int(base[0]) if base else 0)
+    return rollups
+
+
+def _agg_replacement(fn: str, arg: str, needed_dims: set) -> Optional[str]:
+    fn, arg = fn.lower(), arg.lower()
+    if fn == "count" and arg in ("*", "1"):
+        return "CAST(SUM(n_rows) AS BIGINT)"
+    if arg in MEASURES:
+        return {
+            "count": f"CAST(SUM(cnt_{arg}) AS BIGINT)",
+            "sum": f"SUM(sum_{arg})",
+            "avg": f"(SUM(sum_{arg}) / NULLIF(SUM(cnt_{arg}), 0))",
+            "min": f"MIN(min_{arg})",
+            "max": f"MAX(max_{arg})",
+        }[fn]
+    if fn in ("min", "max"):
+        # MIN/MAX of a grouping dim survives pre-aggregation unchanged
+        needed_dims.add(arg)
+        return f"{fn.upper()}({arg})"
+    return None
+
+
+def rewrite_for_rollups(sql: str) -> Optional[dict]:
+    """Return {"sql", "rollup", "rollup_rows", "base_rows"} or None when no rollup applies."""
+    if not REWRITE_ON:
+        return None
+    text = (sql or "").strip().rstrip(";").strip()
+
+    # Mask string literals so neither shape checks nor substitutions touch them
+    literals: List[str] = []
+    def _mask(m: re.Match) -> str:
+        literals.append(m.group(0))
+        return f" __lit{len(literals) - 1}__ "
+    masked = _STR_RE.sub(_mask, text)
+
+    if not re.match(r"select\b", masked, re.IGNORECASE) or _BLOCKERS.search(masked):
+        return None
+    if len(re.findall(r"\bfrom\b", masked, re.IGNORECASE)) != 1 or not _FROM_RE.search(masked):
+        return None
+    rollups = load_rollups()
+    if not rollups:
+        return None
+
+    needed: set = set()
+    failed = []
+    def _sub_agg(m: re.Match) -> str:
+        rep = _agg_replacement(m.group(1), m.group(2), needed)
+        if rep is None:
+            failed.append(m.group(0))
+            return m.group(0)
+        return rep
+    rewritten, n_aggs = _AGG_RE.subn(_sub_agg, masked)
+    if failed or n_aggs == 0:
+        return None  # unsupported aggregate, or a row-level query
+
+    # Every remaining identifier must be a dim, an alias, or a harmless keyword
+    all_dims = set().union(*(r["dims"] for r in rollups))
+    aliases = {a.lower() for a in _ALIAS_RE.findall(masked)}
+    if aliases & BASE_ONLY_COLS:
+        return None  # base binds these to the column, a rollup would bind the alias
+    residue = _AGG_RE.sub(" ", _FROM_RE.sub(" from ", masked))
+    for ident in _IDENT_RE.findall(residue):
+        word = ident.lower()
+        if word.startswith("__lit") or word in _ALLOWED_WORDS:
+            continue
+        if word in all_dims:
+            needed.add(word)
+        elif word not in aliases:
+            return None
+
+    target = next((r for r in rollups if needed <= r["dims"]), None)
+    if target is None:
+        return None
+    rewritten = _FROM_RE.sub(f"FROM {ROLLUP_SCHEMA}.{target['table']}", rewritten, count=1)
+    rewritten = re.sub(r" __lit(\d+)__ ", lambda m: literals[int(m.group(1))], rewritten)
+    return {
+        "sql": rewritten,
+        "rollup": target["table"],
+        "rollup_rows": target["rows"],
+        "base_rows": _catalog["base_rows"],
+    }
+
+
+def run_with_rollups(sql: str, rewrite: dict) -> pd.DataFrame:
+    """Execute a rewrite, keeping the column names the original query would produce."""
+    with connect_ro() as con:
+        names = [row[0] for row in con.execute(f"DESCRIBE {sql.strip().rstrip(';')}").fetchall()]
+        df = execute_interruptible(con, rewrite["sql"])
+    if len(names) == len(df.columns):
+        df.columns = names
+    df.attrs["rollup"] = dict(rewrite)
+    return df
@@ -1,10 +1,14 @@
 # Day10/app/sql_utils.py
+import os
+import threading
 from pathlib import Path
 import duckdb
 import pandas as pd
 from contextlib import contextmanager
 
 DB_PATH = Path(__file__).resolve().parents[1] / "db" / "analytics.duckdb"
+QUERY_TIMEOUT_S = float(os.getenv("QUERY_TIMEOUT_S", "30"))   # 0 disables
+MEMORY_LIMIT = os.getenv("DAY10_MEMORY_LIMIT", "2GB")
 
 @contextmanager
 def connect_ro():
@@ -12,11 +16,28 @@ def connect_ro():
     try:
         # read-only-ish: disable dangerous pragmas & restrict memory if desired
         con.execute("PRAGMA threads=4;")
+        con.execute("SET memory_limit=?;", [MEMORY_LIMIT])
         con.execute("SET schema='day10';")
         yield con
     finally:
         con.close()
 
+def execute_interruptible(con, sql: str, timeout_s: float | None = None) -> pd.DataFrame:
+    """Run `sql` on `con`, interrupting it from a timer thread after `timeout_s`."""
+    timeout_s = QUERY_TIMEOUT_S if timeout_s is None else timeout_s
+    timer = None
+    if timeout_s and timeout_s > 0:
+        timer = threading.Timer(timeout_s, con.interrupt)
+        timer.daemon = True
+        timer.start()
+    try:
+        return con.execute(sql).fetchdf()
+    except duckdb.InterruptException:
+        raise TimeoutError(f"Query exceeded {timeout_s:g}s and was cancelled")
+    finally:
+        if timer:
+            timer.cancel()
+
 def list_tables():
     with connect_ro() as con:
         return con.execute("""
@@ -43,9 +64,9 @@ def is_safe_sql(sql: str) -> bool:
     head = sql.strip().split(None, 1)[0].lower()
     return any(head.startswith(p) for p in SAFE_PREFIXES)
 
-def run_sql(sql: str) -> pd.DataFrame:
+def run_sql(sql: str, timeout_s: float | None = None) -> pd.DataFrame:
     with connect_ro() as con:
-        return con.execute(sql).fetchdf()
+        return execute_interruptible(con, sql, timeout_s)
 
 def quick_examples():
     return {
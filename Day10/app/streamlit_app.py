@@ -1,4 +1,5 @@
 # Day10/app/streamlit_app.py
+import sys
 import time
 from pathlib import Path
 import pandas as pd
@@ -11,6 +12,35 @@ from sql_utils import (
 st.set_page_config(page_title="Day10 – Rides SQL Workbench", layout="wide")
 st.title("Day 10 — Rides SQL Workbench (DuckDB)")
 
+# `streamlit run` only puts app/ on sys.path; Day10.* imports need the project root
+for _p in (Path(__file__).resolve().parent, Path(__file__).resolve().parents[1], Path(__file__).resolve().parents[2]):
+    if str(_p) not in sys.path:
+        sys.path.append(str(_p))
+
+
+@st.cache_resource
+def _start_warmup():
+    # Build LLM client, semantic memory and graph off the UI thread, once per process
+    import threading
+    try:
+        from Day10.agents.components import warmup
+    except Exception as e:
+        print(f"[warmup] skipped: {type(e).__name__}: {e}")
+        return None
+
+    def _run():
+        try:
+            print(f"[warmup] {warmup()}")
+        except Exception as e:
+            print(f"[warmup] failed: {e}")
+
+    t = threading.Thread(target=_run, name="day10-warmup", daemon=True)
+    t.start()
+    return t
+
+
+_start_warmup()
+
 # ---- Sidebar: DB info & schema browser
 st.sidebar.header("Database")
 st.sidebar.caption(f"📂 {DB_PATH}")
@@ -22,18 +52,21 @@ with st.sidebar.expander("Settings", expanded=False):
     tracing_on = st.checkbox("Enable tracing", value=True, key="trace_on")
     if set_tracing:
         set_tracing(tracing_on)
+    st.checkbox("Compare rollup hits against base scan", value=False, key="compare_rollup")
     # Clear semantic memory
     try:
-        from Day10.memory.semantic import clear_all_memory, SemanticMemory
+        from Day10.memory.semantic import clear_all_memory
+        from Day10.agents.components import get_semantic, is_built
     except Exception:
         clear_all_memory = None
-        SemanticMemory = None
+        get_semantic = None
     if st.button("Clear semantic memory", key="clear_memory_btn"):
         if clear_all_memory:
             clear_all_memory()
             st.success("Semantic memory cleared.")
-    if SemanticMemory:
-        mem = SemanticMemory()
+    if get_semantic and is_built("semantic"):
+        # shared instance; don't block the first paint while warmup is still building it
+        mem = get_semantic()
         st.caption(f"Semantic items: {mem.count()}")
         if st.checkbox("Show memory items", value=False, key="show_mem_items"):
             items = mem.list_texts(limit=50)
@@ -76,14 +109,6 @@ else:
 nl_text = st.text_input("Ask a question about the data", key="nl2sql_q")
 if st.button("✨ Generate SQL", key="gen_sql_btn"):
     try:
-        import sys
-        from pathlib import Path as _Path
-        _app_dir = str(_Path(__file__).resolve().parent)
-        _day10_dir = str(_Path(__file__).resolve().parents[1])
-        _project_root = str(_Path(__file__).resolve().parents[2])
-        for _p in (_app_dir, _day10_dir, _project_root):
-            if _p not in sys.path:
-                sys.path.append(_p)
         try:
             from agent_adapter import chat_generate_sql, memory_write_from_last_exchange  # local import for Streamlit run context
         except Exception:
@@ -98,9 +123,8 @@ if st.button("✨ Generate SQL", key="gen_sql_btn"):
             st.session_state.chat_history.append({"role": "user", "content": nl_text})
             st.session_state.chat_history.append({"role": "assistant", "content": proposed})
             try:
-                stored = memory_write_from_last_exchange(hist_tuples + [("user", nl_text), ("assistant", proposed)], proposed)
-                if stored:
-                    st.caption(f"Memory stored: {stored}")
+                # queued for the background writer unless MEMORY_ASYNC=false
+                memory_write_from_last_exchange(hist_tuples + [("user", nl_text), ("assistant", proposed)], proposed)
             except Exception:
                 pass
             st.rerun()
@@ -161,7 +185,22 @@ if run_clicked:
                 from Day10.app.agent_adapter import run_sql_safe  # absolute
             df = run_sql_safe(sql)
             ms = int((time.perf_counter() - t0) * 1000)
-            meta_placeholder.info(f"Returned {len(df):,} rows in {ms} ms")
+            rollup = df.attrs.get("rollup")
+            if rollup:
+                fewer = rollup["base_rows"] / max(1, rollup["rollup_rows"])
+                meta_placeholder.info(
+                    f"Returned {len(df):,} rows in {ms} ms — served from rollup `{rollup['rollup']}` "
+                    f"({rollup['rollup_rows']:,} vs {rollup['base_rows']:,} rows, ~{fewer:,.0f}× fewer scanned)"
+                )
+                if st.session_state.get("compare_rollup"):
+                    t1 = time.perf_counter()
+                    run_sql(sql)
+                    base_ms = int((time.perf_counter() - t1) * 1000)
+                    st.caption(f"Base scan: {base_ms} ms → speedup {base_ms / max(ms, 1):.1f}×")
+                with st.expander("Rewritten SQL", expanded=False):
+                    st.code(rollup["sql"], language="sql")
+            else:
+                meta_placeholder.info(f"Returned {len(df):,} rows in {ms} ms")
             if len(df):
                 st.dataframe(df, use_container_width=True, hide_index=True)
             else:
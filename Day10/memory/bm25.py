@@ -0,0 +1,60 @@
+"""Tiny in-process BM25 index used as the keyword side of hybrid memory search."""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+_STOP = {"the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "user", "prefers", "likes"}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOP]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Counter] = {}
+        self.lengths: Dict[str, int] = {}
+        self.df: Counter = Counter()
+
+    def build(self, items: Iterable[Tuple[str, str]]) -> "BM25Index":
+        """items: (id, text) pairs; replaces any previous contents."""
+        self.docs, self.lengths, self.df = {}, {}, Counter()
+        for _id, text in items:
+            tf = Counter(tokenize(text))
+            self.docs[_id] = tf
+            self.lengths[_id] = sum(tf.values())
+            self.df.update(tf.keys())
+        return self
+
+    def search(self, query: str, k: int = 10, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        terms = set(tokenize(query))
+        n = len(self.docs)
+        if not terms or not n:
+            return []
+        avg_len = sum(self.lengths.values()) / n or 1.0
+        scores: Dict[str, float] = {}
+        for term in terms:
+            df = self.df.get(term)
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for _id, tf in self.docs.items():
+                f = tf.get(term)
+                if not f or (allowed is not None and _id not in allowed):
+                    continue
+                norm = f + self.k1 * (1 - self.b + self.b * self.lengths[_id] / avg_len)
+                scores[_id] = scores.get(_id, 0.0) + idf * f * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda kv: -kv[1])[:k]
+
+
+def rrf(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Reciprocal-rank fusion of several ranked id lists."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, _id in enumerate(ranking):
+            fused[_id] = fused.get(_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: -kv[1])
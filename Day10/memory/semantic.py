@@ -1,68 +1,294 @@
 import os, time
-from typing import List
+import threading
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+import numpy as np
+
+from shared.memory_hygiene import DEDUP_SIM, consolidation_plan, merge_duplicate, unit as _unit
+from Day10.memory.bm25 import BM25Index, rrf
 
 
 MEM_INDEX_DIR = os.path.join(os.path.dirname(__file__), "index")
-MEM_COLLECTION = "day10_semantic"
+MEM_COLLECTION = "day10_semantic"  # + backend suffix, see SemanticMemory.__init__
+MEMORY_STORE = os.getenv("MEMORY_STORE", "chroma").lower()  # chroma | numpy
+
+# Write-time hygiene (shared with Day03, see shared/memory_hygiene.py): near-duplicates
+# merge into the existing item, the store is periodically consolidated and capped,
+# lowest-scoring items are evicted first. DEDUP_SIM / DECAY_DAYS come from there.
+MEMORY_CAP = int(os.getenv("MEMORY_CAP", "500"))
+CONSOLIDATE_EVERY = int(os.getenv("MEMORY_CONSOLIDATE_EVERY", "25"))  # inserts between passes
+
+# Retrieval: vector top-k fused with a BM25 keyword index by reciprocal rank;
+# vector-only hits below MEMORY_MIN_SIM are dropped rather than padding the prompt.
+MEMORY_HYBRID = os.getenv("MEMORY_HYBRID", "true").lower() == "true"
+MEMORY_MIN_SIM = float(os.getenv("MEMORY_MIN_SIM", "0.3"))
+FUSION_DEPTH = 3  # candidates per side = k * FUSION_DEPTH
+
+TIME_WINDOW_KEYS = [
+    "last 7 days", "last seven days", "past week",
+    "last 30 days", "last thirty days", "past month",
+    "last 90 days", "past 3 months", "past three months",
+    "today", "yesterday", "this week", "this month",
+]
+
+
+def is_time_window_text(text: str) -> bool:
+    t = (text or "").lower()
+    return any(k in t for k in TIME_WINDOW_KEYS)
+
+
+def _tags_str(tags) -> str:
+    if tags is None:
+        return ""
+    if isinstance(tags, (list, tuple)):
+        return ",".join(map(str, tags))
+    return str(tags)
+
+
+def _filter_meta(text: str, tags_str: str) -> Dict:
+    """Filterable metadata derived from text/tags (Chroma metadata must be primitives)."""
+    meta = {f"tag_{t}": True for t in tags_str.split(",") if t}
+    meta["time_window"] = is_time_window_text(text)
+    return meta
 
 
 class SemanticMemory:
     def __init__(self):
+        # heavy client imports are deferred until a store is actually opened
+        from shared.embeddings import get_embeddings, collection_suffix
+
         os.makedirs(MEM_INDEX_DIR, exist_ok=True)
-        self.emb = OpenAIEmbeddings()
-        self.db = Chroma(
-            collection_name=MEM_COLLECTION,
-            persist_directory=MEM_INDEX_DIR,
-            embedding_function=self.emb,
-        )
+        self.emb = get_embeddings()
+        name = MEM_COLLECTION + collection_suffix()
+        if MEMORY_STORE == "numpy":
+            # embedded memmap index with the same collection API (no Chroma client start-up)
+            from shared.vector_index import NumpyIndex
+            self.col = NumpyIndex(os.path.join(MEM_INDEX_DIR, name))
+        else:
+            from langchain_chroma import Chroma
+            self.db = Chroma(
+                collection_name=name,
+                persist_directory=MEM_INDEX_DIR,
+                embedding_function=self.emb,
+            )
+            self.col = self.db._collection
+        self._lock = threading.RLock()
+        self._hits: Counter = Counter()   # id -> retrievals not yet written to metadata
+        self._since_consolidate = 0
+        self._bm25: Optional[BM25Index] = None  # rebuilt lazily after any write
+        self._backfill()
 
-    def add(self, text: str, tags=None, confidence: float = 0.7):
-        text = (text or "").strip()
-        if not text:
+    def _backfill(self) -> None:
+        """Give items written by older versions the filterable metadata fields."""
+        try:
+            data = self.col.get(include=["documents", "metadatas"]) or {}
+        except Exception:
             return
+        ids, todo = [], []
+        for _id, doc, meta in zip(data.get("ids") or [], data.get("documents") or [], data.get("metadatas") or []):
+            meta = dict(meta or {})
+            if "time_window" in meta:
+                continue
+            meta.update(_filter_meta(doc or "", str(meta.get("tags", ""))))
+            meta.setdefault("updated_at", meta.get("created_at", int(time.time())))
+            meta.setdefault("hits", 0)
+            ids.append(_id)
+            todo.append(meta)
+        if ids:
+            self.col.update(ids=ids, metadatas=todo)
 
-        if tags is None:
-            tags_str = ""
-        elif isinstance(tags, (list, tuple)):
-            tags_str = ",".join(map(str, tags))
-        else:
-            tags_str = str(tags)
+    def add(self, text: str, tags=None, confidence: float = 0.7):
+        self.add_many([text], tags=tags, confidence=confidence)
+
+    def add_many(self, texts: List[str], tags=None, confidence: float = 0.7) -> Dict[str, int]:
+        """Store several facts with one embeddings request.
+
+        A fact whose nearest neighbour is at least DEDUP_SIM similar is merged into
+        that item (text and vector replaced by the newer fact, confidence bumped,
+        tags unioned, timestamp refreshed) instead of being inserted.
+        Returns {"added": n, "merged": m}.
+        """
+        texts = list(dict.fromkeys(t.strip() for t in texts or [] if t and t.strip()))
+        if not texts:
+            return {"added": 0, "merged": 0}
+
+        now = int(time.time())
+        tags_str = _tags_str(tags)
+        vecs = _unit(self.emb.embed_documents(texts))
+        col = self.col
+        added = merged = 0
+        with self._lock:
+            new_ids, new_docs, new_vecs, new_metas = [], [], [], []
+            for text, vec in zip(texts, vecs):
+                # duplicates within this batch
+                if new_vecs and float(np.max(_unit(new_vecs) @ vec)) >= DEDUP_SIM:
+                    merged += 1
+                    continue
+                hit = self._nearest(vec) if col.count() else None
+                if hit and hit["sim"] >= DEDUP_SIM:
+                    # the newer wording wins: a changed preference replaces the stale text
+                    meta = merge_duplicate(hit["meta"], confidence, tags_str, now)
+                    meta.update(_filter_meta(text, meta["tags"]))
+                    col.update(ids=[hit["id"]], documents=[text], embeddings=[vec.tolist()], metadatas=[meta])
+                    merged += 1
+                    continue
+                new_ids.append(str(uuid.uuid4()))
+                new_docs.append(text)
+                new_vecs.append(vec)
+                new_metas.append({
+                    "tags": tags_str,
+                    "confidence": float(confidence),
+                    "created_at": now,
+                    "updated_at": now,
+                    "hits": 0,
+                    **_filter_meta(text, tags_str),
+                })
+            if new_ids:
+                col.add(ids=new_ids, documents=new_docs,
+                        embeddings=[v.tolist() for v in new_vecs], metadatas=new_metas)
+                added = len(new_ids)
+            self._bm25 = None
+            self._since_consolidate += added
+            if self._since_consolidate >= CONSOLIDATE_EVERY or col.count() > MEMORY_CAP:
+                self.consolidate()
+        if merged:
+            print(f"[memory] merged {merged} near-duplicate fact(s)")
+        return {"added": added, "merged": merged}
+
+    def _nearest(self, vec: np.ndarray) -> Optional[Dict]:
+        res = self.col.query(
+            query_embeddings=[vec.tolist()], n_results=1,
+            include=["embeddings", "metadatas", "documents"],
+        )
+        ids = (res.get("ids") or [[]])[0]
+        if not len(ids):
+            return None
+        other = _unit(res["embeddings"][0][0])[0]
+        return {"id": ids[0], "doc": res["documents"][0][0] or "", "meta": res["metadatas"][0][0] or {},
+                "sim": float(other @ vec)}
+
+    @staticmethod
+    def build_where(tags=None, min_confidence: Optional[float] = None, max_age_days: Optional[float] = None,
+                    exclude_time_window: bool = False) -> Optional[Dict]:
+        """Chroma `where` clause for the metadata filters (None when unfiltered)."""
+        clauses = []
+        for t in ([tags] if isinstance(tags, str) else tags or []):
+            clauses.append({f"tag_{t}": True})
+        if min_confidence is not None:
+            clauses.append({"confidence": {"$gte": float(min_confidence)}})
+        if max_age_days is not None:
+            clauses.append({"updated_at": {"$gte": int(time.time() - float(max_age_days) * 86400)}})
+        if exclude_time_window:
+            clauses.append({"time_window": False})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
-        meta = {
-            "tags": tags_str,
-            "confidence": float(confidence),
-            "created_at": int(time.time()),
-        }
-        self.db.add_texts([text], metadatas=[meta])
+    def _keyword_index(self) -> BM25Index:
+        with self._lock:
+            if self._bm25 is None:
+                data = self.col.get(include=["documents"]) or {}
+                self._bm25 = BM25Index().build(zip(data.get("ids") or [], data.get("documents") or []))
+            return self._bm25
 
-    def search(self, query: str, k: int = 3) -> List[str]:
+    def search(self, query: str, k: int = 3, tags=None, min_confidence: Optional[float] = None,
+               max_age_days: Optional[float] = None, exclude_time_window: bool = False,
+               hybrid: Optional[bool] = None) -> List[str]:
+        """Top-k memories for `query`, filtered in Chroma by tags/confidence/age.
+
+        Vector and BM25 rankings are fused with RRF when hybrid (default MEMORY_HYBRID).
+        Vector-only hits under MEMORY_MIN_SIM cosine are dropped, so fewer than k may return.
+        """
         query = (query or "").strip()
         if not query:
             return []
-        docs = self.db.similarity_search(query, k=max(1, int(k)))
-        return [d.page_content for d in docs]
+        k = max(1, int(k))
+        hybrid = MEMORY_HYBRID if hybrid is None else hybrid
+        where = self.build_where(tags, min_confidence, max_age_days, exclude_time_window)
+        col = self.col
+        depth = k * FUSION_DEPTH if hybrid else k
+        qvec = _unit(self.emb.embed_query(query))[0]
+        res = col.query(
+            query_embeddings=[qvec.tolist()],
+            n_results=depth,
+            where=where,
+            include=["documents", "embeddings"],
+        )
+        vec_ids = list((res.get("ids") or [[]])[0])
+        docs = dict(zip(vec_ids, (res.get("documents") or [[]])[0]))
+        sims = {}
+        if vec_ids:
+            sims = dict(zip(vec_ids, (_unit(res["embeddings"][0]) @ qvec).tolist()))
+
+        kw_ids: List[str] = []
+        if hybrid:
+            allowed = None
+            if where is not None:
+                allowed = set(col.get(where=where, include=[]).get("ids") or [])
+            kw_ids = [_id for _id, _ in self._keyword_index().search(query, k=depth, allowed=allowed)]
+
+        kw_set = set(kw_ids)
+        ranked = [_id for _id, _ in rrf([vec_ids, kw_ids])] if kw_ids else vec_ids
+        ids = [_id for _id in ranked if _id in kw_set or sims.get(_id, 0.0) >= MEMORY_MIN_SIM][:k]
+        missing = [_id for _id in ids if _id not in docs]
+        if missing:
+            got = col.get(ids=missing, include=["documents"]) or {}
+            # Chroma returns rows in its own order, not the order of `ids`
+            docs.update(zip(got.get("ids") or [], got.get("documents") or []))
+        with self._lock:
+            self._hits.update(ids)  # folded into metadata on the next consolidation
+        return [docs[_id] for _id in ids if _id in docs]
+
+    def consolidate(self) -> Dict[str, int]:
+        """Merge near-duplicate clusters, persist hit counts and evict down to MEMORY_CAP."""
+        col = self.col
+        with self._lock:
+            data = col.get(include=["embeddings", "metadatas"]) or {}
+            ids = list(data.get("ids") or [])
+            self._since_consolidate = 0
+            if not ids:
+                self._hits.clear()
+                return {"merged": 0, "evicted": 0}
+            metas = [dict(m or {}) for m in data["metadatas"]]
+            for i, _id in enumerate(ids):
+                metas[i]["hits"] = int(metas[i].get("hits", 0) or 0) + self._hits.pop(_id, 0)
+            self._hits.clear()
+
+            drop, live, merged, evicted = consolidation_plan(ids, metas, data["embeddings"], MEMORY_CAP, DEDUP_SIM)
+            if drop:
+                col.delete(ids=drop)
+                self._bm25 = None
+            if live:
+                col.update(ids=[ids[i] for i in live], metadatas=[metas[i] for i in live])
+        if merged or evicted:
+            print(f"[memory] consolidate merged={merged} evicted={evicted} kept={len(live)}")
+        return {"merged": merged, "evicted": evicted}
 
     def clear_all(self) -> None:
         try:
             # delete all items from the underlying collection
-            self.db._collection.delete(where={})
+            with self._lock:
+                ids = self.col.get(include=[]).get("ids") or []
+                if ids:
+                    self.col.delete(ids=list(ids))
+                self._hits.clear()
+                self._bm25 = None
         except Exception:
             pass
 
     def count(self) -> int:
         try:
-            return int(self.db._collection.count())
+            return int(self.col.count())
         except Exception:
             return 0
 
     def list_texts(self, limit: int = 100) -> List[str]:
         try:
-            data = self.db._collection.get(include=["documents"]) or {}
+            data = self.col.get(include=["documents"]) or {}
             docs = data.get("documents") or []
             return list(docs)[: max(0, int(limit))]
         except Exception:
@@ -71,8 +297,7 @@ class SemanticMemory:
 
 def clear_all_memory() -> None:
     try:
-        SemanticMemory().clear_all()
+        from Day10.agents.components import get_semantic
+        get_semantic().clear_all()
     except Exception:
         pass
-
-
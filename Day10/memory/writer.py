@@ -0,0 +1,16 @@
+"""Background memory-write pipeline for Day10.
+
+The queue/worker itself is `MemoryWriter` from the repo-level shared package;
+this module keeps Day10's larger defaults and the MEMORY_ASYNC switch.
+"""
+import os
+
+from shared.memory_writer import MemoryWriter
+
+MEMORY_QUEUE_MAX = int(os.getenv("MEMORY_QUEUE_MAX", "64"))
+MEMORY_BATCH = int(os.getenv("MEMORY_BATCH", "8"))
+MEMORY_LINGER_S = float(os.getenv("MEMORY_LINGER_S", "0.5"))   # wait this long to fill a batch
+MEMORY_DROP = os.getenv("MEMORY_DROP", "oldest").lower()       # oldest | newest
+MEMORY_ASYNC = os.getenv("MEMORY_ASYNC", "true").lower() == "true"
+
+__all__ = ["MemoryWriter", "MEMORY_QUEUE_MAX", "MEMORY_BATCH", "MEMORY_LINGER_S", "MEMORY_DROP", "MEMORY_ASYNC"]
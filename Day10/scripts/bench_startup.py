@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]        # Day10/
+PROJECT_ROOT = ROOT.parent                          # so `import Day10...` resolves
+HISTORY = ROOT / "db" / "startup_bench.jsonl"
+
+
+def import_profile(module: str):
+    """Run `python -X importtime -c 'import <module>'` in a fresh interpreter.
+
+    Returns (wall_ms, [(cumulative_us, module_name), ...]) for top-level-ish imports.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(PROJECT_ROOT), env.get("PYTHONPATH", "")) if p)
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(PROJECT_ROOT), env=env, capture_output=True, text=True,
+    )
+    wall_ms = int((time.perf_counter() - t0) * 1000)
+    if proc.returncode != 0:
+        tail = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")][-5:]
+        raise RuntimeError("import failed:\n" + "\n".join(tail))
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            cumulative = int(parts[1].strip())
+        except ValueError:
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            rows.append((cumulative, name.strip()))
+    return wall_ms, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Day10 cold-start: import time and component warmup")
+    parser.add_argument("--module", default="Day10.agents.graph", help="Module to import-profile")
+    parser.add_argument("--top", type=int, default=15, help="Show the N slowest imports")
+    parser.add_argument("--warmup", action="store_true", help="Also build LLM/semantic/graph and time each")
+    parser.add_argument("--record", action="store_true", help=f"Append results to {HISTORY.name}")
+    args = parser.parse_args()
+
+    wall_ms, rows = import_profile(args.module)
+    total_us = max((c for c, _ in rows), default=0)
+    print(f"[import] {args.module}: {total_us / 1000:.1f} ms cumulative, {wall_ms} ms wall (incl. interpreter)")
+    for cumulative, name in sorted(rows, reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    result = {
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "module": args.module,
+        "import_ms": round(total_us / 1000, 1),
+        "wall_ms": wall_ms,
+    }
+
+    if args.warmup:
+        if str(PROJECT_ROOT) not in sys.path:
+            sys.path.insert(0, str(PROJECT_ROOT))
+        from Day10.agents.components import warmup
+        timings = warmup()
+        print("[warmup] " + ", ".join(f"{k}={v} ms" for k, v in timings.items()))
+        result["warmup_ms"] = timings
+
+    if args.record:
+        HISTORY.parent.mkdir(parents=True, exist_ok=True)
+        with open(HISTORY, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"[record] appended to {HISTORY}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import shared.vector_index as vi  # noqa: E402
+
+
+def make_data(n: int, dim: int, queries: int, seed: int = 0):
+    """Clustered unit vectors (memories are topical, not uniform noise)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n // 200), dim))
+    x = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.normal(size=(n, dim))
+    q = centers[rng.integers(0, len(centers), queries)] + 0.35 * rng.normal(size=(queries, dim))
+    return vi._unit(x), vi._unit(q)
+
+
+def pct(ms, p):
+    return float(np.percentile(ms, p)) if ms else 0.0
+
+
+def bench_numpy(path, x, q, k, ivf_min):
+    vi.IVF_MIN_ROWS = ivf_min
+    ids = [str(uuid.uuid4()) for _ in range(len(x))]
+    t0 = time.perf_counter()
+    idx = vi.NumpyIndex(path)
+    for i in range(0, len(x), 1000):
+        idx.add(ids[i:i + 1000], [f"fact {j}" for j in range(i, min(i + 1000, len(x)))], x[i:i + 1000])
+    add_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    idx = vi.NumpyIndex(path)  # cold re-open from disk
+    open_ms = (time.perf_counter() - t0) * 1000
+
+    lat, got = [], []
+    for v in q:
+        t0 = time.perf_counter()
+        res = idx.query([v], n_results=k, include=[])
+        lat.append((time.perf_counter() - t0) * 1000)
+        got.append(res["ids"][0])
+    return {"open_ms": open_ms, "add_ms": add_ms, "lat": lat, "ids": got, "id_of": ids}
+
+
+def bench_chroma(path, x, q, k):
+    try:
+        import chromadb
+    except ImportError:
+        return None
+    ids = [str(uuid.uuid4()) for _ in range(len(x))]
+    t0 = time.perf_counter()
+    col = chromadb.PersistentClient(path=path).get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for i in range(0, len(x), 1000):
+        col.add(ids=ids[i:i + 1000], embeddings=x[i:i + 1000].tolist(),
+                documents=[f"fact {j}" for j in range(i, min(i + 1000, len(x)))])
+    add_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    col = chromadb.PersistentClient(path=path).get_or_create_collection("bench")
+    col.count()
+    open_ms = (time.perf_counter() - t0) * 1000
+    lat, got = [], []
+    for v in q:
+        t0 = time.perf_counter()
+        res = col.query(query_embeddings=[v.tolist()], n_results=k, include=[])
+        lat.append((time.perf_counter() - t0) * 1000)
+        got.append(res["ids"][0])
+    return {"open_ms": open_ms, "add_ms": add_ms, "lat": lat, "ids": got, "id_of": ids}
+
+
+def recall(res, x, q, k):
+    """Fraction of exact top-k (brute force) neighbours returned."""
+    pos = {i: n for n, i in enumerate(res["id_of"])}
+    exact = np.argsort(-(q @ x.T), axis=1)[:, :k]
+    hits = sum(len(set(exact[r]) & {pos[i] for i in ids}) for r, ids in enumerate(res["ids"]))
+    return hits / (len(q) * k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy memory index (flat / IVF) against Chroma")
+    parser.add_argument("--sizes", default="500,5000,20000", help="Comma-separated index sizes")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'store':<10}{'n':>7}{'open ms':>10}{'add ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+    for n in [int(s) for s in args.sizes.split(",")]:
+        x, q = make_data(n, args.dim, args.queries)
+        runs = [
+            ("flat", lambda p: bench_numpy(p, x, q, args.k, ivf_min=10**12)),
+            ("ivf", lambda p: bench_numpy(p, x, q, args.k, ivf_min=1)),
+            ("chroma", lambda p: bench_chroma(p, x, q, args.k)),
+        ]
+        for name, fn in runs:
+            tmp = tempfile.mkdtemp(prefix=f"bench_{name}_")
+            try:
+                res = fn(tmp)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+            if res is None:
+                print(f"{name:<10}{n:>7}  (chromadb not installed)")
+                continue
+            print(f"{name:<10}{n:>7}{res['open_ms']:>10.1f}{res['add_ms']:>10.1f}"
+                  f"{pct(res['lat'], 50):>9.2f}{pct(res['lat'], 95):>9.2f}{recall(res, x, q, args.k):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,55 @@
+import argparse
+import re
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
 import duckdb
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 DB_PATH = ROOT / "db" / "analytics.duckdb"
+STAGE_DIR = ROOT / "db" / "staging"  # raw CSVs re-encoded as zstd Parquet
 DEFAULT_FILE = DATA_DIR / "uber_lyft_boston.csv"  # fallback if present
 
+# Build bookkeeping lives outside `day10` so it never shows up in the schema summary
+META_SCHEMA = "day10_meta"
+
+# Pre-aggregated rollups (also outside `day10`); Day10/app/rollups.py discovers
+# them from the catalog and routes matching group-bys here.
+ROLLUP_SCHEMA = "day10_rollup"
+ROLLUP_MEASURES = ("price_usd", "distance_miles", "surge_multiplier")
+# name -> grouping dims. The first (finest) is built from rides, the rest from it.
+ROLLUPS = {
+    "r_date_hour_cab_route": ["date", "hour", "dow", "cab_type", "source", "destination"],
+    "r_date_cab_source": ["date", "cab_type", "source"],
+    "r_cab_route": ["cab_type", "source", "destination"],
+    "r_cab_hour_dow": ["cab_type", "hour", "dow"],
+}
+
+# Physical layout: rides is written in this order so DuckDB's per-row-group
+# min/max zonemaps can skip row groups for ts/date filters.
+LAYOUT_ORDER = {
+    "ts": "ts",
+    "ts_source": "date, source, ts",  # day buckets clustered by pickup zone
+}
+ZONE_COLUMNS = {"ts": "TIMESTAMP", "date": "DATE", "source": "VARCHAR"}  # zonemaps we record
+
+PHASES = []  # (name, ms) in execution order
+
+
+@contextmanager
+def phase(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = int((time.perf_counter() - t0) * 1000)
+        PHASES.append((name, ms))
+        print(f"[phase] {name}: {ms} ms")
+
+
 def find_csvs():
     paths = []
     if DEFAULT_FILE.exists():
@@ -17,32 +61,72 @@ def find_csvs():
             paths.append(sp)
     return paths
 
-def main():
-    csvs = find_csvs()
-    if not csvs:
-        raise SystemExit(f"No CSVs found in {DATA_DIR}. Put your Kaggle file there.")
 
-    print(f"Using CSV files: {csvs}")
+def _lit(path) -> str:
+    # COPY/read_parquet targets cannot be bound as parameters; quote them inline
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def _file_list(paths) -> str:
+    return "[" + ", ".join(_lit(p) for p in paths) + "]"
+
+
+def _fingerprint(csv_path: str):
+    st = Path(csv_path).stat()
+    return int(st.st_size), int(st.st_mtime_ns)
+
+
+def staged_path(csv_path: str) -> Path:
+    return STAGE_DIR / (Path(csv_path).stem + ".parquet")
 
-    con = duckdb.connect(str(DB_PATH))
-    con.execute("PRAGMA threads=4;")
-    con.execute("CREATE SCHEMA IF NOT EXISTS day10;")
-    con.execute("SET schema='day10';")
 
-    # Load raw
-    con.execute("DROP TABLE IF EXISTS raw_rides;")
-    print("Loading CSV(s) into raw_rides ...")
+def load_manifest(con) -> dict:
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {META_SCHEMA};")
     con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {META_SCHEMA}.ingested_files (
+          csv_path   TEXT PRIMARY KEY,
+          size_bytes BIGINT,
+          mtime_ns   BIGINT,
+          parquet    TEXT,
+          rows       BIGINT,
+          loaded_at  TIMESTAMP
+        );
+        """
+    )
+    rows = con.execute(
+        f"SELECT csv_path, size_bytes, mtime_ns, parquet, rows FROM {META_SCHEMA}.ingested_files;"
+    ).fetchall()
+    return {r[0]: {"fp": (r[1], r[2]), "parquet": r[3], "rows": r[4]} for r in rows}
+
+
+def record_ingest(con, csv_path: str, parquet: Path, rows: int) -> None:
+    size, mtime = _fingerprint(csv_path)
+    con.execute(
+        f"INSERT OR REPLACE INTO {META_SCHEMA}.ingested_files VALUES (?, ?, ?, ?, ?, now()::TIMESTAMP);",
+        [csv_path, size, mtime, str(parquet), rows],
+    )
+
+
+def stage_csv(con, csv_path: str) -> int:
+    """Re-encode one CSV as compressed Parquet under STAGE_DIR; returns row count."""
+    out = staged_path(csv_path)
+    con.execute(
+        f"""
+        COPY (SELECT * FROM read_csv_auto({_lit(csv_path)}, HEADER=TRUE))
+        TO {_lit(out)} (FORMAT PARQUET, COMPRESSION ZSTD);
         """
-        CREATE TABLE raw_rides AS
-        SELECT * FROM read_csv_auto(?, HEADER=TRUE);
-        """,
-        [csvs if len(csvs) > 1 else csvs[0]],
     )
+    return con.execute(f"SELECT COUNT(*) FROM read_parquet({_lit(out)});").fetchone()[0]
+
+
+def rides_projection(con, parquet_files) -> str:
+    """SELECT that normalizes raw columns and derives date parts in a single pass."""
+    source = f"read_parquet({_file_list(parquet_files)}, union_by_name=true)"
 
     # Column names
-    info = con.execute("PRAGMA table_info('raw_rides');").fetchall()
-    colnames = [row[1] for row in info]
+    info = con.execute(f"DESCRIBE SELECT * FROM {source};").fetchall()
+    colnames = [row[0] for row in info]
     print("Detected columns:", colnames)
 
     def first_existing(cands):
@@ -92,73 +176,347 @@ def main():
     lat_expr   = num_expr(lat_col)
     lon_expr   = num_expr(lon_col)
 
-    con.execute("DROP TABLE IF EXISTS rides;")
-    print("Creating normalized table rides ...")
-    con.execute(
-        f"""
-        CREATE TABLE rides AS
+    # Derived date parts are computed from the normalized ts in the same scan,
+    # instead of ALTER TABLE + UPDATE passes that rewrite the table each time.
+    return f"""
         SELECT
-          COALESCE(LOWER(cab_type), '')::TEXT              AS cab_type,
-          COALESCE(LOWER(name), '')::TEXT                  AS ride_name,
-          COALESCE(LOWER(source), '')::TEXT                AS source,
-          COALESCE(LOWER(destination), '')::TEXT           AS destination,
-          COALESCE(product_id, '')::TEXT                   AS product_id,
+          n.*,
+          CAST(n.ts AS DATE)                       AS date,
+          CAST(EXTRACT(HOUR FROM n.ts) AS INTEGER) AS hour,
+          CAST(EXTRACT(DOW FROM n.ts) AS INTEGER)  AS dow
+        FROM (
+          SELECT
+            COALESCE(LOWER(cab_type), '')::TEXT              AS cab_type,
+            COALESCE(LOWER(name), '')::TEXT                  AS ride_name,
+            COALESCE(LOWER(source), '')::TEXT                AS source,
+            COALESCE(LOWER(destination), '')::TEXT           AS destination,
+            COALESCE(product_id, '')::TEXT                   AS product_id,
 
-          {price_expr}                                     AS price_usd,
-          {dist_expr}                                      AS distance_miles,
-          {surge_expr}                                     AS surge_multiplier,
+            {price_expr}                                     AS price_usd,
+            {dist_expr}                                      AS distance_miles,
+            {surge_expr}                                     AS surge_multiplier,
 
-          {lat_expr}                                       AS latitude,
-          {lon_expr}                                       AS longitude,
+            {lat_expr}                                       AS latitude,
+            {lon_expr}                                       AS longitude,
 
-          {ts_expr}                                        AS ts
-        FROM raw_rides;
-        """
-    )
+            {ts_expr}                                        AS ts
+          FROM {source}
+        ) AS n
+    """
 
-    # Derived date parts
-    print("Adding date parts ...")
-    con.execute("ALTER TABLE rides ADD COLUMN IF NOT EXISTS date DATE;")
-    con.execute("UPDATE rides SET date = CAST(ts AS DATE) WHERE ts IS NOT NULL;")
 
-    con.execute("ALTER TABLE rides ADD COLUMN IF NOT EXISTS hour INTEGER;")
-    con.execute("UPDATE rides SET hour = EXTRACT(HOUR FROM ts) WHERE ts IS NOT NULL;")
+def build_rollups(con) -> dict:
+    """(Re)materialize every rollup table; returns {name: rows}."""
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {ROLLUP_SCHEMA};")
+    names = list(ROLLUPS)
+    finest = names[0]
 
-    con.execute("ALTER TABLE rides ADD COLUMN IF NOT EXISTS dow INTEGER;")
-    con.execute("UPDATE rides SET dow = EXTRACT(DOW FROM ts) WHERE ts IS NOT NULL;")
+    base_aggs = ["COUNT(*) AS n_rows"]
+    for m in ROLLUP_MEASURES:
+        base_aggs += [
+            f"SUM({m}) AS sum_{m}",
+            f"COUNT({m}) AS cnt_{m}",
+            f"MIN({m}) AS min_{m}",
+            f"MAX({m}) AS max_{m}",
+        ]
+    # Coarser rollups re-aggregate the finest one instead of rescanning rides
+    reagg = ["CAST(SUM(n_rows) AS BIGINT) AS n_rows"]
+    for m in ROLLUP_MEASURES:
+        reagg += [
+            f"SUM(sum_{m}) AS sum_{m}",
+            f"CAST(SUM(cnt_{m}) AS BIGINT) AS cnt_{m}",
+            f"MIN(min_{m}) AS min_{m}",
+            f"MAX(max_{m}) AS max_{m}",
+        ]
 
-    # Simple analytics view
-    con.execute("DROP VIEW IF EXISTS v_rides_analytics;")
-    con.execute(
-        """
-        CREATE VIEW v_rides_analytics AS
+    sizes = {}
+    for name in names:
+        dims = ", ".join(ROLLUPS[name])
+        if name == finest:
+            src, aggs = "rides", base_aggs
+        else:
+            src, aggs = f"{ROLLUP_SCHEMA}.{finest}", reagg
+        con.execute(
+            f"CREATE OR REPLACE TABLE {ROLLUP_SCHEMA}.{name} AS "
+            f"SELECT {dims}, {', '.join(aggs)} FROM {src} GROUP BY {dims};"
+        )
+        sizes[name] = con.execute(f"SELECT COUNT(*) FROM {ROLLUP_SCHEMA}.{name};").fetchone()[0]
+    return sizes
+
+
+def zone_stats_sql() -> str:
+    """Per-row-group min/max read from DuckDB's own segment stats (pragma_storage_info).
+
+    Appends start new, partly filled row groups, so rowid buckets don't match the
+    real zones. String bounds are the truncated prefixes DuckDB prunes with, and
+    `rows` includes deleted rows until the row group is rewritten.
+    """
+    bounds = []
+    for col, typ in ZONE_COLUMNS.items():
+        for agg, grp in (("MIN", "lo"), ("MAX", "hi")):
+            bounds.append(
+                f"{agg}(TRY_CAST({grp} AS {typ})) FILTER (WHERE column_name = '{col}' AND has_values) "
+                f"AS {agg.lower()}_{col}"
+            )
+    cols = ", ".join(f"'{c}'" for c in ZONE_COLUMNS)
+    return f"""
         SELECT
-          cab_type, ride_name, source, destination,
-          price_usd, distance_miles, surge_multiplier,
-          ts, date, hour, dow
-        FROM rides;
+          row_group_id AS row_group,
+          SUM(count) FILTER (WHERE column_name = 'ts') AS rows,
+          {", ".join(bounds)}
+        FROM (
+          SELECT
+            row_group_id, column_name, count,
+            regexp_extract(stats, '^\\[Min: (.*?), Max: (.*?)(, Has Unicode[^\\]]*)?\\]', 1) AS lo,
+            regexp_extract(stats, '^\\[Min: (.*?), Max: (.*?)(, Has Unicode[^\\]]*)?\\]', 2) AS hi,
+            stats LIKE '%Has No Null: true]%' AS has_values
+          FROM pragma_storage_info('rides')
+          WHERE segment_type <> 'VALIDITY' AND column_name IN ({cols})
+        )
+        GROUP BY 1
+    """
+
+
+def collect_zone_stats(con) -> dict:
+    """Store per-row-group min/max stats for rides and summarize how well they prune."""
+    con.execute("CHECKPOINT;")  # flush appended rows into persistent row groups first
+    con.execute(f"CREATE OR REPLACE TABLE {META_SCHEMA}.rides_zones AS {zone_stats_sql()} ORDER BY row_group;")
+    groups, overlapping = con.execute(
+        f"""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE min_ts < prev_max)
+        FROM (
+          SELECT min_ts, MAX(max_ts) OVER (ORDER BY row_group ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS prev_max
+          FROM {META_SCHEMA}.rides_zones
+        );
         """
-    )
+    ).fetchone()
+    return {"row_groups": groups, "overlapping": overlapping}
+
+
+def layout_probes(con) -> dict:
+    """Date-filtered probe queries anchored on the data's own time range."""
+    max_ts, max_date = con.execute("SELECT MAX(ts), MAX(date) FROM rides;").fetchone()
+    if max_ts is None:
+        return {}
+    cut = con.execute("SELECT ?::TIMESTAMP - INTERVAL 7 DAY;", [max_ts]).fetchone()[0]
+    return {
+        "hourly_last_7d": (
+            f"SELECT hour, COUNT(*) AS trips FROM v_rides_analytics "
+            f"WHERE ts >= TIMESTAMP '{cut}' GROUP BY hour ORDER BY hour;",
+            (cut, max_ts),
+        ),
+        "avg_price_last_day": (
+            f"SELECT source, ROUND(AVG(price_usd),2) AS avg_price FROM v_rides_analytics "
+            f"WHERE date = DATE '{max_date}' GROUP BY source;",
+            (max_date, max_date + timedelta(days=1)),
+        ),
+    }
+
+
+def explain_probes(con, probes: dict) -> dict:
+    """EXPLAIN ANALYZE each probe; returns {name: (total_ms, zones_hit, zones_total)}."""
+    out = {}
+    zones = con.execute(f"SELECT min_ts, max_ts FROM ({zone_stats_sql()});").fetchall()
+    for name, (sql, (lo, hi)) in probes.items():
+        text = con.execute(f"EXPLAIN ANALYZE {sql}").fetchall()[0][1]
+        m = re.search(r"Total Time: ([0-9.]+)s", text)
+        total_ms = round(float(m.group(1)) * 1000, 2) if m else None
+        lo_ts = con.execute("SELECT ?::TIMESTAMP;", [lo]).fetchone()[0]
+        hi_ts = con.execute("SELECT ?::TIMESTAMP;", [hi]).fetchone()[0]
+        hit = sum(1 for zmin, zmax in zones if zmin is not None and zmax >= lo_ts and zmin <= hi_ts)
+        out[name] = (total_ms, hit, len(zones))
+    return out
+
+
+def zones_present(con) -> bool:
+    return con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = 'rides_zones';",
+        [META_SCHEMA],
+    ).fetchone()[0] > 0
+
+
+def rollups_missing(con) -> bool:
+    have = {
+        r[0] for r in con.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = ?;", [ROLLUP_SCHEMA]
+        ).fetchall()
+    }
+    return not set(ROLLUPS) <= have
+
+
+def plan_build(con, csvs, force_full: bool):
+    """Return (mode, to_stage) where mode is 'full', 'append' or 'noop'."""
+    manifest = load_manifest(con)
+    has_rides = con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'day10' AND table_name = 'rides';"
+    ).fetchone()[0] > 0
+
+    new, changed = [], []
+    for p in csvs:
+        entry = manifest.get(p)
+        if entry is None:
+            new.append(p)
+        elif entry["fp"] != _fingerprint(p) or not Path(entry["parquet"]).exists():
+            changed.append(p)
+    removed = [p for p in manifest if p not in csvs]
+
+    # An existing rides without a manifest predates staging; never append onto it
+    if force_full or not has_rides or not manifest or changed or removed:
+        # anything but a pure append invalidates rides; reuse staged Parquet where still valid
+        if removed:
+            for p in removed:
+                Path(manifest[p]["parquet"]).unlink(missing_ok=True)
+            con.execute(
+                f"DELETE FROM {META_SCHEMA}.ingested_files WHERE csv_path IN ({', '.join('?' for _ in removed)});",
+                removed,
+            )
+        return "full", new + changed
+    if new:
+        return "append", new
+    return "noop", []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build/refresh the Day10 DuckDB from CSVs in Day10/data")
+    parser.add_argument("--full", action="store_true", help="Rebuild rides from all staged files even if nothing changed")
+    parser.add_argument("--cluster-source", action="store_true", help="Order rides by date, source, ts instead of ts")
+    parser.add_argument("--explain", action="store_true", help="EXPLAIN ANALYZE date-filtered probes before/after the build")
+    args = parser.parse_args()
+    order_by = LAYOUT_ORDER["ts_source" if args.cluster_source else "ts"]
+
+    csvs = find_csvs()
+    if not csvs:
+        raise SystemExit(f"No CSVs found in {DATA_DIR}. Put your Kaggle file there.")
+
+    print(f"Using CSV files: {csvs}")
+    t_total = time.perf_counter()
+
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STAGE_DIR.mkdir(parents=True, exist_ok=True)
+    con = duckdb.connect(str(DB_PATH))
+    con.execute("PRAGMA threads=4;")
+    con.execute("CREATE SCHEMA IF NOT EXISTS day10;")
+    con.execute("SET schema='day10';")
+
+    # Drop the pre-Parquet raw table left by older builds (raw_rides is now a view)
+    legacy_raw = con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = 'day10' AND table_name = 'raw_rides' AND table_type = 'BASE TABLE';"
+    ).fetchone()[0]
+    if legacy_raw:
+        con.execute("DROP TABLE raw_rides;")
+
+    with phase("plan"):
+        mode, to_stage = plan_build(con, csvs, args.full)
+    print(f"Build mode: {mode} ({len(to_stage)} file(s) to stage), layout ORDER BY {order_by}")
+
+    explain_before = {}
+    if args.explain and mode != "append":
+        has_rides = con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'day10' AND table_name = 'rides';"
+        ).fetchone()[0]
+        if has_rides:
+            with phase("explain_before"):
+                explain_before = explain_probes(con, layout_probes(con))
+
+    # Stage raw CSV -> Parquet (only new/changed files)
+    staged_rows = {}
+    with phase("stage_parquet"):
+        for p in to_stage:
+            staged_rows[p] = stage_csv(con, p)
+            print(f"  staged {Path(p).name} -> {staged_path(p).name} ({staged_rows[p]} rows)")
+
+    if mode == "full":
+        staged = [str(staged_path(p)) for p in csvs]
+        with phase("build_rides"):
+            print("Creating normalized table rides ...")
+            con.execute(f"CREATE OR REPLACE TABLE rides AS {rides_projection(con, staged)} ORDER BY {order_by};")
+    elif mode == "append":
+        staged = [str(staged_path(p)) for p in to_stage]
+        with phase("append_rides"):
+            print(f"Appending {len(staged)} new file(s) into rides ...")
+            prev_max = con.execute("SELECT MAX(ts) FROM rides;").fetchone()[0]
+            con.execute(f"CREATE OR REPLACE TEMP TABLE rides_batch AS {rides_projection(con, staged)} ORDER BY {order_by};")
+            new_min = con.execute("SELECT MIN(ts) FROM rides_batch;").fetchone()[0]
+            con.execute("INSERT INTO rides BY NAME SELECT * FROM rides_batch;")
+            con.execute("DROP TABLE rides_batch;")
+        if prev_max is not None and new_min is not None and new_min < prev_max:
+            # Older data landed after newer data; zonemaps would overlap, so re-sort once
+            with phase("resort_rides"):
+                print("Appended rows overlap the existing time range; re-sorting rides ...")
+                con.execute(f"CREATE OR REPLACE TABLE rides AS SELECT * FROM rides ORDER BY {order_by};")
+    else:
+        print("rides is up to date; nothing to load.")
+
+    # Only mark files ingested once rides actually contains them
+    for p, rows in staged_rows.items():
+        record_ingest(con, p, staged_path(p), rows)
+
+    if mode != "noop" or not zones_present(con):
+        with phase("zone_stats"):
+            z = collect_zone_stats(con)
+            print(f"  {META_SCHEMA}.rides_zones: {z['row_groups']} row group(s), {z['overlapping']} overlapping in ts")
+
+    if mode != "noop" or rollups_missing(con):
+        with phase("rollups"):
+            for name, rows in build_rollups(con).items():
+                print(f"  {ROLLUP_SCHEMA}.{name}: {rows} rows")
+
+    with phase("views"):
+        # Raw data stays queryable straight from the staged Parquet
+        all_staged = [str(staged_path(p)) for p in csvs]
+        con.execute(
+            f"CREATE OR REPLACE VIEW raw_rides AS "
+            f"SELECT * FROM read_parquet({_file_list(all_staged)}, union_by_name=true);"
+        )
+
+        # Simple analytics view
+        con.execute(
+            """
+            CREATE OR REPLACE VIEW v_rides_analytics AS
+            SELECT
+              cab_type, ride_name, source, destination,
+              price_usd, distance_miles, surge_multiplier,
+              ts, date, hour, dow
+            FROM rides;
+            """
+        )
 
     # Summary
-    n = con.execute("SELECT COUNT(*) FROM rides;").fetchone()[0]
-    print(f"Loaded rows into rides: {n}")
+    with phase("summary"):
+        n = con.execute("SELECT COUNT(*) FROM rides;").fetchone()[0]
+        print(f"Loaded rows into rides: {n}")
 
-    stats = con.execute(
-        """
-        SELECT
-          COUNT(*) AS rows,
-          COUNT(price_usd) AS priced_rows,
-          ROUND(AVG(price_usd),2) AS avg_price,
-          ROUND(AVG(distance_miles),2) AS avg_distance,
-          MIN(ts) AS min_ts,
-          MAX(ts) AS max_ts
-        FROM rides;
-        """
-    ).fetchdf()
-    print(stats)
+        stats = con.execute(
+            """
+            SELECT
+              COUNT(*) AS rows,
+              COUNT(price_usd) AS priced_rows,
+              ROUND(AVG(price_usd),2) AS avg_price,
+              ROUND(AVG(distance_miles),2) AS avg_distance,
+              MIN(ts) AS min_ts,
+              MAX(ts) AS max_ts
+            FROM rides;
+            """
+        ).fetchdf()
+        print(stats)
+
+    if args.explain:
+        with phase("explain_after"):
+            explain_after = explain_probes(con, layout_probes(con))
+        print("\nEXPLAIN ANALYZE (date-filtered probes):")
+        for name, (ms, hit, total) in explain_after.items():
+            before = explain_before.get(name)
+            prev = f"{before[0]} ms, {before[1]}/{before[2]} zones" if before else "n/a"
+            print(f"  {name:<20} before: {prev:<26} after: {ms} ms, {hit}/{total} zones")
 
     con.close()
+
+    total_ms = int((time.perf_counter() - t_total) * 1000)
+    print("\nPhase timings:")
+    for name, ms in PHASES:
+        print(f"  {name:<16} {ms:>8} ms")
+    print(f"  {'total':<16} {total_ms:>8} ms")
     print(f"✅ DuckDB ready at: {DB_PATH}")
 
 if __name__ == "__main__":
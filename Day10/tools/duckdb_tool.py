@@ -2,11 +2,22 @@ from typing import Any, Dict
 import pandas as pd
 
 from Day10.app.sql_utils import run_sql, is_safe_sql
+from Day10.app.rollups import rewrite_for_rollups, run_with_rollups
 
 
 def query(sql: str) -> pd.DataFrame:
     if not is_safe_sql(sql):
         raise ValueError("Unsafe SQL: only read-only queries are allowed")
+    # Transparently serve matching group-bys from pre-aggregated rollups
+    try:
+        rewrite = rewrite_for_rollups(sql)
+    except Exception:
+        rewrite = None
+    if rewrite:
+        try:
+            return run_with_rollups(sql, rewrite)
+        except TimeoutError:
+            raise
+        except Exception:
+            pass  # fall back to the base scan
     return run_sql(sql)
-
-
@@ -0,0 +1,138 @@
+# shared/calculator.py
+"""Safe arithmetic for the Day01 and Day05 calculator tools (AST whitelist, no eval)."""
+import ast
+import math
+import operator
+import os
+import re
+from functools import lru_cache
+
+# ---------------- calculator ----------------
+# Expressions are parsed once into an AST, checked against a whitelist and
+# turned into a small closure tree. Every numeric literal becomes a slot, so the
+# same compiled tree runs on Python numbers (calculator) or on NumPy columns
+# (Day05's calculator_batch, one pass per group of same-shaped expressions).
+CALC_MAX_LEN = 200
+CALC_MAX_EXPONENT = 1000   # |b| in a ** b
+CALC_MAX_DIGITS = 300      # results beyond ~1e300 are refused
+CALC_MAX_DEPTH = 40
+CALC_CACHE_SIZE = int(os.getenv("CALC_CACHE_SIZE", "256"))
+
+_SAFE_CHARS = re.compile(r"^[0-9\.\+\-\*\/\(\)\s%ofOF]+$")
+_PCT_OF = re.compile(r"%\s*of", re.I)
+_NUM_CHARS = "0123456789."
+
+
+def _safe_pow(a, b):
+    if hasattr(b, "shape"):  # NumPy column: overflow/complex become inf/nan, reported per item
+        return a ** b
+    if abs(b) > CALC_MAX_EXPONENT:
+        raise ValueError(f"exponent too large (limit {CALC_MAX_EXPONENT})")
+    if abs(a) > 1 and b > 0 and b * math.log10(abs(a)) > CALC_MAX_DIGITS:
+        raise ValueError("result too large")
+    return a ** b
+
+
+_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: _safe_pow,
+}
+_UNARYOPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def _expand_percent(s: str) -> str:
+    """'20% of 50' -> '(20/100)*50', '(1+2)%' -> '((1+2)/100)'."""
+    s = _PCT_OF.sub("%*", s)
+    while "%" in s:
+        end = s.index("%")
+        j = end
+        while j > 0 and s[j - 1].isspace():
+            j -= 1
+        if j > 0 and s[j - 1] in _NUM_CHARS:
+            start = j
+            while start > 0 and s[start - 1] in _NUM_CHARS:
+                start -= 1
+        elif j > 0 and s[j - 1] == ")":
+            depth, start = 0, j - 1
+            while start >= 0:
+                depth += {")": 1, "(": -1}.get(s[start], 0)
+                if depth == 0:
+                    break
+                start -= 1
+            if start < 0:
+                raise ValueError("Unbalanced parentheses before %")
+        else:
+            raise ValueError("% must follow a number or a parenthesised expression")
+        s = f"{s[:start]}({s[start:j]}/100){s[end + 1:]}"
+    return s
+
+
+def _build(node, slots: list, shape: list, depth: int = 0):
+    if depth > CALC_MAX_DEPTH:
+        raise ValueError("Expression nested too deeply")
+    if isinstance(node, ast.Expression):
+        return _build(node.body, slots, shape, depth)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        i = len(slots)
+        slots.append(node.value)
+        shape.append("n")
+        return lambda c: c[i]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+        op = _BINOPS[type(node.op)]
+        shape.append(type(node.op).__name__)
+        left = _build(node.left, slots, shape, depth + 1)
+        right = _build(node.right, slots, shape, depth + 1)
+        return lambda c: op(left(c), right(c))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARYOPS:
+        op = _UNARYOPS[type(node.op)]
+        shape.append(type(node.op).__name__)
+        operand = _build(node.operand, slots, shape, depth + 1)
+        return lambda c: op(operand(c))
+    raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=CALC_CACHE_SIZE)
+def _compile(expr: str):
+    """expr -> (fn, literal slots, shape key). Raises ValueError on rejected input."""
+    if not expr or len(expr) > CALC_MAX_LEN:
+        raise ValueError("Invalid input length")
+    if not _SAFE_CHARS.fullmatch(expr):
+        raise ValueError("Unsafe characters in expression")
+    try:
+        tree = ast.parse(_expand_percent(expr).strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    slots, shape = [], []
+    fn = _build(tree, slots, shape)
+    return fn, tuple(slots), tuple(shape)
+
+
+def _check_result(result):
+    if isinstance(result, complex):
+        raise ValueError("complex result")
+    if isinstance(result, float) and not math.isfinite(result):
+        raise ValueError("result too large")
+    if isinstance(result, int) and result.bit_length() > CALC_MAX_DIGITS * 3.33:
+        raise ValueError("result too large")
+    return result
+
+
+def calculator(expr: str) -> dict:
+    """Evaluate safe math expressions with support for percentages.
+
+    Supports + - * / // ** ( ), "20%" and "20% of 50". Compiled
+    expressions are LRU-cached, so repeated calls skip parsing.
+
+    Returns:
+        {"ok": True, "result": float} on success
+        {"ok": False, "error": str} on failure
+    """
+    try:
+        fn, slots, _ = _compile(expr)
+        return {"ok": True, "result": _check_result(fn(slots))}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
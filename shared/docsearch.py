@@ -0,0 +1,111 @@
+# shared/docsearch.py
+"""Local-docs keyword search shared by the Day04 MCP server and the Day05 tools.
+
+- The data dir is walked at most every DOCSEARCH_REFRESH_S seconds; only files
+  whose (mtime, size) changed are re-read, deleted files drop out.
+- Files larger than DOCSEARCH_MAX_FILE_BYTES are skipped.
+- The query is compiled once (LRU-cached). Each file is checked with a cheap
+  lowercase substring test, then one regex pass counts matches and records
+  the first offset, which is where the snippet is cut from.
+- Top-k comes from a heap instead of sorting every hit.
+
+Scores and ordering match the old per-query scan: score = number of
+case-insensitive occurrences, ties keep directory-walk order.
+"""
+import heapq
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+DOC_EXTS = (".md", ".txt", ".py")
+REFRESH_S = float(os.getenv("DOCSEARCH_REFRESH_S", "2"))
+MAX_FILE_BYTES = int(os.getenv("DOCSEARCH_MAX_FILE_BYTES", str(1024 * 1024)))
+SNIPPET_SIZE = 160
+
+
+@lru_cache(maxsize=256)
+def _matcher(query: str) -> Tuple[re.Pattern, str]:
+    return re.compile(re.escape(query), re.IGNORECASE), query.lower()
+
+
+def make_snippet(text: str, offset: int, size: int = SNIPPET_SIZE) -> str:
+    if offset < 0:
+        return text[:size]
+    i = max(0, offset - size // 2)
+    return text[i:i + size].replace("\n", " ")
+
+
+class DocIndex:
+    def __init__(self, data_dir: str, exts: Tuple[str, ...] = DOC_EXTS,
+                 refresh_s: float = REFRESH_S, max_file_bytes: int = MAX_FILE_BYTES):
+        self.data_dir = data_dir
+        self.exts = exts
+        self.refresh_s = refresh_s
+        self.max_file_bytes = max_file_bytes
+        # path -> {"sig": (mtime_ns, size), "text": str, "lower": str}, in walk order
+        self.files: Dict[str, Dict] = {}
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and self.files and now - self._last_refresh < self.refresh_s:
+            return
+        with self._lock:
+            fresh: Dict[str, Dict] = {}
+            for root, _, names in os.walk(self.data_dir):
+                for fn in names:
+                    if not fn.endswith(self.exts):
+                        continue
+                    path = os.path.join(root, fn)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if st.st_size > self.max_file_bytes:
+                        continue
+                    sig = (st.st_mtime_ns, st.st_size)
+                    entry = self.files.get(path)
+                    if entry is None or entry["sig"] != sig:
+                        try:
+                            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                                text = f.read()
+                        except Exception:
+                            continue
+                        entry = {"sig": sig, "text": text, "lower": text.lower()}
+                    fresh[path] = entry
+            self.files = fresh
+            self._last_refresh = now
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict]:
+        """Return up to top_k {title, snippet, path, score} dicts, best first."""
+        query = (query or "").strip()
+        if not query:
+            return []
+        self.refresh()
+        pattern, needle = _matcher(query)
+        hits = []
+        files = self.files  # refresh() swaps in a new dict, never mutates this one
+        for order, (path, entry) in enumerate(files.items()):
+            if needle not in entry["lower"]:
+                continue
+            score, first = 0, -1
+            for m in pattern.finditer(entry["text"]):
+                if first < 0:
+                    first = m.start()
+                score += 1
+            if score:
+                hits.append((score, -order, path, first))
+        best = heapq.nlargest(max(1, int(top_k)), hits)
+        return [
+            {
+                "title": os.path.basename(path),
+                "snippet": make_snippet(files[path]["text"], first),
+                "path": os.path.relpath(path, self.data_dir),
+                "score": score,
+            }
+            for score, _, path, first in best
+        ]
@@ -0,0 +1,230 @@
+"""Embedding provider shared by the Day02 RAG index and the Day03/Day10 memory stores.
+
+Backends (EMBEDDINGS_BACKEND):
+- "openai": OpenAIEmbeddings (needs OPENAI_API_KEY)
+- "local":  hashing vectorizer on CPU (word unigrams + char trigrams, signed
+            feature hashing, L2-normalised). No network and no model download.
+- "auto" (default): openai when OPENAI_API_KEY is set, otherwise local.
+
+Whatever the backend, vectors go through an on-disk, content-addressed cache:
+sha1(backend + text) -> row in an append-only float32 file that is read back
+as a memory-mapped array. Re-embedding the same chunk or memory costs a
+lookup, and cache misses go to the backend in batches of EMBED_BATCH.
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv()
+
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl  # serialise appends when several days share the cache
+except ImportError:  # Windows
+    fcntl = None
+
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "auto").lower()
+LOCAL_DIM = int(os.getenv("LOCAL_EMBED_DIM", "512"))
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "64"))
+EMBED_CACHE_DIR = os.getenv(
+    "EMBED_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".embed_cache"),
+)
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Stateless feature-hashing embedder; identical text always maps to the same vector."""
+
+    def __init__(self, dim: int = LOCAL_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall((text or "").lower())
+        feats = ["w:" + w for w in words]
+        for w in words:
+            padded = f"<{w}>"
+            feats.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+        return feats
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, cols, signs = [], [], []
+        for r, text in enumerate(texts):
+            for f in self._features(text):
+                h = zlib.crc32(f.encode("utf-8"))
+                rows.append(r)
+                cols.append(h % self.dim)
+                signs.append(1.0 if (h >> 31) & 1 else -1.0)
+        if rows:
+            np.add.at(out, (np.asarray(rows), np.asarray(cols)), np.asarray(signs, dtype=np.float32))
+        # sublinear tf, then unit length so dot product == cosine
+        out = np.sign(out) * np.log1p(np.abs(out))
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class EmbeddingCache:
+    """Append-only text-hash -> float32 vector store under one directory per backend."""
+
+    def __init__(self, directory: str):
+        self.dir = directory
+        os.makedirs(self.dir, exist_ok=True)
+        self.keys_path = os.path.join(self.dir, "keys.txt")
+        self.vec_path = os.path.join(self.dir, "vectors.f32")
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self._mm: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._read_dim()
+        self._reload()
+
+    def _read_dim(self):
+        dim_path = os.path.join(self.dir, "dim")
+        if os.path.exists(dim_path):
+            with open(dim_path) as f:
+                self.dim = int(f.read().strip() or 0) or None
+
+    def _reload(self):
+        """Re-read keys written by us or by another process."""
+        if not self.dim or not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, encoding="ascii") as f:
+            keys = f.read().split()
+        n = min(len(keys), os.path.getsize(self.vec_path) // (4 * self.dim)) if os.path.exists(self.vec_path) else 0
+        self.rows = {k: i for i, k in enumerate(keys[:n])}
+        self._mm = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(n, self.dim)) if n else None
+
+    def _repair(self):
+        """
+        Called under the file lock before appending. Row i is key line i, so the
+        vector file must hold exactly one row per complete key line: a crash
+        between the two writes (or mid-line) is cut back here, otherwise every
+        later key would point at the wrong vector.
+        """
+        row_bytes = 4 * self.dim
+        data = b""
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "rb") as f:
+                data = f.read()
+        lines = data[:data.rfind(b"\n") + 1].splitlines(keepends=True)  # drop a torn last line
+        vec_size = os.path.getsize(self.vec_path) if os.path.exists(self.vec_path) else 0
+        lines = lines[:vec_size // row_bytes]  # keys without a vector (should not happen)
+        keep = sum(map(len, lines))
+        if keep != len(data):
+            os.truncate(self.keys_path, keep)
+        if vec_size != len(lines) * row_bytes:
+            os.truncate(self.vec_path, len(lines) * row_bytes)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            if any(k not in self.rows for k in keys):
+                self._reload()
+            mm = self._mm
+            return {k: np.array(mm[self.rows[k]]) for k in keys if k in self.rows and mm is not None}
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            vecs = np.asarray(list(items.values()), dtype=np.float32)
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+                with open(os.path.join(self.dir, "dim"), "w") as f:
+                    f.write(str(self.dim))
+            with open(self.keys_path, "a", encoding="ascii") as kf:
+                if fcntl:
+                    fcntl.flock(kf, fcntl.LOCK_EX)
+                try:
+                    self._repair()
+                    self._reload()  # pick up rows appended by others before we append
+                    fresh = [k for k in items if k not in self.rows]
+                    if not fresh:
+                        return
+                    # vectors first; _repair() drops them again if we die before the keys land
+                    with open(self.vec_path, "ab") as vf:
+                        vf.write(np.asarray([items[k] for k in fresh], dtype=np.float32).tobytes())
+                    kf.write("".join(k + "\n" for k in fresh))
+                    kf.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(kf, fcntl.LOCK_UN)
+            self._reload()
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps any LangChain Embeddings with the on-disk cache and batched misses."""
+
+    def __init__(self, inner: Embeddings, name: str, batch_size: int = EMBED_BATCH):
+        self.inner = inner
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.cache = EmbeddingCache(os.path.join(EMBED_CACHE_DIR, name))
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in found))
+        self.stats["hits"] += len(texts) - len(missing)
+        self.stats["misses"] += len(missing)
+        for i in range(0, len(missing), self.batch_size):
+            chunk = missing[i:i + self.batch_size]
+            vecs = self.inner.embed_documents(chunk)
+            fresh = {self._key(t): np.asarray(v, dtype=np.float32) for t, v in zip(chunk, vecs)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return [found[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+_providers: Dict[str, CachedEmbeddings] = {}
+_providers_lock = threading.Lock()
+
+
+def backend_name(backend: Optional[str] = None) -> str:
+    backend = (backend or EMBEDDINGS_BACKEND).lower()
+    if backend == "auto":
+        backend = "openai" if os.getenv("OPENAI_API_KEY") else "local"
+    return backend
+
+
+def collection_suffix(backend: Optional[str] = None) -> str:
+    """Vector dims differ per backend, so non-default backends get their own collection."""
+    backend = backend_name(backend)
+    return "" if backend == "openai" else f"_{backend}"
+
+
+def get_embeddings(backend: Optional[str] = None) -> CachedEmbeddings:
+    """Process-wide cached embedder for the configured backend."""
+    backend = backend_name(backend)
+    with _providers_lock:
+        if backend not in _providers:
+            if backend == "openai":
+                from langchain_openai import OpenAIEmbeddings
+                inner = OpenAIEmbeddings()
+                name = "openai-" + inner.model
+            elif backend == "local":
+                inner, name = HashingEmbeddings(), f"hash{LOCAL_DIM}"
+            else:
+                raise ValueError(f"Unknown EMBEDDINGS_BACKEND: {backend}")
+            _providers[backend] = CachedEmbeddings(inner, name)
+        return _providers[backend]
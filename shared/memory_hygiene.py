@@ -0,0 +1,83 @@
+# shared/memory_hygiene.py
+"""Write-time hygiene shared by the Day03 and Day10 semantic memory stores.
+
+- memory_score: retention score used for eviction (see memory_policy.md §7)
+- merge_duplicate: metadata for an existing item that absorbs a near-duplicate
+  fact; the caller stores the *newer* text and vector on that item, so a changed
+  preference ("I now prefer tea") replaces the stale one
+- consolidation_plan: greedy near-duplicate clustering plus eviction down to a cap
+
+Only numpy here, so importing it does not pull in an embeddings or vector-store client.
+"""
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEDUP_SIM = float(os.getenv("MEMORY_DEDUP_SIM", "0.9"))   # cosine: merge instead of insert
+DECAY_DAYS = float(os.getenv("DECAY_DAYS", "30"))         # recency half-life
+CONFIDENCE_BUMP = 0.1
+
+
+def unit(vecs) -> np.ndarray:
+    m = np.atleast_2d(np.asarray(vecs, dtype=np.float32))
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def memory_score(meta: Dict, now: Optional[float] = None) -> float:
+    """Confidence decayed by age, plus a bonus for being retrieved; pinned items never go."""
+    now = now or time.time()
+    if "pinned" in str(meta.get("tags", "")).split(","):
+        return float("inf")
+    last = float(meta.get("updated_at") or meta.get("created_at") or now)
+    age_days = max(0.0, (now - last) / 86400.0)
+    decay = 0.5 ** (age_days / DECAY_DAYS) if DECAY_DAYS > 0 else 1.0
+    return float(meta.get("confidence", 0.5)) * decay + 0.1 * math.log1p(int(meta.get("hits", 0) or 0))
+
+
+def merge_duplicate(meta: Dict, confidence: float, tags_str: str, now: int) -> Dict:
+    """Existing item's metadata after a near-duplicate fact is merged into it."""
+    meta = dict(meta or {})
+    meta["confidence"] = min(1.0, max(float(meta.get("confidence", 0.0)), float(confidence)) + CONFIDENCE_BUMP)
+    meta["tags"] = ",".join(dict.fromkeys(t for t in (str(meta.get("tags", "")) + "," + tags_str).split(",") if t))
+    meta["updated_at"] = now
+    return meta
+
+
+def consolidation_plan(ids: List[str], metas: List[Dict], embeddings, cap: int,
+                       dedup_sim: float = DEDUP_SIM) -> Tuple[List[str], List[int], int, int]:
+    """
+    Decide a consolidation pass; `metas` (hit counts already folded in) is updated in place.
+    The best-scoring item of each near-duplicate cluster survives and absorbs the
+    others' hits and confidence; then the lowest scores are evicted down to `cap`.
+    Returns (ids to delete, indexes still alive, merged, evicted).
+    """
+    now = time.time()
+    scores = np.array([memory_score(m, now) for m in metas])
+    vecs = unit(embeddings)
+    sims = vecs @ vecs.T
+    alive = np.ones(len(ids), dtype=bool)
+    drop: List[str] = []
+    for i in np.argsort(-scores):
+        if not alive[i]:
+            continue
+        for j in np.where(alive & (sims[i] >= dedup_sim))[0]:
+            if j == i:
+                continue
+            alive[j] = False
+            drop.append(ids[j])
+            metas[i]["hits"] = int(metas[i].get("hits", 0) or 0) + int(metas[j].get("hits", 0) or 0)
+            metas[i]["confidence"] = max(float(metas[i].get("confidence", 0)), float(metas[j].get("confidence", 0)))
+    merged = len(drop)
+
+    keep = np.where(alive)[0]
+    evicted = 0
+    if len(keep) > cap:
+        rescored = np.array([memory_score(metas[i], now) for i in keep])  # with absorbed hits
+        victims = keep[np.argsort(rescored)][: len(keep) - cap]  # lowest score first
+        drop.extend(ids[i] for i in victims)
+        evicted = len(victims)
+        alive[victims] = False
+    return drop, [int(i) for i in np.where(alive)[0]], merged, evicted
@@ -0,0 +1,142 @@
+# shared/memory_writer.py
+"""Background memory-write pipeline, shared by the Day03 agent and Day10.
+
+Extracting a durable fact costs a second LLM call, and storing it costs an
+embedding call plus a Chroma write. None of that needs to block the answer, so
+exchanges are put on a bounded queue and a single daemon worker drains them in
+batches: one extraction per exchange, then one `add_many` (one embeddings
+request) per batch. When the queue is full the drop policy decides what is
+lost; `flush()` waits for pending work and runs at interpreter exit.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+MEMORY_QUEUE_MAX = int(os.getenv("MEMORY_QUEUE_MAX", "32"))
+MEMORY_BATCH = int(os.getenv("MEMORY_BATCH", "4"))
+MEMORY_LINGER_S = float(os.getenv("MEMORY_LINGER_S", "0.5"))   # wait this long to fill a batch
+MEMORY_DROP = os.getenv("MEMORY_DROP", "oldest").lower()       # oldest | newest
+
+Exchange = Tuple[str, str]
+
+
+class MemoryWriter:
+    def __init__(
+        self,
+        extract: Callable[[str, str], str],
+        store: Callable[[List[str]], None],
+        maxsize: int = MEMORY_QUEUE_MAX,
+        batch_size: int = MEMORY_BATCH,
+        linger_s: float = MEMORY_LINGER_S,
+        drop: str = MEMORY_DROP,
+    ):
+        self.extract = extract
+        self.store = store
+        self.batch_size = max(1, int(batch_size))
+        self.linger_s = max(0.0, float(linger_s))
+        self.drop = drop if drop in ("oldest", "newest") else "oldest"
+        self.q: "queue.Queue[Exchange]" = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.stats: Dict[str, int] = {"queued": 0, "dropped": 0, "extracted": 0, "stored": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- producer side
+    def submit(self, user_text: str, ai_text: str) -> bool:
+        """Enqueue an exchange without blocking. Returns False if it was dropped."""
+        self._ensure_started()
+        item = ((user_text or "").strip(), (ai_text or "").strip())
+        if not item[0] or not item[1]:
+            return False
+        while True:
+            try:
+                self.q.put_nowait(item)
+                self._bump("queued")
+                return True
+            except queue.Full:
+                if self.drop == "newest":
+                    self._bump("dropped")
+                    return False
+                # oldest: evict the head and retry
+                try:
+                    self.q.get_nowait()
+                    self.q.task_done()
+                    self._bump("dropped")
+                except queue.Empty:
+                    pass
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far has been processed."""
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        while self.q.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    # ---- worker side
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _next_batch(self) -> List[Exchange]:
+        try:
+            first = self.q.get(timeout=0.2)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.linger_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.q.get(timeout=remaining) if remaining > 0 else self.q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                facts = []
+                for user_text, ai_text in batch:
+                    try:
+                        fact = self.extract(user_text, ai_text)
+                    except Exception:
+                        self._bump("errors")
+                        continue
+                    if fact and fact not in facts:
+                        facts.append(fact)
+                self._bump("extracted", len(facts))
+                if facts:
+                    try:
+                        self.store(facts)
+                        self._bump("stored", len(facts))
+                    except Exception as e:
+                        self._bump("errors")
+                        print(f"[memory] store failed: {e}")
+            finally:
+                for _ in batch:
+                    self.q.task_done()
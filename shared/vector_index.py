@@ -0,0 +1,349 @@
+"""Embedded NumPy vector index: a light stand-in for a Chroma collection.
+
+Per-user memory stores hold hundreds to tens of thousands of vectors, where
+Chroma's client start-up and persistence dominate latency. `NumpyIndex`
+keeps one contiguous float32 matrix in a memory-mapped file, scores queries
+with a single matrix-vector product plus `argpartition`, and switches to an
+IVF (k-means inverted lists) probe once it grows past IVF_MIN_ROWS.
+
+Writes are append-only: vectors go to `vectors.f32` and every add, update
+or delete is a line in `log.jsonl`. Deleted and re-embedded rows are skipped
+until compaction rewrites both files. That happens after any write that leaves
+more than COMPACT_RATIO of the rows dead, or of the log lines stale.
+
+The class mirrors the subset of the Chroma collection API used by the
+memory stores (`add`, `query`, `get`, `update`, `delete`, `count`, including
+`where` filters), so `SemanticMemory` can use either backend unchanged.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", "4096"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+COMPACT_RATIO = 0.3
+COMPACT_MIN_STALE = 256  # don't rewrite tiny logs for a handful of stale lines
+
+
+def _unit(vecs) -> np.ndarray:
+    m = np.atleast_2d(np.asarray(vecs, dtype=np.float32))
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def match_where(meta: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style metadata filter against one metadata dict."""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(match_where(meta, c) for c in where["$and"])
+    if "$or" in where:
+        return any(match_where(meta, c) for c in where["$or"])
+    for key, cond in where.items():
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, val in cond.items():
+            if key not in meta:
+                if op in ("$ne", "$nin"):
+                    continue
+                return False
+            v = meta[key]
+            ok = {
+                "$eq": lambda: v == val,
+                "$ne": lambda: v != val,
+                "$gt": lambda: v > val,
+                "$gte": lambda: v >= val,
+                "$lt": lambda: v < val,
+                "$lte": lambda: v <= val,
+                "$in": lambda: v in val,
+                "$nin": lambda: v not in val,
+            }[op]()
+            if not ok:
+                return False
+    return True
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int = 8, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit centroids (k, dim)."""
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        for c in range(k):
+            members = x[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _unit(centroids)
+    return centroids
+
+
+class NumpyIndex:
+    def __init__(self, directory: str):
+        self.dir = directory
+        os.makedirs(self.dir, exist_ok=True)
+        self.vec_path = os.path.join(self.dir, "vectors.f32")
+        self.log_path = os.path.join(self.dir, "log.jsonl")
+        self.ivf_path = os.path.join(self.dir, "centroids.npy")
+        self._lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self.row_ids: List[str] = []          # row -> id
+        self.rows: Dict[str, int] = {}        # live id -> row
+        self.docs: Dict[str, str] = {}
+        self.metas: Dict[str, Dict[str, Any]] = {}
+        self.mat: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        self._live_rows: Optional[np.ndarray] = None   # sorted live row numbers, rebuilt after writes
+        self._alive: Optional[np.ndarray] = None       # row -> is live (bool mask)
+        self._ivf_rows = 0                              # live rows when centroids were trained
+        self._log_lines = 0
+        self._load()
+
+    # ---- persistence
+    def _load(self) -> None:
+        if os.path.exists(self.log_path):
+            good = 0
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    self._apply(rec)
+                    self._log_lines += 1
+                    good += len(line)
+            if good != os.path.getsize(self.log_path):
+                # torn final line from a crash: cut it so the next append starts on a fresh line
+                os.truncate(self.log_path, good)
+        self._map()
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        self._live_rows = None
+        op = rec["op"]
+        if op == "dim":
+            self.dim = rec["dim"]
+        elif op == "add":
+            _id = rec["id"]
+            if _id in self.rows:
+                self.rows.pop(_id)
+            self.rows[_id] = len(self.row_ids)
+            self.row_ids.append(_id)
+            self.docs[_id] = rec.get("doc") or ""
+            self.metas[_id] = rec.get("meta") or {}
+        elif op == "update":
+            if rec["id"] in self.rows:
+                self.metas[rec["id"]] = rec.get("meta") or {}
+                if "doc" in rec:
+                    self.docs[rec["id"]] = rec["doc"]
+        elif op == "delete":
+            _id = rec["id"]
+            self.rows.pop(_id, None)
+            self.docs.pop(_id, None)
+            self.metas.pop(_id, None)
+
+    def _map(self) -> None:
+        n = len(self.row_ids)
+        if not n or not self.dim:
+            self.mat = None
+            return
+        self.mat = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        if self.centroids is None and len(self.rows) >= IVF_MIN_ROWS:
+            if os.path.exists(self.ivf_path):
+                # centroids survive restarts; only the (cheap) list assignment is redone
+                self.centroids = np.load(self.ivf_path)
+                self.lists = [np.empty(0, dtype=np.int64)] * len(self.centroids)
+                self._ivf_rows = len(self.rows)
+                self._assign(self.live_rows())
+            else:
+                self._train_ivf()
+
+    def live_rows(self) -> np.ndarray:
+        if self._live_rows is None:
+            self._live_rows = np.sort(np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows)))
+            self._alive = np.zeros(len(self.row_ids), dtype=bool)
+            self._alive[self._live_rows] = True
+        return self._live_rows
+
+    def _log(self, recs: List[Dict[str, Any]]) -> None:
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in recs))
+        self._log_lines += len(recs)
+        for r in recs:
+            self._apply(r)
+
+    def _maybe_compact(self) -> None:
+        dead = 1 - len(self.rows) / len(self.row_ids) if self.row_ids else 0.0
+        stale = self._log_lines - len(self.rows) - 1  # beyond one add per live row + the dim line
+        if dead > COMPACT_RATIO or (stale > COMPACT_MIN_STALE and stale > COMPACT_RATIO * self._log_lines):
+            self.compact()
+
+    # ---- IVF
+    def _train_ivf(self) -> None:
+        live = self.live_rows()
+        k = max(8, int(np.sqrt(len(live))))
+        sample = live if len(live) <= 50_000 else np.sort(np.random.default_rng(0).choice(live, 50_000, replace=False))
+        self.centroids = _kmeans(np.asarray(self.mat[sample]), k)
+        np.save(self.ivf_path, self.centroids)
+        self._ivf_rows = len(live)
+        self.lists = [np.empty(0, dtype=np.int64)] * k
+        self._assign(live)
+
+    def _assign(self, rows: np.ndarray) -> None:
+        if self.centroids is None or not len(rows):
+            return
+        assign = np.argmax(np.asarray(self.mat[rows]) @ self.centroids.T, axis=1)
+        for c in np.unique(assign):
+            self.lists[c] = np.concatenate([self.lists[c], rows[assign == c]])
+
+    def _candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        near = np.argsort(-(self.centroids @ q))[:nprobe]
+        return np.concatenate([self.lists[c] for c in near])
+
+    # ---- collection API
+    def count(self) -> int:
+        return len(self.rows)
+
+    def add(self, ids: List[str], documents: List[str], embeddings, metadatas: Optional[List[Dict]] = None) -> None:
+        vecs = _unit(embeddings)
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            recs = []
+            if self.dim is None:
+                recs.append({"op": "dim", "dim": int(vecs.shape[1])})
+            elif vecs.shape[1] != self.dim:
+                raise ValueError(f"embedding dim {vecs.shape[1]} != index dim {self.dim}")
+            first = len(self.row_ids)
+            # row n is the n-th logged add: drop vector bytes a crash left without a
+            # log line, or this batch (and everything after it) would shift rows
+            rows_bytes = first * 4 * (self.dim or 0)
+            if os.path.exists(self.vec_path) and os.path.getsize(self.vec_path) > rows_bytes:
+                os.truncate(self.vec_path, rows_bytes)
+            # vectors first: a log line never points past the end of the matrix
+            with open(self.vec_path, "ab") as f:
+                f.write(vecs.tobytes())
+            recs += [{"op": "add", "id": i, "doc": d, "meta": m} for i, d, m in zip(ids, documents, metadatas)]
+            self._log(recs)
+            had_ivf = self.centroids is not None
+            self._map()
+            if had_ivf and len(self.rows) >= 4 * self._ivf_rows:
+                self._train_ivf()  # lists ~ sqrt(n): retrain once the index has quadrupled
+            elif had_ivf:
+                self._assign(np.arange(first, len(self.row_ids), dtype=np.int64))
+            self._maybe_compact()
+
+    def update(self, ids: List[str], metadatas: Optional[List[Dict]] = None,
+               documents: Optional[List[str]] = None, embeddings=None) -> None:
+        with self._lock:
+            ids = list(ids)
+            metadatas = metadatas if metadatas is not None else [self.metas.get(i, {}) for i in ids]
+            if embeddings is not None:
+                # a new vector is a new row under the same id; the old row is dead until compaction
+                documents = documents if documents is not None else [self.docs.get(i, "") for i in ids]
+                sel = [n for n, i in enumerate(ids) if i in self.rows]
+                if sel:
+                    vecs = _unit(embeddings)
+                    self.add([ids[n] for n in sel], [documents[n] for n in sel], vecs[sel],
+                             [metadatas[n] for n in sel])
+                return
+            docs = documents if documents is not None else [None] * len(ids)
+            self._log([{"op": "update", "id": i, "meta": m, **({"doc": d} if d is not None else {})}
+                       for i, m, d in zip(ids, metadatas, docs) if i in self.rows])
+            self._maybe_compact()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None) -> None:
+        with self._lock:
+            if ids is None:
+                ids = [i for i in self.rows if match_where(self.metas[i], where)]
+            self._log([{"op": "delete", "id": i} for i in ids if i in self.rows])
+            self._maybe_compact()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            include: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            pool = [i for i in ids if i in self.rows] if ids is not None else list(self.rows)
+            sel = [i for i in pool if match_where(self.metas[i], where)][:limit]
+            out: Dict[str, Any] = {"ids": sel}
+            if "documents" in include:
+                out["documents"] = [self.docs[i] for i in sel]
+            if "metadatas" in include:
+                out["metadatas"] = [dict(self.metas[i]) for i in sel]
+            if "embeddings" in include:
+                rows = [self.rows[i] for i in sel]
+                out["embeddings"] = np.asarray(self.mat[rows]) if rows else np.empty((0, self.dim or 0), np.float32)
+            return out
+
+    def query(self, query_embeddings, n_results: int = 4, where: Optional[Dict] = None,
+              include: Optional[List[str]] = None, nprobe: int = IVF_NPROBE) -> Dict[str, Any]:
+        include = ["documents", "metadatas", "distances"] if include is None else include
+        out: Dict[str, List] = {"ids": []}
+        for key in ("documents", "metadatas", "embeddings", "distances"):
+            if key in include:
+                out[key] = []
+        with self._lock:
+            for q in _unit(query_embeddings):
+                ids, scores = self._top_k(q, n_results, where, nprobe)
+                sub = self.get(ids=ids, include=[k for k in include if k != "distances"])
+                out["ids"].append(ids)
+                for key in ("documents", "metadatas", "embeddings"):
+                    if key in include:
+                        out[key].append(sub[key])
+                if "distances" in include:
+                    out["distances"].append([float(1.0 - s) for s in scores])  # cosine distance
+        return out
+
+    def _top_k(self, q: np.ndarray, k: int, where: Optional[Dict], nprobe: int):
+        if self.mat is None or not self.rows:
+            return [], []
+        if where:
+            rows = np.sort(np.fromiter((r for i, r in self.rows.items() if match_where(self.metas[i], where)), dtype=np.int64))
+        elif self.centroids is not None:
+            self.live_rows()
+            rows = np.sort(self._candidates(q, nprobe))
+            rows = rows[self._alive[rows]]
+        else:
+            rows = None  # flat scan of the whole matrix
+        if rows is None:
+            scores = self.mat @ q  # one GEMV straight off the memmap, no gather copy
+            live = self.live_rows()
+            if len(live) != len(scores):
+                rows, scores = live, scores[live]
+            else:
+                rows = np.arange(len(scores))
+        elif not len(rows):
+            return [], []
+        else:
+            scores = np.asarray(self.mat[rows]) @ q
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.row_ids[rows[t]] for t in top], scores[top].tolist()
+
+    def compact(self) -> None:
+        """Rewrite vectors/log with live rows only and retrain IVF if it is in use."""
+        with self._lock:
+            live = list(self.rows.items())
+            tmp_vec, tmp_log = self.vec_path + ".tmp", self.log_path + ".tmp"
+            with open(tmp_vec, "wb") as f:
+                if live:
+                    f.write(np.asarray(self.mat[[r for _, r in live]], dtype=np.float32).tobytes())
+            with open(tmp_log, "w", encoding="utf-8") as f:
+                if self.dim:
+                    f.write(json.dumps({"op": "dim", "dim": self.dim}) + "\n")
+                for _id, _ in live:
+                    f.write(json.dumps({"op": "add", "id": _id, "doc": self.docs[_id], "meta": self.metas[_id]}) + "\n")
+            self.mat = None
+            os.replace(tmp_vec, self.vec_path)
+            os.replace(tmp_log, self.log_path)
+            dim = self.dim
+            self.row_ids, self.rows, self.docs, self.metas = [], {}, {}, {}
+            self._log_lines = 0
+            self.centroids, self.lists = None, []
+            if os.path.exists(self.ivf_path):
+                os.remove(self.ivf_path)  # retrain on the compacted data
+            self._load()
+            self.dim = self.dim or dim